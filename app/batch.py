@@ -0,0 +1,356 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langgraph.checkpoint.mongodb import AsyncMongoDBSaver
+from checkpointing import CheckpointPolicy
+from metrics import Metrics, instrument_checkpointer
+from sandbox import start_worker_pool, stop_worker_pool
+from chat_graph import GraphOptions, create_chat_graph
+from main import MONGODB_URI, add_graph_arguments, graph_options_from_args, initial_state_for, metrics
+from repair import error_summary, failed_runs
+
+PROMPT_FIELDS = ("prompt", "query", "text")
+ID_FIELDS = ("request_id", "id")
+# Statuses of a finished request; "error" results are retried when the batch is rerun
+FINISHED = ("ok", "failed", "rejected")
+# Retried with backoff besides 429: server-side hiccups and dropped connections
+TRANSIENT_STATUS = {500, 502, 503, 504, 529}
+TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "ReadTimeout", "ConnectTimeout"}
+
+def request_text(row: dict, field: str = None):
+    """The prompt of a JSONL row: `field`, else prompt/query/text, else title and body together"""
+    if field:
+        return str(row.get(field) or "")
+    for name in PROMPT_FIELDS:
+        if row.get(name):
+            return str(row[name])
+    return "\n\n".join(str(row[name]) for name in ("title", "body") if row.get(name))
+
+def read_requests(paths: list, field: str = None, id_field: str = None):
+    """(id, prompt) pairs from JSONL files, "-" for stdin; lines that are not JSON objects are prompts themselves"""
+    requests, seen = [], set()
+    for path in paths:
+        stem = "stdin" if path == "-" else os.path.splitext(os.path.basename(path))[0]
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        with stream:
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = line.strip()
+                if not isinstance(row, dict):
+                    row = {"prompt": str(row)}
+                ids = [id_field] if id_field else ID_FIELDS
+                request_id = next((str(row[name]) for name in ids if row.get(name) not in (None, "")),
+                                  f"{stem}-{number}")
+                text = request_text(row, field)
+                if text and request_id not in seen:
+                    seen.add(request_id)
+                    requests.append((request_id, text))
+    return requests
+
+def finished_ids(path: str):
+    """Ids whose latest result line in `path` is a finished status, so a rerun skips them"""
+    latest = {}
+    if path and path != "-" and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # the line a crash cut short
+                latest[result.get("id")] = result.get("status")
+    return {request_id for request_id, status in latest.items() if status in FINISHED}
+
+def status_code(error: BaseException):
+    """HTTP status of a provider error (openai/anthropic style) or of its cause, else None"""
+    while error is not None:
+        status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+        if isinstance(status, int):
+            return status
+        error = error.__cause__
+    return None
+
+def retry_after(error: BaseException):
+    """Seconds the provider asked us to wait (retry-after-ms / retry-after headers), else None"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def retry_delay(error: BaseException, retries: int, backoff: float, max_backoff: float):
+    """Seconds to wait before retrying `error`, or None if retrying will not help"""
+    status = status_code(error)
+    if status != 429 and status not in TRANSIENT_STATUS and type(error).__name__ not in TRANSIENT_ERRORS:
+        return None
+    requested = retry_after(error)
+    if requested is not None:
+        return min(requested, max_backoff)
+    # Full jitter keeps workers that failed together from retrying together
+    return random.uniform(0.5, 1.0) * min(max_backoff, backoff * 2 ** retries)
+
+class RateLimitGate:
+    """Shared pause: a 429 on any worker holds every worker's next graph run until the window passes"""
+
+    def __init__(self):
+        self.resume_at = 0.0
+        self.hits = 0
+
+    def hold(self, seconds: float):
+        self.hits += 1
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        while (delay := self.resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+def safe_name(request_id: str):
+    return re.sub(r"[^\w.-]", "_", request_id)[:100] or "request"
+
+class BatchRunner:
+    """Runs text requests through one compiled async graph with a bounded pool of workers.
+
+    Every request gets its own thread_id (batch-<run>-<id>) and workspace
+    (<workspace_root>/<id>/ai_solution). Rate limits (429) pause every worker for
+    the provider's retry-after, or an exponential backoff with jitter; transient
+    5xx and connection errors are retried by the failing request alone. Retries
+    resume from the request's last checkpoint instead of starting over, and so
+    does a rerun after a crash: finished requests are skipped by their result
+    line, interrupted ones continue from MongoDB. One JSON result per request
+    is appended to `output` as soon as it finishes. With workspaces (the
+    graph's WorkspaceManager) the request runs in <workspace>/turn-0001 and
+    links its files from the shared artifact store, so requests that produce
+    identical files store them once.
+    """
+
+    def __init__(self, graph, checkpointer, checkpoint_policy, metrics: Metrics, run: str, workspace_root: str,
+                 output, workers: int = 4, max_retries: int = 6, backoff: float = 1.0, max_backoff: float = 60.0,
+                 progress: bool = True, workspaces=None):
+        self.graph = graph
+        self.checkpointer = checkpointer
+        self.checkpoint_policy = checkpoint_policy
+        self.metrics = metrics
+        self.run = run
+        self.workspace_root = workspace_root
+        self.output = output
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.progress = progress
+        self.workspaces = workspaces
+        self.gate = RateLimitGate()
+        self.results = []
+
+    def thread_id(self, request_id: str):
+        return f"batch-{self.run}-{request_id}"
+
+    def config(self, request_id: str, callbacks: list):
+        workspace = os.path.abspath(os.path.join(self.workspace_root, safe_name(request_id), "ai_solution"))
+        return {"configurable": {"thread_id": self.thread_id(request_id), "workspace": workspace},
+                "callbacks": callbacks}
+
+    async def run_all(self, requests: list):
+        """Runs (id, text) requests; returns their results in completion order"""
+        queue = asyncio.Queue()
+        for request in requests:
+            queue.put_nowait(request)
+        total = len(requests)
+
+        async def work():
+            while not queue.empty():
+                request_id, text = queue.get_nowait()
+                result = await self.run_request(request_id, text)
+                self.results.append(result)
+                self.write(result)
+                if not self.progress:
+                    continue
+                mark = {"ok": "✅", "failed": "⚠️", "rejected": "🚫"}.get(result["status"], "❌")
+                print(f"{mark} [{len(self.results)}/{total}] {request_id}: {result['status']} "
+                      f"in {result['seconds']:.1f}s" + (f" ({result['retries']} retries)" if result["retries"] else ""),
+                      file=sys.stderr, flush=True)
+
+        await asyncio.gather(*(work() for _ in range(min(self.workers, total))))
+        return self.results
+
+    def write(self, result: dict):
+        self.output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+    async def _start_state(self, config: dict, text: str):
+        """None to continue the thread's interrupted run, else a fresh turn for text"""
+        snapshot = await self.graph.aget_state(config)
+        return None if snapshot.next else initial_state_for(text)
+
+    async def run_request(self, request_id: str, text: str):
+        request_metrics = Metrics()
+        config = self.config(request_id, [self.metrics.callback, request_metrics.callback])
+        thread_id = config["configurable"]["thread_id"]
+        started = time.perf_counter()
+        snapshot = await self.graph.aget_state(config)
+        if self.workspaces is not None:
+            # A rerun continues in the turn directory the crashed or finished run used
+            config = await asyncio.to_thread(self.workspaces.begin_turn, config,
+                                             resume=bool(snapshot.next or snapshot.values))
+        result = {"id": request_id, "thread_id": thread_id, "workspace": config["configurable"]["workspace"]}
+        result["resumed"] = bool(snapshot.next)
+        retries = 0
+        if snapshot.values and not snapshot.next:
+            # Finished before a crash that lost only its result line
+            final = snapshot.values
+        else:
+            state = None if snapshot.next else initial_state_for(text)
+            while True:
+                await self.gate.wait()
+                try:
+                    with request_metrics.graph_run(request=request_id):
+                        final = await self.graph.ainvoke(state, config, **self.checkpoint_policy.stream_kwargs())
+                    await self.checkpoint_policy.afinish_turn(self.checkpointer, thread_id)
+                    break
+                except Exception as e:
+                    # Keep what the run got through (held by --checkpoint-every) for the retry to resume from
+                    await self.checkpoint_policy.afinish_turn(self.checkpointer, thread_id)
+                    delay = retry_delay(e, retries, self.backoff, self.max_backoff)
+                    if delay is None or retries >= self.max_retries:
+                        return self._finish(result, started, request_metrics, retries,
+                                            status="error", error=f"{type(e).__name__}: {e}")
+                    if status_code(e) == 429:
+                        self.gate.hold(delay)
+                    else:
+                        await asyncio.sleep(delay)
+                    retries += 1
+                    state = await self._start_state(config, text)
+        return self._finish(result, started, request_metrics, retries, **outcome(final))
+
+    def _finish(self, result: dict, started: float, request_metrics: Metrics, retries: int, **fields):
+        graph_runs = [e for e in request_metrics.events if e["stage"] == "graph"]
+        # One graph event per attempt, each with that attempt's totals
+        result.update(fields)
+        result.update({
+            "seconds": round(time.perf_counter() - started, 3),
+            "attempts": len(graph_runs),
+            "retries": retries,
+            "llm_calls": sum(e.get("llm_calls", 0) for e in graph_runs),
+            "prompt_tokens": sum(e.get("prompt_tokens", 0) for e in graph_runs),
+            "completion_tokens": sum(e.get("completion_tokens", 0) for e in graph_runs),
+            "finished_at": time.time(),
+        })
+        self.metrics.record("request", result["seconds"], request=result["id"], status=result["status"],
+                            retries=retries)
+        return result
+
+def outcome(final: dict):
+    """status, reply, plan and failed runs of a finished graph state"""
+    plan = final.get("plan") or []
+    messages = final.get("messages") or []
+    failed = failed_runs(messages)
+    if plan and plan[0] == "REJECT_NON_PROGRAMMING":
+        status = "rejected"
+    else:
+        status = "failed" if failed else "ok"
+    return {"status": status, "text": messages[-1].content if messages else "", "plan": plan,
+            "failed_runs": [{"command": command, "error": error_summary(result)} for command, result in failed.items()]}
+
+def summarize_batch(results: list, seconds: float, gate: RateLimitGate):
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    durations = sorted(r["seconds"] for r in results) or [0.0]
+    return {
+        "requests": len(results),
+        "statuses": statuses,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(results) / seconds, 3) if seconds else 0.0,
+        "p50": statistics.median(durations),
+        "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        "retries": sum(r["retries"] for r in results),
+        "rate_limited": gate.hits,
+        "resumed": sum(1 for r in results if r.get("resumed")),
+    }
+
+async def run_batch(args, graph_options: GraphOptions, checkpoint_policy: CheckpointPolicy, requests: list, output):
+    # Tool calls run in the default executor; size it for the worker pool
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+    if args.memory:
+        from langgraph.checkpoint.memory import MemorySaver
+        return await run_with_saver(args, graph_options, checkpoint_policy, MemorySaver(), requests, output)
+    async with AsyncMongoDBSaver.from_conn_string(args.mongodb_uri) as saver:
+        return await run_with_saver(args, graph_options, checkpoint_policy, saver, requests, output)
+
+async def run_with_saver(args, graph_options: GraphOptions, checkpoint_policy: CheckpointPolicy, saver, requests: list,
+                         output):
+    checkpointer = checkpoint_policy.wrap(instrument_checkpointer(saver, metrics))
+    graph = create_chat_graph(checkpointer=checkpointer, is_async=True, options=graph_options)
+    runner = BatchRunner(graph, checkpointer, checkpoint_policy, metrics, args.run,
+                         os.path.join(args.out_dir, args.run), output, workers=args.workers,
+                         max_retries=args.max_retries, backoff=args.backoff, max_backoff=args.max_backoff,
+                         workspaces=graph_options.workspaces)
+    started = time.perf_counter()
+    results = await runner.run_all(requests)
+    return summarize_batch(results, time.perf_counter() - started, runner.gate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a JSONL corpus of text requests through the graph, headless")
+    parser.add_argument("inputs", nargs="+", help='JSONL files of requests ("-" for stdin)')
+    parser.add_argument("--field", help="JSON field holding the prompt (default: prompt, query, text, else title + body)")
+    parser.add_argument("--id-field", help="JSON field holding the request id (default: request_id or id)")
+    parser.add_argument("--run", help="run name; rerun with the same name to resume (default: first input's name)")
+    parser.add_argument("--out-dir", default="batch_runs", help="results and workspaces go to <out-dir>/<run>/")
+    parser.add_argument("--output", help="result JSONL, '-' for stdout (default: <out-dir>/<run>/results.jsonl)")
+    parser.add_argument("--limit", type=int, help="run only the first N requests")
+    parser.add_argument("--workers", type=int, default=4, help="requests running at once")
+    parser.add_argument("--max-retries", type=int, default=6, help="retries per request for 429s and transient errors")
+    parser.add_argument("--backoff", type=float, default=1.0, help="first retry delay in seconds, doubled each retry")
+    parser.add_argument("--max-backoff", type=float, default=60.0, help="longest retry delay in seconds")
+    parser.add_argument("--threads", type=int, default=32, help="threads for tool calls")
+    parser.add_argument("--mongodb-uri", default=MONGODB_URI, help="checkpoint store that makes runs resumable")
+    parser.add_argument("--memory", action="store_true", help="keep checkpoints in memory (no resume after a crash)")
+    add_graph_arguments(parser)
+    args = parser.parse_args()
+    metrics.path = args.metrics
+    if args.run is None:
+        first = args.inputs[0]
+        args.run = "stdin" if first == "-" else os.path.splitext(os.path.basename(first))[0]
+    output_path = args.output or os.path.join(args.out_dir, args.run, "results.jsonl")
+
+    requests = read_requests(args.inputs, args.field, args.id_field)[:args.limit]
+    done = finished_ids(output_path)
+    pending = [request for request in requests if request[0] not in done]
+    print(f"📦 Batch {args.run}: {len(pending)} requests to run, {len(requests) - len(pending)} already finished",
+          file=sys.stderr)
+    graph_options, checkpoint_policy = graph_options_from_args(args)
+
+    if args.sandbox_workers > 0:
+        start_worker_pool(args.sandbox_workers)
+    if output_path != "-":
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    output = sys.stdout if output_path == "-" else open(output_path, "a", encoding="utf-8")
+    try:
+        summary = asyncio.run(run_batch(args, graph_options, checkpoint_policy, pending, output))
+        print(f"📦 {summary['requests']} requests in {summary['seconds']:.1f}s "
+              f"({summary['requests_per_second']:.2f}/s, p50 {summary['p50']:.1f}s, p95 {summary['p95']:.1f}s): "
+              + ", ".join(f"{count} {status}" for status, count in sorted(summary["statuses"].items()))
+              + f"; {summary['retries']} retries, {summary['rate_limited']} rate limited, "
+              f"{summary['resumed']} resumed from checkpoints", file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"\n📦 Batch interrupted; rerun the same command to resume {args.run}.", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        stop_worker_pool()
+        if args.metrics:
+            metrics.print_summary()
@@ -0,0 +1,235 @@
+import collections
+import json
+import time
+import numpy as np
+import speech_recognition as sr
+from typing_extensions import TypedDict
+
+SAMPLE_RATE = 16000      # what the offline engines and WebRTC VAD expect
+FRAME_MS = 30
+HANGOVER_MS = 300        # silence that ends an utterance (was pause_threshold = 3 s)
+PREROLL_MS = 300         # audio kept from before the onset, so the first syllable isn't clipped
+ONSET_MS = 90            # consecutive speech needed to start an utterance (ignores clicks)
+
+class CaptureResult(TypedDict):
+    text: str
+    speech_seconds: float    # length of the captured utterance
+    trailing_seconds: float  # audio consumed after the last speech frame (the hangover)
+    finish_seconds: float    # recogniser time after end of speech
+    ended_at: float          # perf_counter() when end of speech was detected
+
+def _samples(frame: bytes):
+    return np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+
+def to_16_bit(frame: bytes, sample_width: int):
+    """Converts little-endian PCM of any sample width to 16-bit"""
+    if sample_width == 2:
+        return frame
+    return sr.AudioData(frame, SAMPLE_RATE, sample_width).get_raw_data(convert_width=2)
+
+# Voice activity detectors: is_speech(frame, sample_rate) on 16-bit mono PCM frames
+
+class EnergyVAD:
+    """Speech = frame RMS above `ratio` x the noise floor.
+
+    The floor is learnt by calibrate() and keeps adapting on non-speech frames,
+    like sr.Recognizer's dynamic energy threshold but per frame.
+    """
+
+    def __init__(self, ratio: float = 3.0, min_rms: float = 200.0, adapt: float = 0.05):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.adapt = adapt
+        self.noise_floor = min_rms / ratio
+
+    def calibrate(self, frames: list):
+        if frames:
+            self.noise_floor = float(np.median([np.sqrt(np.mean(_samples(f) ** 2)) for f in frames]))
+
+    def is_speech(self, frame: bytes, sample_rate: int):
+        rms = float(np.sqrt(np.mean(_samples(frame) ** 2))) if frame else 0.0
+        speech = rms > max(self.min_rms, self.noise_floor * self.ratio)
+        if not speech:
+            self.noise_floor += self.adapt * (rms - self.noise_floor)
+        return speech
+
+class WebRTCVAD:
+    """Google's WebRTC VAD (pip install webrtcvad); needs 10/20/30 ms frames at 8/16/32/48 kHz"""
+
+    def __init__(self, aggressiveness: int = 2):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def calibrate(self, frames: list):
+        pass
+
+    def is_speech(self, frame: bytes, sample_rate: int):
+        return self.vad.is_speech(frame, sample_rate)
+
+def make_vad(kind: str = "energy"):
+    return WebRTCVAD() if kind == "webrtc" else EnergyVAD()
+
+# Recognisers: start(sample_rate), feed(frame) → partial transcript or None, finish() → final text.
+# finish() raises sr.UnknownValueError when nothing was recognised, like recognize_google.
+
+class GoogleRecognizer:
+    """Buffers the utterance and uploads it to recognize_google when it ends (network round trip)"""
+
+    def __init__(self, recognizer: sr.Recognizer = None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def start(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.frames = []
+
+    def feed(self, frame: bytes):
+        self.frames.append(frame)
+        return None
+
+    def finish(self):
+        return self.recognizer.recognize_google(sr.AudioData(b"".join(self.frames), self.sample_rate, 2))
+
+class VoskRecognizer:
+    """Offline streaming recognition with Vosk (pip install vosk); decodes while the user speaks.
+
+    model_path is an unpacked model directory; without one Vosk downloads its small en-us model.
+    """
+
+    def __init__(self, model_path: str = None):
+        from vosk import KaldiRecognizer, Model, SetLogLevel
+        SetLogLevel(-1)
+        self._recognizer_class = KaldiRecognizer
+        self.model = Model(model_path) if model_path else Model(lang="en-us")
+
+    def start(self, sample_rate: int):
+        self.recognizer = self._recognizer_class(self.model, sample_rate)
+        self.segments = []
+
+    def feed(self, frame: bytes):
+        if self.recognizer.AcceptWaveform(frame):
+            self.segments.append(json.loads(self.recognizer.Result()).get("text", ""))
+            return " ".join(s for s in self.segments if s)
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(s for s in self.segments + [partial] if s)
+
+    def finish(self):
+        self.segments.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        text = " ".join(s for s in self.segments if s)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+class WhisperRecognizer:
+    """Offline recognition with whisper.cpp (pip install pywhispercpp); transcribes locally when the utterance ends"""
+
+    def __init__(self, model: str = "base.en", threads: int = 4):
+        from pywhispercpp.model import Model
+        self.model = Model(model, n_threads=threads, print_progress=False, print_realtime=False)
+
+    def start(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.frames = []
+
+    def feed(self, frame: bytes):
+        self.frames.append(frame)
+        return None
+
+    def finish(self):
+        samples = _samples(b"".join(self.frames)) / 32768.0
+        if self.sample_rate != SAMPLE_RATE and len(samples):
+            positions = np.arange(0, len(samples), self.sample_rate / SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        text = " ".join(segment.text.strip() for segment in self.model.transcribe(samples)).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+def make_recognizer(engine: str = "google", model: str = None):
+    if engine == "vosk":
+        return VoskRecognizer(model)
+    if engine == "whisper":
+        return WhisperRecognizer(model or "base.en")
+    return GoogleRecognizer()
+
+class VoiceCapture:
+    """Microphone → frame VAD → streaming recogniser, for one utterance at a time.
+
+    An utterance starts after ONSET_MS of consecutive speech (plus PREROLL_MS
+    of audio before it) and ends after `hangover_ms` of non-speech, instead of
+    sr.Recognizer.listen's pause_threshold. Frames go to the recogniser as they
+    arrive; `on_partial` gets each new partial transcript. Works with any
+    speech_recognition source (sr.Microphone, sr.AudioFile).
+    """
+
+    def __init__(self, recognizer, vad=None, frame_ms: int = FRAME_MS, hangover_ms: int = HANGOVER_MS,
+                 preroll_ms: int = PREROLL_MS, onset_ms: int = ONSET_MS, timeout: float = 10,
+                 phrase_time_limit: float = 10, on_partial=None):
+        self.recognizer = recognizer
+        self.vad = vad or EnergyVAD()
+        self.frame_ms = frame_ms
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.preroll_frames = max(1, preroll_ms // frame_ms)
+        self.onset_frames = max(1, onset_ms // frame_ms)
+        self.timeout_frames = int(timeout * 1000 / frame_ms)
+        self.limit_frames = int(phrase_time_limit * 1000 / frame_ms)
+        self.on_partial = on_partial
+
+    def frames(self, source):
+        """16-bit frames of `frame_ms` from an open source until the stream ends"""
+        size = source.SAMPLE_RATE * self.frame_ms // 1000
+        while True:
+            frame = source.stream.read(size)
+            if len(frame) < size * source.SAMPLE_WIDTH:
+                return
+            yield to_16_bit(frame, source.SAMPLE_WIDTH)
+
+    def calibrate(self, source, seconds: float = 0.5):
+        """Learns the noise floor from `seconds` of background audio"""
+        frames = []
+        for frame in self.frames(source):
+            frames.append(frame)
+            if len(frames) * self.frame_ms >= seconds * 1000:
+                break
+        self.vad.calibrate(frames)
+
+    def listen(self, source) -> CaptureResult:
+        """Captures and recognises one utterance; raises sr.WaitTimeoutError if nobody speaks within `timeout`"""
+        rate = source.SAMPLE_RATE
+        preroll = collections.deque(maxlen=self.preroll_frames)
+        waited = voiced = silent = captured = 0
+        partial = None
+        started = False
+        for frame in self.frames(source):
+            speech = self.vad.is_speech(frame, rate)
+            if not started:
+                preroll.append(frame)
+                voiced = voiced + 1 if speech else 0
+                waited += 1
+                if voiced >= self.onset_frames:
+                    started = True
+                    self.recognizer.start(rate)
+                    for buffered in preroll:
+                        partial = self._feed(buffered, partial)
+                    captured = len(preroll)
+                elif waited >= self.timeout_frames:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                continue
+            partial = self._feed(frame, partial)
+            captured += 1
+            silent = 0 if speech else silent + 1
+            if silent >= self.hangover_frames or captured >= self.limit_frames:
+                break
+        if not started:
+            raise sr.WaitTimeoutError("audio ended before a phrase started")
+
+        ended_at = time.perf_counter()
+        text = self.recognizer.finish()
+        return CaptureResult(text=text, speech_seconds=captured * self.frame_ms / 1000,
+                             trailing_seconds=silent * self.frame_ms / 1000,
+                             finish_seconds=round(time.perf_counter() - ended_at, 4), ended_at=ended_at)
+
+    def _feed(self, frame: bytes, partial):
+        text = self.recognizer.feed(frame)
+        if text and text != partial and self.on_partial is not None:
+            self.on_partial(text)
+        return text or partial
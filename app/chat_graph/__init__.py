@@ -0,0 +1,16 @@
+"""The assistant's LangGraph graph.
+
+One graph for every platform: a backend (chat_graph.backends) runs commands and
+writes files, a versioned prompt set (chat_graph/prompt_sets) supplies the
+prompts, and GraphOptions picks both together with the model (plus cheaper
+per-role models, chat_graph.tiers) and fast paths.
+"""
+from chat_graph.backends import BACKENDS, Backend, backend_for
+from chat_graph.templates import PromptSet, available_prompt_sets, load_prompt_set
+from chat_graph.tiers import ROLES, ModelTier
+from chat_graph.nodes import DEFAULT_MODEL, GraphRuntime, State, summary_update
+from chat_graph.builder import GraphOptions, build_graph, create_chat_graph, runtime_for
+
+__all__ = ["BACKENDS", "Backend", "backend_for", "PromptSet", "available_prompt_sets", "load_prompt_set",
+           "ROLES", "ModelTier", "DEFAULT_MODEL", "GraphRuntime", "State", "summary_update", "GraphOptions",
+           "build_graph", "create_chat_graph", "runtime_for"]
@@ -0,0 +1,95 @@
+import os
+import re
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from file_writer import write_batch, write_files
+from sandbox import run_sandboxed, workspace_for
+from workspace import artifact_store_for, may_write, unshare
+
+class Backend:
+    """How a graph executes commands and creates files on its platform.
+
+    tools() are bound to the step model; run_command_template is what the rule
+    executor dispatches for canonical run steps, and mkdir_command what the
+    step prompt names (the rule executor records it for directory steps but
+    creates the workspace itself). default_prompts is the prompt set the
+    backend was written against.
+    """
+
+    name = None
+    mkdir_command = None
+    run_command_template = "python {file}"
+    default_prompts = None
+    run_command_description = None
+
+    def run_command(self, command: str, config: RunnableConfig = None):
+        workspace = workspace_for(config)
+        if artifact_store_for(config) is not None and os.path.isdir(workspace) and may_write(command):
+            # Scripts may write files in place, which must not reach the store's shared objects
+            unshare(workspace)
+        return run_sandboxed(command, cwd=workspace)
+
+    def tools(self):
+        backend = self
+
+        @tool("run_command", description=self.run_command_description)
+        def run_command(command: str, config: RunnableConfig):
+            try:
+                return backend.run_command(command, config)
+            except Exception as e:
+                return f"❌ Error executing command: {str(e)}"
+
+        return [run_command, write_files]
+
+class PosixBackend(Backend):
+    """Commands run through the POSIX shell, so heredocs and `mkdir -p` work"""
+
+    name = "posix"
+    mkdir_command = "mkdir -p ai_solution"
+    default_prompts = "directive-v2"
+    run_command_description = """
+    Takes a command line prompt and executes it inside the ai_solution workspace and
+    returns a structured result: exit_code, stdout, stderr, duration, truncated, timed_out.
+    Paths starting with ai_solution/ are resolved inside the workspace.
+    Example:
+    run_command(command="ls") where ls is the command to list the files.
+    """
+
+class PortableBackend(Backend):
+    """Commands that work on Windows too: directories via Python, files via write_files.
+
+    The legacy create_file("path", "contents") command is still accepted, for
+    plans cached or replayed from before write_files.
+    """
+
+    name = "portable"
+    # Commands run inside the workspace, and quoted code is not rewritten by jail_command
+    mkdir_command = "python -c \"import os; os.makedirs('.', exist_ok=True)\""
+    default_prompts = "concise-v2"
+    run_command_description = """
+    Executes a shell command inside the ai_solution workspace and returns exit_code, stdout,
+    stderr, duration, truncated and timed_out. Use write_files to create files.
+    """
+
+    def run_command(self, command: str, config: RunnableConfig = None):
+        if not command.startswith("create_file("):
+            return super().run_command(command, config)
+        match = re.match(r'create_file\(["\'](.+?)["\'],\s*["\']([\s\S]*?)["\']\)', command)
+        if not match:
+            return "Invalid create_file format."
+        filepath, content = match.groups()
+        result = write_batch([{"path": filepath, "content": content}], workspace_for(config),
+                             artifact_store_for(config))
+        if result["errors"]:
+            return f"❌ Error creating file: {result['errors'][0]['error']}"
+        return f"✅ File '{filepath}' created successfully."
+
+BACKENDS = {backend.name: backend for backend in (PosixBackend, PortableBackend)}
+
+def backend_for(name: str):
+    """A Backend instance by name; "auto" picks posix on POSIX systems and portable elsewhere"""
+    if name == "auto":
+        name = "posix" if os.name == "posix" else "portable"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}, expected one of: auto, {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
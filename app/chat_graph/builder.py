@@ -0,0 +1,244 @@
+import functools
+from dataclasses import dataclass, fields, replace
+from typing import Any
+from langgraph.graph import StateGraph, START, END
+from prerouter import route_after_prerouter
+from plan_cache import route_after_cache
+from dag import StepScheduler
+from chat_graph.nodes import (DEFAULT_MODEL, GraphRuntime, State, should_continue_after_tools, should_continue_execution,
+                              should_repair_after_tools)
+
+@dataclass
+class GraphOptions:
+    """Everything create_chat_graph needs to know besides the checkpointer.
+
+    model, backend and prompts pick the GraphRuntime (see chat_graph.nodes);
+    models maps node roles (classify, plan, shell, code; see chat_graph.tiers)
+    to smaller models that escalate to model on parse failures and failed runs.
+    The rest are build_graph's fast-path flags:
+    fused_planner replaces enhance_query → create_plan with the single plan_task node.
+    prerouter (e.g. prerouter.PreRouter()) runs in front of the planner and sends
+    confident local rejections straight to generate_summary without any LLM call.
+    plan_cache (a plan_cache.PlanCache) is checked once the query is enhanced (with
+    fused_planner: on the request, before plan_task); a hit skips create_plan (or
+    plan_task) and replays the cached tool calls in execute_step.
+    rule_executor dispatches canonical mkdir/run steps to run_command without an LLM call.
+    parallel_steps has the planner emit step dependencies and replaces the
+    execute_step ⇄ tools loop with schedule_steps, which runs each step (with its
+    tools) as soon as its prerequisites are done, at most max_concurrency at a time.
+    history_compactor (a checkpointing.HistoryCompactor) runs after the summary and
+    folds old turns into one summary message before the turn's final checkpoint.
+    message_budget (a context_budget.MessageBudget) clips tool outputs before they
+    enter the state and trims every step prompt to its token budget.
+    max_repairs > 0 sends a failed `python <file>.py` run to repair_run, which asks
+    for patch edits to the failing lines and reruns it, up to max_repairs times.
+    workspaces (a workspace.WorkspaceManager) adds index_artifacts before the summary,
+    which records the turn's files in the checkpointed content-hash index; callers
+    then run every turn with workspaces.begin_turn(config).
+    """
+
+    model: Any = DEFAULT_MODEL
+    backend: str = "portable"
+    prompts: str = None
+    models: dict = None
+    fused_planner: bool = False
+    prerouter: Any = None
+    plan_cache: Any = None
+    rule_executor: bool = False
+    parallel_steps: bool = False
+    max_concurrency: int = 4
+    history_compactor: Any = None
+    message_budget: Any = None
+    max_repairs: int = 0
+    workspaces: Any = None
+
+    def runtime(self):
+        return runtime_for(self.model, self.backend, self.prompts, self.models)
+
+    def flags(self):
+        """The fast-path flags, i.e. build_graph's keyword arguments"""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name not in RUNTIME_FIELDS}
+
+    def describe(self):
+        """Short label of the non-default options, for logs and benchmark tables"""
+        default = GraphOptions()
+        changed = [f"{name}={_label(value)}" if not isinstance(value, bool) else name
+                   for name, value in ((f.name, getattr(self, f.name)) for f in fields(self))
+                   if value != getattr(default, name) and value not in (None, False)]
+        return ", ".join(changed) or "defaults"
+
+def _label(value):
+    """Short form of an option value: model instances by their model name, objects by their class"""
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {_label(item)}" for key, item in value.items()) + "}"
+    if isinstance(value, (str, int, float)):
+        return value
+    return getattr(value, "model_name", None) or getattr(value, "model", None) or type(value).__name__
+
+RUNTIME_FIELDS = {"model", "backend", "prompts", "models"}
+_runtimes = {}
+
+def _model_key(model):
+    return model if isinstance(model, str) else id(model)
+
+def runtime_for(model=DEFAULT_MODEL, backend: str = "portable", prompts: str = None, models: dict = None):
+    """The shared GraphRuntime of a model / backend / prompt set / node models combination"""
+    key = (_model_key(model), backend, prompts,
+           tuple(sorted((role, _model_key(tier)) for role, tier in (models or {}).items())))
+    if key not in _runtimes:
+        _runtimes[key] = GraphRuntime(model, backend, prompts, models)
+    return _runtimes[key]
+
+def build_graph(runtime: GraphRuntime, is_async: bool = False, fused_planner: bool = False, prerouter=None,
+                plan_cache=None, rule_executor: bool = False, parallel_steps: bool = False, max_concurrency: int = 4,
+                history_compactor=None, message_budget=None, max_repairs: int = 0, workspaces=None):
+    """Builds the graph from runtime's nodes: sync ones, or ainvoke-based ones when is_async is set.
+
+    The flags are GraphOptions' fast paths.
+    """
+    graph_builder = StateGraph(State)
+
+    # Add nodes
+    if prerouter is not None:
+        graph_builder.add_node("prerouter", prerouter)
+    if fused_planner:
+        graph_builder.add_node("plan_task", runtime.aplan_task if is_async else runtime.plan_task)
+    else:
+        graph_builder.add_node("enhance_query", runtime.aenhance_query if is_async else runtime.enhance_query)
+        graph_builder.add_node("create_plan", functools.partial(runtime.acreate_plan if is_async else runtime.create_plan,
+                                                                with_dependencies=parallel_steps))
+    if plan_cache is not None:
+        # The fused planner has no enhanced query to key on: the cache is checked on the request, before planning
+        cache_key = "request" if fused_planner else "enhanced_query"
+        graph_builder.add_node("check_plan_cache", functools.partial(plan_cache.check_node, key=cache_key))
+        graph_builder.add_node("store_plan_cache", functools.partial(plan_cache.store_node, key=cache_key))
+    summary_node = "index_artifacts" if workspaces is not None else "generate_summary"
+    complete_node = "store_plan_cache" if plan_cache is not None else summary_node
+    if parallel_steps:
+        run_step = functools.partial(runtime.arun_step if is_async else runtime.run_step,
+                                     rule_executor=rule_executor, budget=message_budget, max_repairs=max_repairs)
+        scheduler = StepScheduler(run_step, max_concurrency)
+        execution_node = "schedule_steps"
+        graph_builder.add_node("schedule_steps", scheduler.arun_node if is_async else scheduler.run_node)
+    else:
+        execution_node = "execute_step"
+        graph_builder.add_node("execute_step", functools.partial(
+            runtime.aexecute_step if is_async else runtime.execute_step,
+            rule_executor=rule_executor, budget=message_budget))
+        tool_node = runtime.tool_node
+        graph_builder.add_node("tools", message_budget.tool_node(tool_node) if message_budget is not None else tool_node)
+        if max_repairs:
+            graph_builder.add_node("repair_run", functools.partial(
+                runtime.arepair_run if is_async else runtime.repair_run,
+                max_repairs=max_repairs, budget=message_budget))
+    if workspaces is not None:
+        graph_builder.add_node("index_artifacts", workspaces.index_node)
+    graph_builder.add_node("generate_summary", runtime.agenerate_summary_and_speak if is_async
+                           else runtime.generate_summary_and_speak)
+
+    # Add edges
+    if fused_planner:
+        first_node = "check_plan_cache" if plan_cache is not None else "plan_task"
+    else:
+        first_node = "enhance_query"
+    if prerouter is not None:
+        graph_builder.add_edge(START, "prerouter")
+        graph_builder.add_conditional_edges(
+            "prerouter",
+            route_after_prerouter,
+            {
+                "plan": first_node,             # Programming or ambiguous: let the LLM decide
+                "reject": summary_node          # Clear non-programming query, no API call
+            }
+        )
+    else:
+        graph_builder.add_edge(START, first_node)
+
+    if fused_planner and plan_cache is not None:
+        graph_builder.add_conditional_edges(
+            "check_plan_cache",
+            route_after_cache,
+            {
+                "hit": execution_node,   # Replay the cached plan and tool calls, no planner call
+                "miss": "plan_task"
+            }
+        )
+        graph_builder.add_edge("plan_task", execution_node)
+    elif fused_planner:
+        graph_builder.add_edge("plan_task", execution_node)
+    elif plan_cache is not None:
+        graph_builder.add_edge("enhance_query", "check_plan_cache")
+        graph_builder.add_conditional_edges(
+            "check_plan_cache",
+            route_after_cache,
+            {
+                "hit": execution_node,   # Replay the cached plan and tool calls
+                "miss": "create_plan"
+            }
+        )
+        graph_builder.add_edge("create_plan", execution_node)
+    else:
+        graph_builder.add_edge("enhance_query", "create_plan")
+        graph_builder.add_edge("create_plan", execution_node)
+
+    # Add conditional edges for execution flow
+    if parallel_steps:
+        # Every step has run (or cannot) once schedule_steps returns
+        graph_builder.add_edge("schedule_steps", complete_node)
+    else:
+        graph_builder.add_conditional_edges(
+            "execute_step",
+            should_continue_execution,
+            {
+                "continue": "execute_step",  # Loop back to execute next step
+                "tools": "tools",            # Go to tools if tool calls are needed
+                "complete": complete_node
+            }
+        )
+        if max_repairs:
+            graph_builder.add_conditional_edges(
+                "tools",
+                should_repair_after_tools,
+                {
+                    "repair": "repair_run",      # A script run failed: patch and rerun it
+                    "continue": "execute_step",
+                    "complete": complete_node
+                }
+            )
+        graph_builder.add_conditional_edges(
+            "repair_run" if max_repairs else "tools",
+            should_continue_after_tools,
+            {
+                "continue": "execute_step",  # After tools, continue execution
+                "complete": complete_node
+            }
+        )
+    if plan_cache is not None:
+        graph_builder.add_edge("store_plan_cache", summary_node)
+    if workspaces is not None:
+        graph_builder.add_edge("index_artifacts", "generate_summary")
+    if history_compactor is not None:
+        graph_builder.add_node("compact_history", history_compactor)
+        graph_builder.add_edge("generate_summary", "compact_history")
+        graph_builder.add_edge("compact_history", END)
+    else:
+        graph_builder.add_edge("generate_summary", END)
+    return graph_builder
+
+def create_chat_graph(checkpointer, is_async: bool = False, options: GraphOptions = None, **overrides):
+    """Compiles the graph for options (GraphOptions; keyword overrides replace single fields).
+
+    Pass is_async=True together with an AsyncMongoDBSaver to get ainvoke-based
+    nodes; drive that graph with astream/ainvoke. The builder of a runtime's
+    default graph is built once and reused.
+    """
+    options = replace(options or GraphOptions(), **overrides)
+    runtime = options.runtime()
+    flags = options.flags()
+    if any(value != getattr(GraphOptions, name) for name, value in flags.items()):
+        builder = build_graph(runtime, is_async, **flags)
+    else:
+        if is_async not in runtime.default_builders:
+            runtime.default_builders[is_async] = build_graph(runtime, is_async)
+        builder = runtime.default_builders[is_async]
+    return builder.compile(checkpointer=checkpointer)
@@ -0,0 +1,388 @@
+import asyncio
+import re
+from typing import Annotated, Literal
+from typing_extensions import TypedDict
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode
+from planner import PlannedTask, planned_task_update
+from plan_cache import replay_step
+from step_rules import is_shell_step, record_path, rule_step
+from speculation import prefilled
+from prompts import STEP_CACHE_KEY, request_update, step_messages, user_request
+from dag import DEPENDENCY_INSTRUCTIONS, completed_entry, merge_completed_steps, split_dependencies
+from file_writer import patch_file
+from repair import apply_patch_calls, error_summary, failed_runs, failed_script_run, repair_request, rerun_messages
+from sandbox import workspace_for
+from workspace import artifact_store_for, merge_artifacts
+from chat_graph.backends import backend_for
+from chat_graph.templates import MAX_SUMMARY_WORDS, load_prompt_set
+from chat_graph.tiers import ModelTier, init_model, tier_models
+
+load_dotenv()
+
+DEFAULT_MODEL = "openai:gpt-4o"
+NON_PROGRAMMING_QUERY = "NON_PROGRAMMING_QUERY"
+REJECT_NON_PROGRAMMING = "REJECT_NON_PROGRAMMING"
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+    enhanced_query: str
+    plan: list
+    current_step: int
+    execution_summary: str
+    awaiting_confirmation: bool
+    dangerous_command: str
+    cache_hit: bool
+    cached_tool_calls: list
+    cached_duration: float
+    plan_started_at: float
+    step_paths: list
+    step_deps: list
+    completed_steps: Annotated[list, merge_completed_steps]
+    speculated: list
+    original_request: str
+    artifacts: Annotated[dict, merge_artifacts]
+    turn_files: list
+    turn_workspace: str
+
+def parse_plan(plan_text: str):
+    """Parses the numbered plan text into the plan state update"""
+    plan_steps = []
+    for line in plan_text.split('\n'):
+        if line.strip() and (line.strip()[0].isdigit() or line.strip().startswith('-')):
+            step = re.sub(r'^\d+\.?\s*', '', line.strip())
+            step = re.sub(r'^-\s*', '', step.strip())
+            if step:
+                plan_steps.append(step)
+    # Strip "(after: ...)" annotations into per-step prerequisites
+    plan_steps, step_deps = split_dependencies(plan_steps)
+    return {"plan": plan_steps, "current_step": 0, "execution_summary": "", "step_deps": step_deps,
+            "completed_steps": None}
+
+def has_tool_calls(response):
+    """Whether a step response parsed into tool calls (a tiered step escalates otherwise)"""
+    return bool(getattr(response, "tool_calls", None)) and not getattr(response, "invalid_tool_calls", None)
+
+def planned_task_parsed(planned: PlannedTask):
+    return planned is not None and (not planned.is_programming or any(step.strip() for step in planned.steps))
+
+def summary_update(prompt_set, state: State):
+    """The spoken summary of a finished turn, from the prompt set's summary templates"""
+    plan = state.get("plan", [])
+    failed = failed_runs(state.get("messages") or [])
+    if plan and plan[0] == REJECT_NON_PROGRAMMING:
+        summary = prompt_set.render("summary_rejected")
+    elif failed:
+        # A failing test run is reported, not passed off as success
+        completed_steps = min(state.get("current_step", 0), len(plan))
+        summary = prompt_set.render("summary_failed", count=completed_steps, steps=", ".join(plan[:completed_steps]),
+                                    error=error_summary(list(failed.values())[-1]))
+    else:
+        completed_steps = min(state.get("current_step", 0), len(plan))
+        summary = prompt_set.render("summary_completed", count=completed_steps,
+                                    steps=", ".join(plan[:completed_steps]))
+        if len(summary.split()) > MAX_SUMMARY_WORDS and "summary_too_long" in prompt_set.sections:
+            summary = prompt_set.render("summary_too_long", count=completed_steps)
+    if state.get("turn_files") and plan and plan[0] != REJECT_NON_PROGRAMMING and "summary_files" in prompt_set.sections:
+        # Per-turn workspaces: name the turn's directory instead of ai_solution
+        summary += " " + prompt_set.render("summary_files", files=", ".join(state["turn_files"]),
+                                           directory=state.get("turn_workspace", ""))
+    return {"execution_summary": summary, "messages": [AIMessage(content=summary)]}
+
+def should_continue_execution(state: State) -> Literal["continue", "tools", "complete"]:
+    """Determine if we should continue execution, use tools, or complete"""
+    if state.get("awaiting_confirmation", False):
+        return "complete"
+    # Tool calls run even for the last step
+    if state.get("messages") and hasattr(state["messages"][-1], 'tool_calls') and state["messages"][-1].tool_calls:
+        return "tools"
+    current_step = state.get("current_step", 0)
+    plan = state.get("plan", [])
+    if not plan or current_step >= len(plan):
+        return "complete"
+    return "continue"
+
+def should_continue_after_tools(state: State) -> Literal["continue", "complete"]:
+    """After tool execution, go to the next step or finish if the plan is done"""
+    current_step = state.get("current_step", 0)
+    return "complete" if current_step >= len(state.get("plan", [])) else "continue"
+
+def should_repair_after_tools(state: State) -> Literal["repair", "continue", "complete"]:
+    """should_continue_after_tools, but a failed script run goes to repair_run first"""
+    if failed_script_run(state.get("messages") or []) is not None:
+        return "repair"
+    return should_continue_after_tools(state)
+
+class GraphRuntime:
+    """Chat model, backend and prompt set of a graph, with the graph's node functions.
+
+    model is an init_chat_model() id such as "openai:gpt-4o" or a chat model
+    instance; backend a chat_graph.backends name; prompts a prompt set such as
+    "concise-v1" (default: the backend's own). models moves node roles
+    (chat_graph.tiers.ROLES) to other, usually smaller, models: their calls
+    escalate to `model` when the output does not parse, and a turn's steps move
+    back to it once a script run failed; repairs always use `model`. Every
+    graph compiled from one runtime shares its model clients, so sessions share
+    one connection pool.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, backend: str = "portable", prompts: str = None, models: dict = None):
+        self.backend = backend_for(backend)
+        self.prompts = load_prompt_set(prompts or self.backend.default_prompts)
+        self.llm = init_model(model)
+        self.tools = self.backend.tools()
+        # A fixed cache key per prompt set keeps its static step prefix on one cache shard across turns and sessions
+        step_cache_key = f"{STEP_CACHE_KEY}-{self.prompts.name}"
+        self.llm_with_tools = self.llm.bind_tools(tools=self.tools, prompt_cache_key=step_cache_key)
+        self.planner_llm = self.llm.with_structured_output(PlannedTask)
+        tiers = tier_models(models, primary=model)
+
+        def tier(role: str, bind, primary):
+            return ModelTier(role, bind(tiers[role]), escalation=primary) if role in tiers else ModelTier(role, primary)
+
+        self.enhance_tier = tier("classify", lambda llm: llm, self.llm)
+        self.plan_tier = tier("plan", lambda llm: llm, self.llm)
+        self.planner_tier = tier("plan", lambda llm: llm.with_structured_output(PlannedTask), self.planner_llm)
+        step_llm = lambda llm: llm.bind_tools(tools=self.tools, prompt_cache_key=step_cache_key)
+        self.shell_tier = tier("shell", step_llm, self.llm_with_tools)
+        self.code_tier = tier("code", step_llm, self.llm_with_tools)
+        # Repairs may only patch files; their prompt is the error and the lines around it, not the conversation
+        self.repair_llm = self.llm.bind_tools(tools=[patch_file], tool_choice="patch_file",
+                                              prompt_cache_key=f"repair-{self.prompts.name}")
+        self.repair_system_prompt = SystemMessage(content=self.prompts.render("repair"))
+        self.tool_node = ToolNode(tools=self.tools)
+        # Static per-step instructions: no step-specific text, so tools + system prompt stay a cacheable prefix
+        self.step_system_prompt = SystemMessage(content=self.prompts.render(
+            "step", mkdir_command=self.backend.mkdir_command))
+        self.default_builders = {}
+
+    def spoken_phrases(self):
+        return self.prompts.spoken_phrases()
+
+    def _enhance_messages(self, state: State):
+        return [SystemMessage(content=self.prompts.render("enhance")),
+                HumanMessage(content=self.prompts.render("enhance_input", query=user_request(state)))]
+
+    def enhance_query(self, state: State):
+        """Understands and breaks down the user's query"""
+        # Already computed from the partial transcript
+        if prefilled(state, "enhance_query"):
+            return request_update(state)
+        response = self.enhance_tier.invoke(self._enhance_messages(state), accept=lambda r: bool(r.content.strip()))
+        return {"enhanced_query": response.content.strip(), **request_update(state)}
+
+    async def aenhance_query(self, state: State):
+        if prefilled(state, "enhance_query"):
+            return request_update(state)
+        response = await self.enhance_tier.ainvoke(self._enhance_messages(state),
+                                                    accept=lambda r: bool(r.content.strip()))
+        return {"enhanced_query": response.content.strip(), **request_update(state)}
+
+    def _plan_messages(self, enhanced_query: str, with_dependencies: bool = False):
+        """with_dependencies asks for "(after: ...)" annotations used by the parallel step scheduler"""
+        system = self.prompts.render("plan") + (DEPENDENCY_INSTRUCTIONS if with_dependencies else "")
+        return [SystemMessage(content=system),
+                HumanMessage(content=self.prompts.render("plan_input", enhanced_query=enhanced_query))]
+
+    def create_plan(self, state: State, with_dependencies: bool = False):
+        """Creates a step-by-step plan for solving the user's task"""
+        if prefilled(state, "create_plan"):
+            return {}
+        enhanced_query = state.get("enhanced_query", "")
+        if enhanced_query == NON_PROGRAMMING_QUERY:
+            return {"plan": [REJECT_NON_PROGRAMMING], "current_step": 0}
+        response = self.plan_tier.invoke(self._plan_messages(enhanced_query, with_dependencies),
+                                         accept=lambda r: bool(parse_plan(r.content.strip())["plan"]))
+        return parse_plan(response.content.strip())
+
+    async def acreate_plan(self, state: State, with_dependencies: bool = False):
+        if prefilled(state, "create_plan"):
+            return {}
+        enhanced_query = state.get("enhanced_query", "")
+        if enhanced_query == NON_PROGRAMMING_QUERY:
+            return {"plan": [REJECT_NON_PROGRAMMING], "current_step": 0}
+        response = await self.plan_tier.ainvoke(self._plan_messages(enhanced_query, with_dependencies),
+                                                accept=lambda r: bool(parse_plan(r.content.strip())["plan"]))
+        return parse_plan(response.content.strip())
+
+    def _plan_task_messages(self, state: State):
+        return [SystemMessage(content=self.prompts.render("plan_task")), HumanMessage(content=user_request(state))]
+
+    def plan_task(self, state: State):
+        """Fused enhance_query + create_plan: one structured-output call"""
+        if prefilled(state, "plan_task"):
+            return request_update(state)
+        planned = self.planner_tier.invoke(self._plan_task_messages(state), accept=planned_task_parsed)
+        return {**planned_task_update(planned), **request_update(state)}
+
+    async def aplan_task(self, state: State):
+        if prefilled(state, "plan_task"):
+            return request_update(state)
+        planned = await self.planner_tier.ainvoke(self._plan_task_messages(state), accept=planned_task_parsed)
+        return {**planned_task_update(planned), **request_update(state)}
+
+    def _step_precheck(self, state: State, rule_executor: bool, config: RunnableConfig = None):
+        """Returns the state update for steps that need no LLM call, else None"""
+        plan = state.get("plan", [])
+        current_step = state.get("current_step", 0)
+        if not plan:
+            return {"messages": [AIMessage(content="No plan available to execute.")]}
+        if plan[0] == REJECT_NON_PROGRAMMING:
+            return {
+                "messages": [AIMessage(content=self.prompts.render("precheck_rejected"))],
+                "execution_summary": "Non-programming query rejected",
+                "current_step": len(plan)  # Mark as completed to trigger summary
+            }
+        if current_step >= len(plan):
+            summary = self.prompts.render("precheck_completed", count=len(plan))
+            return {"execution_summary": summary, "current_step": current_step}
+        # Plan cache hit: replay the recorded tool calls instead of asking the model
+        replayed = replay_step(state)
+        if replayed is not None or not rule_executor:
+            return replayed
+        # Canonical mkdir/run steps go straight to run_command, no model round trip; mkdir runs right here
+        return rule_step(state, self.backend.mkdir_command, self.backend.run_command_template,
+                         workspace_for(config))
+
+    def _step_update(self, state: State, response):
+        return {"messages": [response], "current_step": state.get("current_step", 0) + 1,
+                "step_paths": record_path(state, "llm")}
+
+    def _step_tier(self, state: State):
+        """shell_tier for command-only steps, code_tier for the rest"""
+        tier = self.shell_tier if is_shell_step(state["plan"][state.get("current_step", 0)]) else self.code_tier
+        # A failed script run keeps the rest of the turn on the primary model
+        if tier.escalation is not None and failed_runs(state.get("messages") or []):
+            return tier.pinned
+        return tier
+
+    def _step_messages(self, state: State, budget=None):
+        messages = step_messages(self.step_system_prompt, state)
+        return budget.fit(messages) if budget is not None else messages
+
+    def execute_step(self, state: State, rule_executor: bool = False, budget=None, config: RunnableConfig = None):
+        """Executes the current step of the plan"""
+        early = self._step_precheck(state, rule_executor, config)
+        if early is not None:
+            return early
+        response = self._step_tier(state).invoke(self._step_messages(state, budget), accept=has_tool_calls)
+        return self._step_update(state, response)
+
+    async def aexecute_step(self, state: State, rule_executor: bool = False, budget=None,
+                            config: RunnableConfig = None):
+        early = self._step_precheck(state, rule_executor, config)
+        if early is not None:
+            return early
+        response = await self._step_tier(state).ainvoke(self._step_messages(state, budget), accept=has_tool_calls)
+        return self._step_update(state, response)
+
+    def _completed_step(self, state: State, update: dict, tool_messages: list):
+        path = update.get("step_paths", ["llm"])[-1]
+        response = update["messages"][0]
+        return {"messages": [response, *tool_messages],
+                "completed_steps": [completed_entry(state["current_step"], path, response)]}
+
+    def run_step(self, state: State, config: RunnableConfig = None, rule_executor: bool = False, budget=None,
+                 max_repairs: int = 0):
+        """Executes one plan step and its tool calls; fanned out by the parallel step scheduler"""
+        update = self.execute_step(state, rule_executor, budget, config)
+        response, *tool_messages = update["messages"]
+        # Run the tools inline so the branch returns a complete step (directory steps come with their result)
+        if getattr(response, "tool_calls", None) and not tool_messages:
+            tool_messages = self.tool_node.invoke({"messages": [response]})["messages"]
+        if budget is not None:
+            tool_messages = [budget.clip_tool_message(m) for m in tool_messages]
+        failure = failed_script_run([response, *tool_messages]) if max_repairs else None
+        if failure is not None:
+            tool_messages += self._repair(failure, config, max_repairs, budget)
+        return self._completed_step(state, update, tool_messages)
+
+    async def arun_step(self, state: State, config: RunnableConfig = None, rule_executor: bool = False, budget=None,
+                        max_repairs: int = 0):
+        update = await self.aexecute_step(state, rule_executor, budget, config)
+        response, *tool_messages = update["messages"]
+        if getattr(response, "tool_calls", None) and not tool_messages:
+            tool_messages = (await self.tool_node.ainvoke({"messages": [response]}))["messages"]
+        if budget is not None:
+            tool_messages = await asyncio.to_thread(lambda: [budget.clip_tool_message(m) for m in tool_messages])
+        failure = failed_script_run([response, *tool_messages]) if max_repairs else None
+        if failure is not None:
+            tool_messages += await self._arepair(failure, config, max_repairs, budget)
+        return self._completed_step(state, update, tool_messages)
+
+    def _repair_messages(self, request: str):
+        return [self.repair_system_prompt, HumanMessage(content=request)]
+
+    def _repair(self, failure: tuple, config: RunnableConfig, max_repairs: int, budget=None):
+        """Patches and reruns a failed script run until it exits 0 or max_repairs is used up.
+
+        Returns the messages of every attempt: the model's patch_file calls with
+        their results, then the rerun as a run_command call with its result.
+        """
+        command, result = failure
+        workspace, store = workspace_for(config), artifact_store_for(config)
+        messages, feedback = [], None
+        for _ in range(max_repairs):
+            request = repair_request(command, result, workspace, feedback)
+            if request is None:
+                break
+            response = self.repair_llm.invoke(self._repair_messages(request))
+            patched, errors = apply_patch_calls(response, workspace, store)
+            messages += [response, *patched]
+            if not patched:
+                break
+            feedback = "; ".join(errors) or None
+            if errors:
+                continue
+            result = self.backend.run_command(command, config)
+            messages += rerun_messages(command, result)
+            if result["exit_code"] == 0:
+                break
+        return [budget.clip_tool_message(m) for m in messages] if budget is not None else messages
+
+    async def _arepair(self, failure: tuple, config: RunnableConfig, max_repairs: int, budget=None):
+        command, result = failure
+        workspace, store = workspace_for(config), artifact_store_for(config)
+        messages, feedback = [], None
+        for _ in range(max_repairs):
+            request = await asyncio.to_thread(repair_request, command, result, workspace, feedback)
+            if request is None:
+                break
+            response = await self.repair_llm.ainvoke(self._repair_messages(request))
+            patched, errors = await asyncio.to_thread(apply_patch_calls, response, workspace, store)
+            messages += [response, *patched]
+            if not patched:
+                break
+            feedback = "; ".join(errors) or None
+            if errors:
+                continue
+            result = await asyncio.to_thread(self.backend.run_command, command, config)
+            messages += rerun_messages(command, result)
+            if result["exit_code"] == 0:
+                break
+        if budget is not None:
+            return await asyncio.to_thread(lambda: [budget.clip_tool_message(m) for m in messages])
+        return messages
+
+    def repair_run(self, state: State, config: RunnableConfig, max_repairs: int = 2, budget=None):
+        """Repairs the script run that just failed with small patches (see repair.py)"""
+        failure = failed_script_run(state.get("messages") or [])
+        if failure is None:
+            return {}
+        return {"messages": self._repair(failure, config, max_repairs, budget)}
+
+    async def arepair_run(self, state: State, config: RunnableConfig, max_repairs: int = 2, budget=None):
+        failure = failed_script_run(state.get("messages") or [])
+        if failure is None:
+            return {}
+        return {"messages": await self._arepair(failure, config, max_repairs, budget)}
+
+    def generate_summary_and_speak(self, state: State):
+        """Generates the spoken summary of actions taken (no LLM call)"""
+        return summary_update(self.prompts, state)
+
+    async def agenerate_summary_and_speak(self, state: State):
+        return summary_update(self.prompts, state)
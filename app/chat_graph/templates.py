@@ -0,0 +1,60 @@
+import functools
+import os
+import re
+from string import Template
+
+PROMPT_SETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_sets")
+REQUIRED_SECTIONS = {"enhance", "enhance_input", "plan", "plan_input", "plan_task", "step", "repair",
+                     "precheck_rejected", "precheck_completed", "summary_rejected", "summary_completed",
+                     "summary_failed"}
+# Spoken summaries longer than this use the summary_too_long section, when a set has one
+MAX_SUMMARY_WORDS = 200
+
+_SECTION = re.compile(r"^\[(\w+)\]\s*$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+class PromptSet:
+    """The prompts and fixed replies of one prompt set version, e.g. "concise-v1".
+
+    A set is a text file in prompt_sets/ named <name>-v<version>.txt: lines
+    before the first "[section]" header are comments, every section runs to
+    the next header. $placeholders are filled by render() (string.Template, so
+    the braces of JSON examples need no escaping).
+    """
+
+    def __init__(self, name: str, sections: dict):
+        self.name = name
+        self.sections = sections
+
+    def render(self, section: str, **values):
+        return Template(self.sections[section]).substitute(**values)
+
+    def spoken_phrases(self):
+        """Fixed sentences of the spoken summaries, for the TTS phrase cache"""
+        fixed = [s for s in _SENTENCE_END.split(self.sections["summary_completed"]) if "$" not in s]
+        return [self.sections["summary_rejected"], *fixed]
+
+def available_prompt_sets():
+    return sorted(name[:-len(".txt")] for name in os.listdir(PROMPT_SETS_DIR) if name.endswith(".txt"))
+
+def parse_prompt_set(text: str):
+    sections, current = {}, None
+    for line in text.splitlines():
+        header = _SECTION.match(line)
+        if header:
+            current = sections.setdefault(header.group(1), [])
+        elif current is not None:
+            current.append(line.rstrip())
+    return {name: "\n".join(lines).strip("\n") for name, lines in sections.items()}
+
+@functools.lru_cache(maxsize=None)
+def load_prompt_set(name: str):
+    path = os.path.join(PROMPT_SETS_DIR, f"{name}.txt")
+    if not os.path.exists(path):
+        raise ValueError(f"unknown prompt set {name!r}, expected one of: {', '.join(available_prompt_sets())}")
+    with open(path, encoding="utf-8") as f:
+        sections = parse_prompt_set(f.read())
+    missing = REQUIRED_SECTIONS - sections.keys()
+    if missing:
+        raise ValueError(f"prompt set {name!r} lacks sections: {', '.join(sorted(missing))}")
+    return PromptSet(name, sections)
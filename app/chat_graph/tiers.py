@@ -0,0 +1,67 @@
+from langchain.chat_models import init_chat_model
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+
+# classify: enhance_query (including the NON_PROGRAMMING_QUERY decision); plan: create_plan and plan_task;
+# shell: plan steps that only run commands (directory, run/test, install); code: steps that author files
+ROLES = ("classify", "plan", "shell", "code")
+PARSE_ERRORS = (OutputParserException, ValidationError)
+
+def init_model(model):
+    """A chat model from an init_chat_model() id, or the instance itself"""
+    # stream_usage keeps token counts on streamed responses for the metrics callback
+    return init_chat_model(model, stream_usage=True) if isinstance(model, str) else model
+
+def tier_models(models: dict = None, primary=None):
+    """role → chat model of the roles that models moves off the primary model"""
+    models = models or {}
+    unknown = set(models) - set(ROLES)
+    if unknown:
+        raise ValueError(f"Unknown model role(s) {', '.join(sorted(unknown))}; choose from {', '.join(ROLES)}")
+    instances = {}
+    tiers = {}
+    for role, model in models.items():
+        if model is primary or (isinstance(model, str) and model == primary):
+            continue
+        key = model if isinstance(model, str) else id(model)
+        if key not in instances:
+            instances[key] = init_model(model)
+        tiers[role] = instances[key]
+    return tiers
+
+class ModelTier:
+    """The runnable of a node role and, when that role runs on a smaller model, the primary's to escalate to.
+
+    invoke() escalates a call whose output fails to parse (a parse exception or
+    `accept(response)` false); `pinned` is the role on the primary model for
+    turns that already had a failed script run. Tiered calls are tagged
+    tier:<role> (plus "escalated") so metrics can attribute them.
+    """
+
+    def __init__(self, role: str, runnable, escalation=None):
+        self.role = role
+        self.runnable = runnable if escalation is None else runnable.with_config(tags=[f"tier:{role}"])
+        self.escalation = None if escalation is None else escalation.with_config(tags=[f"tier:{role}", "escalated"])
+        self.pinned = self if escalation is None else ModelTier(role, self.escalation)
+
+    def invoke(self, messages, accept=None):
+        if self.escalation is None:
+            return self.runnable.invoke(messages)
+        try:
+            response = self.runnable.invoke(messages)
+            if accept is None or accept(response):
+                return response
+        except PARSE_ERRORS:
+            pass
+        return self.escalation.invoke(messages)
+
+    async def ainvoke(self, messages, accept=None):
+        if self.escalation is None:
+            return await self.runnable.ainvoke(messages)
+        try:
+            response = await self.runnable.ainvoke(messages)
+            if accept is None or accept(response):
+                return response
+        except PARSE_ERRORS:
+            pass
+        return await self.escalation.ainvoke(messages)
@@ -0,0 +1,265 @@
+import threading
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from context_budget import count_tokens
+
+HISTORY_SUMMARY_ID = "history_summary"
+
+class HistoryCompactor:
+    """Graph node folding all but the last `keep_turns` turns into one rolling summary message.
+
+    A turn starts at a HumanMessage. Older turns become "- request → result"
+    lines in a SystemMessage with a fixed id, so the thread's messages (and
+    every checkpoint of it) stay bounded however long the session runs. The
+    newest lines are kept when the summary exceeds `max_summary_chars`. With
+    `max_tokens`, kept turns are folded too, oldest first, until the kept
+    messages fit in that many (approximate) tokens; the newest turn always stays.
+    """
+
+    def __init__(self, keep_turns: int = 3, max_summary_chars: int = 4000, max_tokens: int = None):
+        self.keep_turns = keep_turns
+        self.max_summary_chars = max_summary_chars
+        self.max_tokens = max_tokens
+
+    def __call__(self, state):
+        summary, turns = [], []
+        for message in state.get("messages", []):
+            if message.id == HISTORY_SUMMARY_ID:
+                summary = str(message.content).splitlines()[1:]
+            elif isinstance(message, HumanMessage) or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        recent = turns[-self.keep_turns:] if self.keep_turns else []
+        if self.max_tokens is not None:
+            while len(recent) > 1 and count_tokens([m for turn in recent for m in turn]) > self.max_tokens:
+                recent = recent[1:]
+        if len(recent) == len(turns):
+            return {}
+
+        lines = summary + [_turn_line(turn) for turn in turns[:len(turns) - len(recent)]]
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > self.max_summary_chars:
+            lines.pop(0)
+        summary_message = SystemMessage(content="\n".join(["Summary of earlier turns:"] + lines),
+                                        id=HISTORY_SUMMARY_ID)
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), summary_message,
+                             *(message for turn in recent for message in turn)]}
+
+def _turn_line(turn: list, limit: int = 160):
+    request = next((str(m.content) for m in turn if isinstance(m, HumanMessage)), "")
+    result = next((str(m.content) for m in reversed(turn)
+                   if isinstance(m, AIMessage) and m.content and not m.tool_calls), "")
+    return f"- {' '.join(request.split())[:limit]} → {' '.join(result.split())[:limit]}"
+
+class CoalescingSaver(BaseCheckpointSaver):
+    """Checkpointer wrapper that persists every `every`-th checkpoint of a thread.
+
+    The checkpoints in between are held in memory (only the latest one per
+    thread) and written by flush()/aflush() at the end of a turn, so a turn
+    costs roughly steps / every writes instead of one per super-step. Channel
+    versions of held checkpoints are merged into the next write, so savers
+    that store per-version blobs still see every channel, and parent ids
+    point at the last checkpoint that was actually persisted.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, every: int):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.every = max(1, every)
+        self.pending = {}
+        self.counts = {}
+        self.persisted = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(config):
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    def _hold(self, config, checkpoint, metadata, new_versions):
+        """Returns the write to perform now, or None if the checkpoint is held"""
+        key = self._key(config)
+        with self._lock:
+            held = self.pending.pop(key, None)
+            versions = {**(held["versions"] if held else {}), **new_versions}
+            self.counts[key] = self.counts.get(key, 0) + 1
+            entry = {"config": config, "checkpoint": checkpoint, "metadata": metadata, "versions": versions,
+                     "writes": []}
+            if self.counts[key] % self.every:
+                self.pending[key] = entry
+                return None
+            return entry
+
+    def _parent_config(self, entry):
+        key = self._key(entry["config"])
+        configurable = {**entry["config"]["configurable"]}
+        if key in self.persisted:
+            configurable["checkpoint_id"] = self.persisted[key]
+        return {**entry["config"], "configurable": configurable}
+
+    @staticmethod
+    def _saved_config(config, checkpoint):
+        configurable = config["configurable"]
+        return {"configurable": {"thread_id": configurable["thread_id"],
+                                 "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def _held_writes(self, config, writes, task_id, task_path):
+        """Queues writes for a held checkpoint; False if they belong to a persisted one"""
+        with self._lock:
+            held = self.pending.get(self._key(config))
+            if held is None or held["checkpoint"]["id"] != config["configurable"].get("checkpoint_id"):
+                return False
+            held["writes"].append((writes, task_id, task_path))
+            return True
+
+    def _take_pending(self, thread_id: str = None):
+        with self._lock:
+            keys = [key for key in self.pending if thread_id is None or key[0] == thread_id]
+            for key in [key for key in self.counts if thread_id is None or key[0] == thread_id]:
+                del self.counts[key]
+            return [self.pending.pop(key) for key in keys]
+
+    # Write path
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        entry = self._hold(config, checkpoint, metadata, new_versions)
+        if entry is None:
+            return self._saved_config(config, checkpoint)
+        return self._write(entry)
+
+    def _write(self, entry):
+        saved = self.saver.put(self._parent_config(entry), entry["checkpoint"], entry["metadata"], entry["versions"])
+        self.persisted[self._key(entry["config"])] = entry["checkpoint"]["id"]
+        for writes, task_id, task_path in entry["writes"]:
+            self.saver.put_writes(saved, writes, task_id, task_path)
+        return saved
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        if not self._held_writes(config, writes, task_id, task_path):
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    def flush(self, thread_id: str = None):
+        """Persists the latest held checkpoint of `thread_id` (default: every thread); call once a turn has finished"""
+        for entry in self._take_pending(thread_id):
+            self._write(entry)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        entry = self._hold(config, checkpoint, metadata, new_versions)
+        if entry is None:
+            return self._saved_config(config, checkpoint)
+        return await self._awrite(entry)
+
+    async def _awrite(self, entry):
+        saved = await self.saver.aput(self._parent_config(entry), entry["checkpoint"], entry["metadata"],
+                                      entry["versions"])
+        self.persisted[self._key(entry["config"])] = entry["checkpoint"]["id"]
+        for writes, task_id, task_path in entry["writes"]:
+            await self.saver.aput_writes(saved, writes, task_id, task_path)
+        return saved
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        if not self._held_writes(config, writes, task_id, task_path):
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def aflush(self, thread_id: str = None):
+        for entry in self._take_pending(thread_id):
+            await self._awrite(entry)
+
+    # Read path, delegated
+
+    def get_tuple(self, config):
+        return self.saver.get_tuple(config)
+
+    def list(self, config, **kwargs):
+        return self.saver.list(config, **kwargs)
+
+    def delete_thread(self, thread_id):
+        return self.saver.delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        return await self.saver.aget_tuple(config)
+
+    async def alist(self, config, **kwargs):
+        async for item in self.saver.alist(config, **kwargs):
+            yield item
+
+    async def adelete_thread(self, thread_id):
+        return await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+# MongoDB maintenance
+
+def _mongo_saver(saver):
+    saver = getattr(saver, "saver", saver)
+    return saver if hasattr(saver, "checkpoint_collection") else None
+
+def _prune_filter(thread_id: str, cutoff: str):
+    return {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": {"$lt": cutoff}}
+
+def prune_checkpoints(saver, thread_id: str, keep: int):
+    """Deletes all but the newest `keep` checkpoints of a thread and their writes (MongoDB savers only).
+
+    Checkpoint ids are time-ordered, so everything below the keep-th newest id goes. The queries use
+    the (thread_id, checkpoint_ns, checkpoint_id) index MongoDBSaver creates on both collections.
+    """
+    saver = _mongo_saver(saver)
+    if saver is None or keep < 1:
+        return 0
+    newest = list(saver.checkpoint_collection.find({"thread_id": thread_id, "checkpoint_ns": ""}, {"checkpoint_id": 1})
+                  .sort("checkpoint_id", -1).skip(keep - 1).limit(1))
+    if not newest:
+        return 0
+    query = _prune_filter(thread_id, newest[0]["checkpoint_id"])
+    deleted = saver.checkpoint_collection.delete_many(query).deleted_count
+    saver.writes_collection.delete_many(query)
+    return deleted
+
+async def aprune_checkpoints(saver, thread_id: str, keep: int):
+    saver = _mongo_saver(saver)
+    if saver is None or keep < 1:
+        return 0
+    cursor = (saver.checkpoint_collection.find({"thread_id": thread_id, "checkpoint_ns": ""}, {"checkpoint_id": 1})
+              .sort("checkpoint_id", -1).skip(keep - 1).limit(1))
+    newest = await cursor.to_list()
+    if not newest:
+        return 0
+    query = _prune_filter(thread_id, newest[0]["checkpoint_id"])
+    deleted = (await saver.checkpoint_collection.delete_many(query)).deleted_count
+    await saver.writes_collection.delete_many(query)
+    return deleted
+
+class CheckpointPolicy:
+    """How a session persists its thread.
+
+    every: None writes every super-step (LangGraph's default), 0 only the final
+    state of each turn (durability="exit"), N > 0 every N-th checkpoint plus the
+    final one (CoalescingSaver). keep_checkpoints prunes older raw checkpoints
+    after each turn; compaction of the messages themselves is the
+    HistoryCompactor node.
+    """
+
+    def __init__(self, every: int = None, keep_checkpoints: int = None):
+        self.every = every
+        self.keep_checkpoints = keep_checkpoints
+
+    def wrap(self, saver):
+        return CoalescingSaver(saver, self.every) if self.every else saver
+
+    def stream_kwargs(self):
+        return {"durability": "exit"} if self.every == 0 else {}
+
+    def finish_turn(self, saver, thread_id: str):
+        if isinstance(saver, CoalescingSaver):
+            saver.flush(thread_id)
+        if self.keep_checkpoints:
+            prune_checkpoints(saver, thread_id, self.keep_checkpoints)
+
+    async def afinish_turn(self, saver, thread_id: str):
+        if isinstance(saver, CoalescingSaver):
+            await saver.aflush(thread_id)
+        if self.keep_checkpoints:
+            await aprune_checkpoints(saver, thread_id, self.keep_checkpoints)
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import os
+from langchain_core.messages import ToolMessage, trim_messages
+from langchain_core.runnables import RunnableLambda
+
+CHARS_PER_TOKEN = 4  # rough English/code average; no tokenizer round trip per message
+
+def approx_tokens(text) -> int:
+    return len(str(text)) // CHARS_PER_TOKEN + 1
+
+def count_tokens(messages: list) -> int:
+    """Approximate prompt tokens of `messages`, including a small per-message overhead"""
+    return sum(approx_tokens(message.content) + 4 for message in messages)
+
+# Out-of-band stores for full tool outputs: put(text) → reference string
+
+class FileOutputStore:
+    """Full outputs as content-addressed files, so identical outputs are stored once"""
+
+    def __init__(self, root: str = "tool_outputs"):
+        self.root = os.path.abspath(root)
+
+    def put(self, text: str):
+        data = text.encode("utf-8")
+        path = os.path.join(self.root, hashlib.sha256(data).hexdigest() + ".txt")
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            temp = f"{path}.{os.getpid()}.tmp"
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        return path
+
+class GridFSOutputStore:
+    """Full outputs in MongoDB GridFS, keyed by content hash"""
+
+    def __init__(self, database):
+        import gridfs
+        self.database = database.name
+        self.fs = gridfs.GridFS(database, collection="tool_outputs")
+
+    def put(self, text: str):
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.fs.exists(filename=digest):
+            self.fs.put(data, filename=digest)
+        return f"gridfs://{self.database}/tool_outputs/{digest}"
+
+class MessageBudget:
+    """Keeps the messages state and every LLM prompt within a token budget.
+
+    - Tool outputs over `max_tool_tokens` are stored in full in `store` (if
+      any) and replaced by their head and tail plus a reference before they
+      enter the state, so checkpoints never carry full program output.
+    - fit() trims a prompt to `max_call_tokens`: the system prompt and the
+      newest messages are kept, older ones dropped and oversized ones clipped.
+    Eviction of old turns is HistoryCompactor's job (its max_tokens).
+    """
+
+    def __init__(self, max_call_tokens: int = 8000, max_tool_tokens: int = 1000, store=None):
+        self.max_call_tokens = max_call_tokens
+        self.max_tool_tokens = max_tool_tokens
+        self.store = store
+        self.clipped = 0
+        self.clipped_chars = 0
+
+    def clip_text(self, text: str, max_tokens: int, reference: str = None):
+        limit = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        head = text[:limit * 2 // 3]
+        tail = text[len(text) - limit // 3:]
+        where = f"; full output: {reference}" if reference else ""
+        return f"{head}\n… [{len(text) - len(head) - len(tail)} chars omitted{where}] …\n{tail}"
+
+    def clip_tool_message(self, message):
+        """The ToolMessage with its output cut to max_tool_tokens; the full output goes to the store"""
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if not isinstance(message, ToolMessage) or approx_tokens(content) <= self.max_tool_tokens:
+            return message
+        reference = self.store.put(content) if self.store is not None else None
+        self.clipped += 1
+        self.clipped_chars += len(content)
+        artifact = {"full_output": reference, "chars": len(content)} if reference else message.artifact
+        return message.model_copy(update={"content": self.clip_text(content, self.max_tool_tokens, reference),
+                                          "artifact": artifact})
+
+    def clip_update(self, update):
+        if isinstance(update, dict) and update.get("messages"):
+            return {**update, "messages": [self.clip_tool_message(m) for m in update["messages"]]}
+        return update
+
+    def tool_node(self, tool_node):
+        """Wraps the graph's ToolNode so its ToolMessages are clipped before they reach the state"""
+        def run(state, config):
+            return self.clip_update(tool_node.invoke(state, config))
+
+        async def arun(state, config):
+            update = await tool_node.ainvoke(state, config)
+            # Store writes are blocking file/GridFS I/O
+            return await asyncio.to_thread(self.clip_update, update)
+
+        return RunnableLambda(run, afunc=arun, name="tools")
+
+    def fit(self, messages: list):
+        """`messages` trimmed to max_call_tokens, keeping the system prompt and the newest messages"""
+        if count_tokens(messages) <= self.max_call_tokens:
+            return messages
+        share = max(1, self.max_call_tokens // max(1, len(messages)))
+        clipped = [m if approx_tokens(m.content) <= share or not isinstance(m.content, str)
+                   else m.model_copy(update={"content": self.clip_text(m.content, share)}) for m in messages]
+        return trim_messages(clipped, max_tokens=self.max_call_tokens, token_counter=count_tokens,
+                             strategy="last", include_system=True, allow_partial=False)
+
+    def stats(self):
+        return {"clipped": self.clipped, "clipped_chars": self.clipped_chars}
@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+_AFTER = re.compile(r"\s*\(after:\s*([^)]*)\)\s*$", re.IGNORECASE)
+
+DEPENDENCY_INSTRUCTIONS = """
+      Multi-file projects get one "Create <filename>.py ..." step per file.
+      End every step with its prerequisites as 1-based step numbers, e.g. "(after: 1)"
+      or "(after: 1, 2)", or "(after: none)" if it needs no earlier step. Files that
+      do not import each other only depend on the directory step, so they can be
+      written in parallel.
+      """
+
+def sequential_deps(count: int):
+    """Every step depends on the one before it"""
+    return [[i - 1] if i else [] for i in range(count)]
+
+def split_dependencies(steps: list):
+    """Strips "(after: ...)" annotations off plan steps.
+
+    Returns (steps, step_deps) with 0-based prerequisite indices. A step without
+    an annotation depends on all earlier steps, so unannotated plans stay sequential.
+    """
+    clean, deps = [], []
+    for index, step in enumerate(steps):
+        match = _AFTER.search(step)
+        if match is None:
+            clean.append(step)
+            deps.append(list(range(index)))
+            continue
+        clean.append(step[:match.start()].strip())
+        numbers = [int(n) - 1 for n in re.findall(r"\d+", match.group(1))]
+        deps.append(sorted({n for n in numbers if 0 <= n < index}))
+    return clean, deps
+
+def normalize_deps(depends_on: list, count: int):
+    """0-based, in-range prerequisites from 1-based structured-output depends_on lists"""
+    if not depends_on or len(depends_on) != count:
+        return sequential_deps(count)
+    return [sorted({n - 1 for n in step if 0 < n <= index}) for index, step in enumerate(depends_on)]
+
+def merge_completed_steps(left, right):
+    """Reducer for completed_steps: None resets, entries are merged by step index in step order"""
+    if right is None:
+        return []
+    merged = {entry["step"]: entry for entry in (left or [])}
+    for entry in right:
+        merged[entry["step"]] = entry
+    return [merged[step] for step in sorted(merged)]
+
+def ready_steps(plan: list, step_deps: list, completed_steps: list):
+    done = {entry["step"] for entry in completed_steps or []}
+    deps = step_deps if step_deps and len(step_deps) == len(plan) else sequential_deps(len(plan))
+    return [i for i in range(len(plan)) if i not in done and all(d in done for d in deps[i])]
+
+def completed_entry(step: int, path: str, response):
+    """completed_steps entry for a step run by run_step"""
+    return {
+        "step": step,
+        "path": path,
+        "tool_calls": [{"name": c["name"], "args": c["args"]} for c in getattr(response, "tool_calls", None) or []]
+    }
+
+def step_tool_calls(state):
+    """Per-step tool calls recorded by the scheduler, in plan order, or None if the plan did not run that way"""
+    completed = state.get("completed_steps") or []
+    if not completed or len(completed) != len(state.get("plan", [])):
+        return None
+    return [entry.get("tool_calls", []) for entry in completed]
+
+class _DagRun:
+    """Progress of one schedule_steps run: completed entries and the messages of the steps run so far"""
+
+    def __init__(self, state, max_concurrency: int):
+        self.state = state
+        self.plan = state.get("plan", [])
+        self.deps = state.get("step_deps")
+        self.completed = list(state.get("completed_steps") or [])
+        self.messages = []
+        self.max_concurrency = max_concurrency
+
+    def ready(self, running):
+        """Steps to start now: prerequisites completed, not running yet, within max_concurrency"""
+        ready = [index for index in ready_steps(self.plan, self.deps, self.completed) if index not in running]
+        return ready[:max(0, self.max_concurrency - len(running))]
+
+    def state_for(self, index: int):
+        return {**self.state, "messages": [*self.state.get("messages", []), *self.messages],
+                "completed_steps": self.completed, "current_step": index}
+
+    def add(self, update: dict):
+        self.messages += update.get("messages", [])
+        self.completed = merge_completed_steps(self.completed, update.get("completed_steps", []))
+
+    def update(self):
+        return {
+            "messages": self.messages,
+            "completed_steps": self.completed,
+            "current_step": len(self.completed),
+            "step_paths": [entry["path"] for entry in self.completed]
+        }
+
+class StepScheduler:
+    """Runs the plan's steps as a DAG inside the schedule_steps node.
+
+    A step starts as soon as all of its prerequisites have completed, up to
+    max_concurrency at a time, so wall-clock follows the longest dependency
+    chain. (Fanning out with LangGraph's Send runs steps in supersteps, and a
+    superstep waits for its slowest step before any dependent step starts.)
+    step is run_step: (state, config) -> {"messages", "completed_steps"} for
+    state["current_step"]. Each call is traced as a "run_step" node, so node
+    timings and token attribution stay per step.
+    """
+
+    def __init__(self, step, max_concurrency: int = 4):
+        self.step = RunnableLambda(step, name="run_step")
+        self.max_concurrency = max(1, max_concurrency)
+
+    @staticmethod
+    def _step_config(config):
+        config = config or {}
+        return {**config, "run_name": "run_step",
+                "metadata": {**(config.get("metadata") or {}), "langgraph_node": "run_step"}}
+
+    @staticmethod
+    def _runnable(state):
+        plan = state.get("plan", [])
+        return bool(plan) and plan[0] != "REJECT_NON_PROGRAMMING"
+
+    def run_node(self, state, config: RunnableConfig = None):
+        if not self._runnable(state):
+            return {}
+        run, step_config, running = _DagRun(state, self.max_concurrency), self._step_config(config), {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="step") as pool:
+            while True:
+                for index in run.ready(running.values()):
+                    # In a copy of the node's context, which holds the run's metrics totals
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, self.step.invoke, run.state_for(index), step_config)] = index
+                if not running:
+                    # All done, or the remaining steps have unsatisfiable dependencies
+                    return run.update()
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    run.add(future.result())
+
+    async def arun_node(self, state, config: RunnableConfig = None):
+        if not self._runnable(state):
+            return {}
+        run, step_config, running = _DagRun(state, self.max_concurrency), self._step_config(config), {}
+        try:
+            while True:
+                for index in run.ready(running.values()):
+                    running[asyncio.create_task(self.step.ainvoke(run.state_for(index), step_config))] = index
+                if not running:
+                    return run.update()
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    del running[task]
+                    run.add(task.result())
+        finally:
+            for task in running:
+                task.cancel()
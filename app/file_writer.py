@@ -0,0 +1,178 @@
+import hashlib
+import os
+import tempfile
+import time
+from pydantic import BaseModel, Field
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from sandbox import WORKSPACE, workspace_for
+from workspace import artifact_store_for
+
+class FileEntry(BaseModel):
+    path: str = Field(description="File path inside ai_solution, e.g. ai_solution/main.py")
+    content: str = Field(default=None, description="Complete file contents")
+    sha256: str = Field(default=None, description="Instead of content: the sha256 (or its first 12 characters) "
+                                                  "of a stored file from an earlier turn to reuse unchanged")
+
+def workspace_path(path: str, workspace: str = None):
+    """Absolute path of `path` inside the workspace; ai_solution/ prefixes are optional"""
+    workspace = os.path.abspath(workspace or WORKSPACE)
+    relative = path.replace("\\", "/")
+    if relative.startswith("./"):
+        relative = relative[2:]
+    if relative.startswith("ai_solution/"):
+        relative = relative[len("ai_solution/"):]
+    target = os.path.abspath(os.path.join(workspace, relative))
+    if os.path.commonpath([workspace, target]) != workspace or target == workspace:
+        raise ValueError(f"{path} is outside the ai_solution workspace")
+    return target
+
+def _digest(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+# target → (size, mtime_ns, digest) for files this process wrote, so unchanged
+# rewrites are detected without reading the file back
+_written = {}
+
+def _unchanged(target: str, data: bytes, digest: str):
+    try:
+        stat = os.stat(target)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != len(data):
+        return False
+    known = _written.get(target)
+    if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+        return known[2] == digest
+    with open(target, "rb") as f:
+        return _digest(f.read()) == digest
+
+def write_file_atomic(target: str, data: bytes):
+    """Writes via a temp file in the same directory and renames it over the target"""
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def _store_file(store, target: str, data: bytes = None, digest: str = None):
+    """Links target to the store object of data (stored first if new); returns whether bytes were written"""
+    if data is not None:
+        digest, stored = store.put(data, digest)
+    else:
+        stored = False
+    store.link(digest, target)
+    return stored
+
+def write_batch(files: list, workspace: str = None, store=None):
+    """Writes {path, content} entries atomically, skipping files whose content hash is unchanged.
+
+    With an artifact store (workspace.ArtifactStore) files become links to its
+    objects: content it already has is linked instead of written ("reused"),
+    and entries may name a stored object by sha256 instead of carrying content.
+    """
+    start = time.perf_counter()
+    written, unchanged, reused, errors = [], [], [], []
+    for entry in files:
+        if isinstance(entry, FileEntry):
+            path, content, sha256 = entry.path, entry.content, entry.sha256
+        else:
+            path, content, sha256 = entry["path"], entry.get("content"), entry.get("sha256")
+        try:
+            target = workspace_path(path, workspace)
+            if content is None:
+                if not sha256:
+                    raise ValueError("pass either content or sha256")
+                digest = store.find(sha256) if store is not None else None
+                if digest is None:
+                    raise ValueError(f"no stored file with sha256 {sha256}")
+                data = None
+            else:
+                data = content.encode("utf-8")
+                digest = _digest(data)
+            if store is not None:
+                if store.holds(target, digest):
+                    unchanged.append(path)
+                elif _store_file(store, target, data, digest):
+                    written.append(path)
+                else:
+                    reused.append(path)
+                continue
+            if _unchanged(target, data, digest):
+                unchanged.append(path)
+                continue
+            write_file_atomic(target, data)
+            stat = os.stat(target)
+            _written[target] = (stat.st_size, stat.st_mtime_ns, digest)
+            written.append(path)
+        except Exception as e:
+            errors.append({"path": path, "error": str(e)})
+    result = {
+        "written": written,
+        "unchanged": unchanged,
+        "errors": errors,
+        "duration": round(time.perf_counter() - start, 4),
+    }
+    if store is not None:
+        result["reused"] = reused
+    return result
+
+@tool
+def write_files(files: list[FileEntry], config: RunnableConfig):
+    """
+    Creates or overwrites one or more files in the ai_solution workspace in a single call.
+    Pass every file of the step at once, each with its path (e.g. ai_solution/main.py) and
+    complete contents. Returns the written, unchanged (identical content) and failed paths.
+    """
+    return write_batch(files, workspace_for(config), artifact_store_for(config))
+
+class TextEdit(BaseModel):
+    old: str = Field(description="Exact text to replace, copied from the file without line numbers; must be unique in it")
+    new: str = Field(description="Replacement text")
+
+def patch_text(text: str, edits: list):
+    """text with every {old, new} edit applied; raises ValueError if an `old` is missing or ambiguous"""
+    for edit in edits:
+        old, new = (edit.old, edit.new) if isinstance(edit, TextEdit) else (edit["old"], edit["new"])
+        count = text.count(old) if old else 0
+        if count != 1:
+            problem = "is empty" if not old else "was not found" if count == 0 else f"matches {count} places"
+            raise ValueError(f"edit {old[:60]!r} {problem}; copy a unique snippet of the current file")
+        text = text.replace(old, new, 1)
+    return text
+
+def patch_batch(path: str, edits: list, workspace: str = None, store=None):
+    """Applies search/replace edits to one existing file atomically; nothing is written if any edit fails"""
+    start = time.perf_counter()
+    try:
+        target = workspace_path(path, workspace)
+        with open(target, encoding="utf-8") as f:
+            data = patch_text(f.read(), edits).encode("utf-8")
+        if store is not None:
+            _store_file(store, target, data)
+        else:
+            write_file_atomic(target, data)
+            stat = os.stat(target)
+            _written[target] = (stat.st_size, stat.st_mtime_ns, _digest(data))
+        errors = []
+    except Exception as e:
+        errors = [{"path": path, "error": str(e)}]
+    return {
+        "patched": [] if errors else [path],
+        "errors": errors,
+        "duration": round(time.perf_counter() - start, 4),
+    }
+
+@tool
+def patch_file(path: str, edits: list[TextEdit], config: RunnableConfig):
+    """
+    Fixes an existing file in the ai_solution workspace with small search/replace edits instead
+    of rewriting it. Each edit replaces one exact, unique snippet `old` of the file with `new`;
+    the file is left unchanged if any edit does not apply.
+    """
+    return patch_batch(path, edits, workspace_for(config), artifact_store_for(config))
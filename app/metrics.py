@@ -0,0 +1,188 @@
+import contextvars
+import json
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+class Metrics:
+    """Per-turn latency, token and tool-call recorder.
+
+    Every measurement is an event {"turn", "stage", "duration", ...} appended to
+    `events` and, when `path` is set, to a JSONL file as soon as it completes.
+    Graph nodes are stages named "node:<name>" and every LLM call one named
+    "model:<provider>:<model>" with its node, tier and tokens (via the
+    `callback` handler), I/O stages use `stage()`, and graph_run() writes a "graph" event with the
+    run's token, tool-call and checkpoint totals. cached_tokens counts the
+    prompt tokens the provider served from its prompt cache.
+
+    The totals are context-local: a graph_run() collects what its own run adds
+    (nodes and checkpoint writes inherit the context), so concurrent runs of
+    one instance, such as the server's sessions, never mix their numbers.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.events = []
+        self.turn = 0
+        self._callback = None
+        self._lock = threading.Lock()
+        self._totals = contextvars.ContextVar(f"metrics_totals_{id(self)}", default=None)
+
+    @property
+    def callback(self):
+        """The node_timer.NodeTimer of this recorder, created on first use (it imports langchain_core)"""
+        with self._lock:
+            if self._callback is None:
+                from node_timer import NodeTimer
+                self._callback = NodeTimer(self)
+            return self._callback
+
+    def start_turn(self):
+        with self._lock:
+            self.turn += 1
+        return self.turn
+
+    @contextmanager
+    def graph_run(self, **extra):
+        """Times one graph run; yields its totals, which its "graph" event carries.
+
+        Tokens, tool calls and checkpoint writes are added to the totals of the
+        graph_run() whose context they happen in, so concurrent runs stay apart.
+        """
+        totals = _new_totals()
+        token = self._totals.set(totals)
+        start = time.perf_counter()
+        try:
+            yield totals
+        except BaseException:
+            extra["error"] = True
+            raise
+        finally:
+            self._totals.reset(token)
+            with self._lock:
+                recorded = dict(totals)
+            recorded["checkpoint_seconds"] = round(recorded["checkpoint_seconds"], 4)
+            self.record("graph", time.perf_counter() - start, **recorded, **extra)
+
+    def record(self, stage: str, duration: float, turn: int = None, **extra):
+        event = {"turn": self.turn if turn is None else turn, "stage": stage,
+                 "duration": round(duration, 4), "at": time.time(), **extra}
+        with self._lock:
+            self.events.append(event)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event) + "\n")
+        return event
+
+    @contextmanager
+    def stage(self, name: str, turn: int = None, **extra):
+        """Times the enclosed block, also when it raises (recorded with error=True)"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            extra["error"] = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, turn=turn, **extra)
+
+    def add(self, **amounts):
+        """Adds to the totals of the enclosing graph_run(); outside of one there is nothing to add to"""
+        totals = self._totals.get()
+        if totals is None:
+            return
+        with self._lock:
+            for key, amount in amounts.items():
+                totals[key] += amount
+
+    def summary(self):
+        return summarize(self.events)
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("📊 Latency per stage (seconds):")
+        for stage, row in rows.items():
+            tokens = f", {row['tokens']} tokens" if row["tokens"] else ""
+            if row["prompt_tokens"]:
+                tokens += f" ({row['cached_tokens'] / row['prompt_tokens']:.0%} of prompt cached)"
+            if row["escalated"]:
+                tokens += f", {row['escalated']} escalated"
+            print(f"   {stage:<28} n={row['count']:<4} p50 {row['p50']:.3f}  p95 {row['p95']:.3f}{tokens}")
+
+def _new_totals():
+    return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "tool_calls": 0, "llm_calls": 0,
+            "checkpoint_seconds": 0.0, "checkpoint_writes": 0}
+
+def percentile(values: list, fraction: float):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(events: list):
+    """p50/p95 duration, token totals and cached prompt tokens per stage, stages in first-seen order"""
+    stages = {}
+    for event in events:
+        stages.setdefault(event["stage"], []).append(event)
+    return {
+        stage: {
+            "count": len(rows),
+            "p50": statistics.median(row["duration"] for row in rows),
+            "p95": percentile([row["duration"] for row in rows], 0.95),
+            "tokens": sum(row.get("prompt_tokens", 0) + row.get("completion_tokens", 0) for row in rows),
+            "prompt_tokens": sum(row.get("prompt_tokens", 0) for row in rows),
+            "cached_tokens": sum(row.get("cached_tokens", 0) for row in rows),
+            "escalated": sum(1 for row in rows if row.get("escalated")),
+        }
+        for stage, rows in stages.items()
+    }
+
+# Set while a timed checkpoint write runs, so savers whose aput calls put are counted once
+_timing_checkpoint = contextvars.ContextVar("timing_checkpoint", default=False)
+
+def instrument_checkpointer(checkpointer, metrics: Metrics):
+    """Wraps the saver's put/put_writes (and async variants) to add their time to the turn totals"""
+    def timed(method):
+        def wrapper(*args, **kwargs):
+            if _timing_checkpoint.get():
+                return method(*args, **kwargs)
+            token = _timing_checkpoint.set(True)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _timing_checkpoint.reset(token)
+                metrics.add(checkpoint_seconds=time.perf_counter() - start, checkpoint_writes=1)
+        return wrapper
+
+    def atimed(method):
+        async def wrapper(*args, **kwargs):
+            if _timing_checkpoint.get():
+                return await method(*args, **kwargs)
+            token = _timing_checkpoint.set(True)
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                _timing_checkpoint.reset(token)
+                metrics.add(checkpoint_seconds=time.perf_counter() - start, checkpoint_writes=1)
+        return wrapper
+
+    for name in ("put", "put_writes"):
+        setattr(checkpointer, name, timed(getattr(checkpointer, name)))
+    for name in ("aput", "aput_writes"):
+        setattr(checkpointer, name, atimed(getattr(checkpointer, name)))
+    return checkpointer
+
+def load_events(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+if __name__ == "__main__":
+    # python app/metrics.py metrics.jsonl → p50/p95 per stage of a recorded session
+    report = Metrics()
+    for path in sys.argv[1:]:
+        report.events.extend(load_events(path))
+    report.print_summary()
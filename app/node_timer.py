@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import TYPE_CHECKING
+from langchain_core.callbacks import BaseCallbackHandler
+
+if TYPE_CHECKING:
+    from metrics import Metrics
+
+class NodeTimer(BaseCallbackHandler):
+    """LangChain callback handler timing every LangGraph node run.
+
+    Node runs are the chain runs whose name equals their langgraph_node
+    metadata; LLM and tool runs are attributed to the closest node run above
+    them, so parallel run_step nodes each get their own tokens and tool calls.
+    LLM calls are also timed per model, with the tier:<role> / escalated tags
+    of chat_graph.tiers, so per-model latency and token cost can be compared.
+    Pass it per call: graph.stream(state, {**config, "callbacks": [metrics.callback]}).
+    """
+
+    run_inline = True  # keep timings on the calling thread/loop
+
+    def __init__(self, metrics: "Metrics"):
+        self.metrics = metrics
+        self.parents = {}
+        self.nodes = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _node_of(self, run_id):
+        with self._lock:
+            while run_id is not None and run_id not in self.nodes:
+                run_id = self.parents.get(run_id)
+            return self.nodes.get(run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            self.parents[run_id] = parent_run_id
+            if node is not None and kwargs.get("name") == node:
+                self.nodes[run_id] = {"node": node, "started": time.perf_counter(), "prompt_tokens": 0,
+                                      "completion_tokens": 0, "cached_tokens": 0, "tool_calls": 0}
+
+    def _end_chain(self, run_id, error=False):
+        with self._lock:
+            self.parents.pop(run_id, None)
+            run = self.nodes.pop(run_id, None)
+        if run is None:
+            return
+        extra = {"error": True} if error else {}
+        self.metrics.record(f"node:{run['node']}", time.perf_counter() - run["started"],
+                            prompt_tokens=run["prompt_tokens"], completion_tokens=run["completion_tokens"],
+                            cached_tokens=run["cached_tokens"], tool_calls=run["tool_calls"], **extra)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_chain(run_id, error=True)
+
+    def _start_call(self, serialized, run_id, parent_run_id, tags, metadata):
+        tags = tags or []
+        tier = next((tag.split(":", 1)[1] for tag in tags if tag.startswith("tier:")), None)
+        with self._lock:
+            self.parents[run_id] = parent_run_id
+            self.calls[run_id] = {"model": model_label(serialized, metadata), "tier": tier,
+                                  "escalated": "escalated" in tags, "started": time.perf_counter()}
+
+    def _end_call(self, run_id, node, **extra):
+        with self._lock:
+            call = self.calls.pop(run_id, None)
+        if call is None:
+            return
+        if call["tier"] is not None:
+            extra.update(tier=call["tier"], escalated=call["escalated"])
+        self.metrics.record(f"model:{call['model']}", time.perf_counter() - call["started"],
+                            node=node["node"] if node else None, **extra)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None,
+                            **kwargs):
+        self._start_call(serialized, run_id, parent_run_id, tags, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        self._start_call(serialized, run_id, parent_run_id, tags, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens = completion_tokens = cached_tokens = 0
+        for generation in (response.generations[0] if response.generations else []):
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += usage.get("input_tokens", 0)
+            completion_tokens += usage.get("output_tokens", 0)
+            cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        if not prompt_tokens and not completion_tokens:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+            cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+        run = self._node_of(run_id)
+        with self._lock:
+            self.parents.pop(run_id, None)
+            if run is not None:
+                run["prompt_tokens"] += prompt_tokens
+                run["completion_tokens"] += completion_tokens
+                run["cached_tokens"] += cached_tokens
+        self.metrics.add(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                         cached_tokens=cached_tokens, llm_calls=1)
+        self._end_call(run_id, run, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                       cached_tokens=cached_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._node_of(run_id)
+        with self._lock:
+            self.parents.pop(run_id, None)
+        self._end_call(run_id, run, error=True)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self.parents[run_id] = parent_run_id
+        run = self._node_of(run_id)
+        if run is not None:
+            with self._lock:
+                run["tool_calls"] += 1
+        self.metrics.add(tool_calls=1)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        with self._lock:
+            self.parents.pop(run_id, None)
+
+    on_tool_error = on_tool_end
+
+def model_label(serialized, metadata):
+    """provider:model of an LLM run from LangChain's ls_* tracing metadata, else the model class"""
+    metadata = metadata or {}
+    if metadata.get("ls_model_name"):
+        provider = metadata.get("ls_provider")
+        return f"{provider}:{metadata['ls_model_name']}" if provider else metadata["ls_model_name"]
+    return (serialized or {}).get("name") or "unknown"
@@ -0,0 +1,217 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from langchain_core.messages import AIMessage, HumanMessage
+from prompts import original_request, request_update, user_request
+from step_rules import record_path
+from dag import step_tool_calls
+from repair import failed_runs, repaired
+
+_STOPWORDS = {
+    "a", "an", "the", "to", "of", "and", "or", "in", "on", "for", "with", "that", "this", "it", "is", "be",
+    "by", "as", "from", "into", "using", "use", "which", "should", "will", "can", "then", "its", "their",
+}
+
+def normalize(text: str):
+    """Lowercased, punctuation-free token set without stopwords"""
+    return frozenset(t for t in re.findall(r"[a-z0-9_+]+", text.lower()) if t not in _STOPWORDS)
+
+# Words that change what the generated code computes: two queries that differ in one of them (or in a
+# number) need different plans however similar the rest is, e.g. "add two numbers" vs "subtract two numbers"
+_OPERATIONS = {
+    "add", "addition", "sum", "plus", "subtract", "subtraction", "minus", "difference", "multiply", "multiplication",
+    "product", "times", "divide", "division", "quotient", "modulo", "remainder", "power", "exponent", "square",
+    "cube", "root", "sqrt", "factorial", "fibonacci", "prime", "even", "odd", "average", "mean", "median", "mode",
+    "max", "maximum", "largest", "min", "minimum", "smallest", "count", "sort", "ascending", "descending",
+    "reverse", "increment", "decrement", "encrypt", "decrypt", "encode", "decode", "read", "write", "delete",
+    "remove", "insert", "append", "merge", "split", "join", "upper", "uppercase", "lower", "lowercase", "first",
+    "last", "celsius", "fahrenheit", "kelvin", "binary", "decimal", "hexadecimal", "octal", "recursive",
+    "iterative", "python", "javascript", "java", "rust", "bash", "csv", "json", "xml", "yaml", "sql",
+}
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+def _stem(token: str):
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and token[:-len(suffix)] in _OPERATIONS:
+            return token[:-len(suffix)]
+    return token
+
+def discriminators(tokens: frozenset):
+    """The numbers and operation words of a normalised query, which a cache hit must match exactly"""
+    return frozenset(stem for stem in map(_stem, tokens) if stem in _OPERATIONS or any(c.isdigit() for c in stem))
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class PlanCache:
+    """Plan/result cache keyed on enhanced queries.
+
+    Exact matches on the normalised token set are O(1); otherwise the closest
+    entry by Jaccard similarity above `threshold` is used, provided it has the
+    same numbers and operation words (discriminators()). Entries are evicted
+    LRU beyond `max_entries` and expire after `ttl` seconds. Each entry holds
+    the plan plus the tool calls execute_step made for every step, so a hit
+    replays the turn without planner or executor LLM calls.
+
+    Pass a pymongo collection to persist entries across restarts; a TTL index
+    on created_at lets MongoDB expire them as well.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 256, ttl: float = 24 * 3600, collection=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.collection = collection
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        if collection is not None:
+            self._load()
+
+    def _load(self):
+        self.collection.create_index("created_at", expireAfterSeconds=int(self.ttl))
+        for doc in self.collection.find().sort("created_at", -1).limit(self.max_entries):
+            key = frozenset(doc["key"])
+            self.entries[key] = {
+                "plan": doc["plan"],
+                "tool_calls": doc["tool_calls"],
+                "duration": doc.get("duration", 0.0),
+                "step_deps": doc.get("step_deps"),
+                "created_at": doc["created_at"].replace(tzinfo=timezone.utc).timestamp(),
+            }
+            self.entries.move_to_end(key, last=False)
+
+    def lookup(self, query: str):
+        key = normalize(query)
+        now = time.time()
+        with self._lock:
+            for expired in [k for k, e in self.entries.items() if now - e["created_at"] > self.ttl]:
+                del self.entries[expired]
+            match = key if key in self.entries else None
+            if match is None:
+                best = 0.0
+                required = discriminators(key)
+                for candidate in self.entries:
+                    score = similarity(key, candidate)
+                    if score >= self.threshold and score > best and discriminators(candidate) == required:
+                        match, best = candidate, score
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(match)
+            return self.entries[match]
+
+    def store(self, query: str, plan: list, tool_calls: list, duration: float, step_deps: list = None):
+        key = normalize(query)
+        entry = {"plan": plan, "tool_calls": tool_calls, "duration": duration, "step_deps": step_deps,
+                 "created_at": time.time()}
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if self.collection is not None:
+            self.collection.replace_one(
+                {"key": sorted(key)},
+                {"key": sorted(key), "plan": plan, "tool_calls": tool_calls, "duration": duration,
+                 "step_deps": step_deps, "created_at": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "entries": len(self.entries),
+        }
+
+    # Graph nodes
+
+    @staticmethod
+    def _query(state, key: str):
+        return user_request(state) if key == "request" else state.get("enhanced_query", "")
+
+    def check_node(self, state, key: str = "enhanced_query"):
+        """Loads the cached plan and tool calls on a hit.
+
+        key "enhanced_query" runs after enhance_query; key "request" matches the
+        user's request itself and runs before plan_task, so a hit skips planning too.
+        """
+        query = self._query(state, key)
+        started = time.perf_counter()
+        if not query or query == "NON_PROGRAMMING_QUERY":
+            return {"cache_hit": False, "cached_tool_calls": [], "plan_started_at": started}
+        entry = self.lookup(query)
+        if entry is None:
+            return {"cache_hit": False, "cached_tool_calls": [], "plan_started_at": started}
+        # Without a planner run, record the turn's request here so no earlier turn's is left in the state
+        recorded = {**request_update(state), "enhanced_query": query} if key == "request" else {}
+        return {
+            **recorded,
+            "cache_hit": True,
+            "plan": entry["plan"],
+            "current_step": 0,
+            "execution_summary": "",
+            "cached_tool_calls": entry["tool_calls"],
+            "cached_duration": entry["duration"],
+            "plan_started_at": started,
+            "step_deps": entry.get("step_deps"),
+            "completed_steps": None,
+        }
+
+    def store_node(self, state, key: str = "enhanced_query"):
+        """Runs before the summary; stores fresh results (under check_node's key) or books the latency a hit saved"""
+        plan = state.get("plan", [])
+        if not plan or plan[0] == "REJECT_NON_PROGRAMMING":
+            return {}
+        duration = time.perf_counter() - state.get("plan_started_at", time.perf_counter())
+        if state.get("cache_hit"):
+            with self._lock:
+                self.saved_seconds += max(0.0, state.get("cached_duration", 0.0) - duration)
+            return {}
+        messages = state.get("messages", [])
+        # Replaying these tool calls would write the broken files again
+        if failed_runs(messages) or repaired(messages):
+            return {}
+        tool_calls = step_tool_calls(state) or turn_tool_calls(messages)
+        if tool_calls and all(tool_calls):
+            self.store(original_request(state) if key == "request" else state.get("enhanced_query", ""), plan,
+                       tool_calls, duration, state.get("step_deps"))
+        return {}
+
+def turn_tool_calls(messages: list):
+    """Per-step tool calls (name + args) made by execute_step since the latest user message"""
+    calls = []
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, AIMessage):
+            calls.append([{"name": c["name"], "args": c["args"]} for c in message.tool_calls])
+    return list(reversed(calls))
+
+def replay_step(state):
+    """execute_step update replaying the cached tool calls for the current step, or None"""
+    cached = state.get("cached_tool_calls") or []
+    current_step = state.get("current_step", 0)
+    if not state.get("cache_hit") or current_step >= len(cached):
+        return None
+    tool_calls = [{"name": c["name"], "args": c["args"], "id": f"cached_{uuid.uuid4().hex}"} for c in cached[current_step]]
+    return {
+        "messages": [AIMessage(content="", tool_calls=tool_calls)],
+        "current_step": current_step + 1,
+        "step_paths": record_path(state, "cache")
+    }
+
+def route_after_cache(state) -> str:
+    return "hit" if state.get("cache_hit") else "miss"
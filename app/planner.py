@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from dag import normalize_deps
+
+class PlannedTask(BaseModel):
+    """Classification, enhanced query and plan produced by a single LLM call"""
+    is_programming: bool = Field(
+        description="True if the request is about programming, coding, development, debugging or software engineering"
+    )
+    enhanced_query: str = Field(
+        description="The request rewritten as a clear, specific and actionable programming task; empty if not programming"
+    )
+    steps: list[str] = Field(
+        description="Executable plan steps without numbering; empty if not programming"
+    )
+    depends_on: list[list[int]] = Field(
+        default_factory=list,
+        description="For each step, the 1-based numbers of the earlier steps it needs; "
+                    "files that do not import each other only need the directory step"
+    )
+
+def planned_task_update(task: PlannedTask):
+    """Turns the structured planner output into the same state update enhance_query + create_plan produce"""
+    if not task.is_programming:
+        return {
+            "enhanced_query": "NON_PROGRAMMING_QUERY",
+            "plan": ["REJECT_NON_PROGRAMMING"],
+            "current_step": 0,
+            "completed_steps": None
+        }
+    steps = [step.strip() for step in task.steps if step.strip()]
+    # Blank steps would shift the 1-based numbering, fall back to sequential then
+    depends_on = task.depends_on if len(steps) == len(task.steps) else []
+    return {
+        "enhanced_query": task.enhanced_query.strip(),
+        "plan": steps,
+        "current_step": 0,
+        "execution_summary": "",
+        "step_deps": normalize_deps(depends_on, len(steps)),
+        "completed_steps": None
+    }
@@ -0,0 +1,77 @@
+import re
+
+# Weighted cue words; a pattern can match at most once per query
+PROGRAMMING_TERMS = {
+    r"\bpython\b": 3, r"\bjava(script)?\b": 3, r"\bc\+\+": 3, r"\bhtml\b": 2, r"\bcss\b": 2, r"\bsql\b": 3,
+    r"\bcode\b": 3, r"\bscript\b": 3, r"\bprogram(s|ming)?\b": 3, r"\bfunctions?\b": 2, r"\bclass(es)?\b": 2,
+    r"\bfiles?\b": 1, r"\blists?\b": 1, r"\bstrings?\b": 2, r"\barrays?\b": 2, r"\bdict(ionary)?\b": 2,
+    r"\bsort(s|ing|ed)?\b": 2, r"\breverse\b": 1, r"\balgorithms?\b": 3, r"\bdebug(ging)?\b": 3,
+    r"\bbugs?\b": 2, r"\bcompile\b": 3, r"\bvariables?\b": 2, r"\bloops?\b": 2, r"\brecursi(on|ve)\b": 3,
+    r"\bfactorial\b": 2, r"\bfibonacci\b": 2, r"\bapi\b": 2, r"\bdatabase\b": 2, r"\bjson\b": 3,
+    r"\bregex\b": 3, r"\bimplement\b": 2, r"\bmodule\b": 2, r"\blibrary\b": 1, r"\bcalculator\b": 2,
+    r"\bprime\b": 1, r"\bparse\b": 2, r"\bcsv\b": 2, r"\bexception\b": 2, r"\bunit tests?\b": 3,
+}
+
+NON_PROGRAMMING_TERMS = {
+    r"\bweather\b": 3, r"\btemperature\b": 2, r"\bforecast\b": 2, r"\brain(ing|y)?\b": 1, r"\bnews\b": 2,
+    r"\bjokes?\b": 2, r"\brecipes?\b": 3, r"\bcook(ing)?\b": 2, r"\bmovies?\b": 2, r"\bsongs?\b": 2,
+    r"\bmusic\b": 2, r"\bsports?\b": 2, r"\bfootball\b": 2, r"\bcricket\b": 2, r"\bcapital of\b": 3,
+    r"\bpresident\b": 2, r"\bprime minister\b": 3, r"\bstock price\b": 2, r"\bhoroscope\b": 3,
+    r"\bhow are you\b": 3, r"\byour name\b": 3, r"\bwho are you\b": 3, r"\bthank(s| you)\b": 2,
+    r"\brestaurants?\b": 2, r"\bflights?\b": 2, r"\btravel\b": 2, r"\bpoem\b": 2, r"\bbirthday\b": 2,
+    r"\bdoctor\b": 2, r"\bhealth(y)?\b": 1, r"\bwhat time is it\b": 3, r"\bwhat day\b": 2, r"\btoday\b": 1,
+    r"\bpizza\b": 2, r"\bholiday\b": 2, r"\bgame score\b": 2, r"\bhistory of\b": 1, r"\bfeel(ing)?\b": 1,
+}
+
+_PROGRAMMING = [(re.compile(p), w) for p, w in PROGRAMMING_TERMS.items()]
+_NON_PROGRAMMING = [(re.compile(p), w) for p, w in NON_PROGRAMMING_TERMS.items()]
+
+class KeywordClassifier:
+    """Local, dependency-free query classifier.
+
+    classify() returns (is_programming, confidence). Confidence is the share of
+    matched cue weight pointing at the predicted label, scaled down when there
+    is little evidence; a query with no cue words at all has confidence 0.
+    Any object with the same classify() signature can be plugged into PreRouter.
+    """
+
+    def __init__(self, programming_terms=None, non_programming_terms=None):
+        self.programming = [(re.compile(p), w) for p, w in programming_terms.items()] if programming_terms else _PROGRAMMING
+        self.non_programming = [(re.compile(p), w) for p, w in non_programming_terms.items()] if non_programming_terms else _NON_PROGRAMMING
+
+    def classify(self, query: str):
+        text = query.lower()
+        programming = sum(w for p, w in self.programming if p.search(text))
+        non_programming = sum(w for p, w in self.non_programming if p.search(text))
+        total = programming + non_programming
+        if total == 0:
+            return True, 0.0
+        is_programming = programming >= non_programming
+        share = max(programming, non_programming) / total
+        return is_programming, share * (1 - 0.5 ** total)
+
+class PreRouter:
+    """Graph node in front of the planner that rejects clear non-programming queries locally.
+
+    Only rejections at or above the confidence threshold short-circuit to the
+    summary node; everything else (programming or ambiguous) goes to the LLM.
+    """
+
+    def __init__(self, classifier=None, threshold: float = 0.7):
+        self.classifier = classifier or KeywordClassifier()
+        self.threshold = threshold
+
+    def __call__(self, state):
+        query = state["messages"][-1].content if state["messages"] else ""
+        is_programming, confidence = self.classifier.classify(query)
+        if not is_programming and confidence >= self.threshold:
+            return {
+                "enhanced_query": "NON_PROGRAMMING_QUERY",
+                "plan": ["REJECT_NON_PROGRAMMING"],
+                "current_step": 0
+            }
+        return {"enhanced_query": ""}
+
+def route_after_prerouter(state) -> str:
+    """Sends local rejections straight to the summary node"""
+    return "reject" if state.get("enhanced_query") == "NON_PROGRAMMING_QUERY" else "plan"
@@ -0,0 +1,43 @@
+from langchain_core.messages import HumanMessage
+from workspace import artifact_listing
+
+# Routes every step call of a deployment to the same OpenAI prompt-cache shard
+STEP_CACHE_KEY = "execute_step"
+
+def user_request(state: dict):
+    """The latest user message, i.e. the request of the turn being planned"""
+    messages = state.get("messages") or []
+    return messages[-1].content if messages else ""
+
+def request_update(state: dict):
+    """Records the turn's request once, from the first planner node, for the execution steps"""
+    return {"original_request": user_request(state)}
+
+def original_request(state: dict):
+    """The request recorded by the planner, else the last human message (older checkpoints)"""
+    if state.get("original_request"):
+        return state["original_request"]
+    for message in reversed(state.get("messages") or []):
+        if getattr(message, "type", None) == "human":
+            return message.content
+    return ""
+
+def step_messages(system_prompt, state: dict):
+    """Step prompt as a static, cacheable prefix followed by a small variable suffix.
+
+    Providers cache the longest prompt prefix they have seen before (OpenAI
+    from 1024 tokens on), so the order is: tool schemas and the static system
+    prompt (identical for every step and turn), the original request (identical
+    for every step of a turn), and last the one line that changes per step.
+    """
+    step = state["plan"][state.get("current_step", 0)]
+    request = f"Original user request: {original_request(state)}"
+    # Earlier turns' files only change between turns, so they stay in the cached prefix
+    listing = artifact_listing(state.get("artifacts"))
+    if listing:
+        request += "\n\n" + listing
+    return [
+        system_prompt,
+        HumanMessage(content=request),
+        HumanMessage(content=f"EXECUTE THIS STEP NOW: {step}"),
+    ]
@@ -0,0 +1,154 @@
+import json
+import os
+import re
+import uuid
+from langchain_core.messages import AIMessage, ToolMessage
+from file_writer import patch_batch, workspace_path
+
+# A repair prompt carries the tail of the error output and the lines around the traceback,
+# never the whole file, so its size follows the error and the fix rather than the file
+MAX_ERROR_CHARS = 2000
+CONTEXT_LINES = 6
+MAX_REGION_LINES = 80
+MAX_ERROR_SUMMARY = 120
+
+_EXIT_CODE = re.compile(r'"exit_code":\s*(-?\d+)')
+_FRAME = re.compile(r'File "([^"]+)", line (\d+)')
+_SCRIPT_RUN = re.compile(r"^\s*python3?\s+([\w./\\-]+\.py)\b")
+
+def run_result(message: ToolMessage):
+    """The CommandResult of a run_command ToolMessage; clipped outputs keep the exit code and raw text"""
+    try:
+        result = json.loads(message.content)
+        if isinstance(result, dict):
+            return result
+    except (TypeError, ValueError):
+        pass
+    match = _EXIT_CODE.search(str(message.content))
+    return {"exit_code": int(match.group(1)) if match else None, "stdout": "", "stderr": str(message.content)}
+
+def _run_commands(messages: list):
+    """tool_call_id → command of the run_command calls in messages"""
+    return {call["id"]: call["args"].get("command", "") for message in messages
+            for call in getattr(message, "tool_calls", None) or [] if call["name"] == "run_command"}
+
+def failed_script_run(messages: list):
+    """(command, result) of a failed `python <file>.py` run among the trailing tool results, else None"""
+    trailing = []
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            break
+        trailing.append(message)
+    commands = _run_commands(messages[-len(trailing) - 1:] if trailing else [])
+    for message in trailing:
+        command = commands.get(message.tool_call_id, "")
+        if message.name == "run_command" and _SCRIPT_RUN.match(command):
+            result = run_result(message)
+            if result.get("exit_code") not in (0, None):
+                return command, result
+    return None
+
+def turn_messages(messages: list):
+    """Messages of the current turn: everything after the last human message"""
+    for index in range(len(messages) - 1, -1, -1):
+        if getattr(messages[index], "type", None) == "human":
+            return messages[index + 1:]
+    return messages
+
+def failed_runs(messages: list):
+    """{command: result} of the turn's commands whose latest run failed (repair reruns supersede)"""
+    messages = turn_messages(messages)
+    commands = _run_commands(messages)
+    latest = {}
+    for message in messages:
+        if isinstance(message, ToolMessage) and message.name == "run_command" and message.tool_call_id in commands:
+            latest[commands[message.tool_call_id]] = run_result(message)
+    return {command: result for command, result in latest.items() if result.get("exit_code") not in (0, None)}
+
+def repaired(messages: list):
+    """Whether the turn's files were patched by repair_run"""
+    return any(call["name"] == "patch_file" for message in turn_messages(messages)
+               for call in getattr(message, "tool_calls", None) or [])
+
+def error_summary(result: dict):
+    """One line for the spoken summary: the last line of the error output"""
+    if result.get("timed_out"):
+        return f"it timed out after {result.get('duration', 0):.0f} seconds"
+    lines = [line.strip() for line in (result.get("stderr") or result.get("stdout") or "").splitlines() if line.strip()]
+    summary = lines[-1] if lines else f"exit code {result.get('exit_code')}"
+    return summary[:MAX_ERROR_SUMMARY]
+
+def _inside(path: str, workspace: str):
+    return os.path.commonpath([workspace, path]) == workspace
+
+def failing_file(command: str, result: dict, workspace: str):
+    """(path, traceback line numbers in it) of the deepest workspace frame, else the script itself"""
+    workspace = os.path.abspath(workspace)
+    # Relative frames ("./main.py") are relative to the workspace, where the script ran
+    frames = [(os.path.abspath(os.path.join(workspace, path)), int(line))
+              for path, line in _FRAME.findall(result.get("stderr") or "") if not path.startswith("<")]
+    frames = [(path, line) for path, line in frames if _inside(path, workspace)]
+    if frames:
+        target = frames[-1][0]
+        return target, [line for path, line in frames if path == target]
+    return workspace_path(_SCRIPT_RUN.match(command).group(1), workspace), []
+
+def numbered_region(text: str, line_numbers: list):
+    """The lines around line_numbers (1-based), numbered, at most MAX_REGION_LINES of them"""
+    lines = text.splitlines()
+    if not line_numbers:
+        shown = range(min(len(lines), MAX_REGION_LINES))
+    else:
+        wanted = set()
+        # Frames run outermost first: the innermost ones get the line budget first
+        for number in reversed(line_numbers):
+            window = range(max(0, number - 1 - CONTEXT_LINES), min(len(lines), number + CONTEXT_LINES))
+            if wanted and len(wanted | set(window)) > MAX_REGION_LINES:
+                break
+            wanted.update(window)
+        shown = sorted(wanted)
+    region, previous = [], None
+    for index in shown:
+        if previous is not None and index != previous + 1:
+            region.append("   …")
+        region.append(f"{index + 1:>4}| {lines[index]}")
+        previous = index
+    if shown and shown[-1] < len(lines) - 1:
+        region.append(f"   … ({len(lines)} lines in total)")
+    return "\n".join(region)
+
+def repair_request(command: str, result: dict, workspace: str, feedback: str = None):
+    """The repair prompt for a failed script run, or None if the failing file is not in the workspace"""
+    try:
+        path, line_numbers = failing_file(command, result, workspace)
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, ValueError):
+        return None
+    output = result.get("stderr") or result.get("stdout") or ""
+    if len(output) > MAX_ERROR_CHARS:
+        output = "…" + output[-MAX_ERROR_CHARS:]
+    display = "ai_solution/" + os.path.relpath(path, os.path.abspath(workspace)).replace("\\", "/")
+    parts = [f"FIX THIS FAILURE: {command} exited with code {result.get('exit_code')}",
+             f"Error output:\n{output.strip()}",
+             f"{display}:\n{numbered_region(text, line_numbers)}"]
+    if feedback:
+        parts.append(f"Your previous edits were rejected: {feedback}")
+    return "\n\n".join(parts)
+
+def apply_patch_calls(response: AIMessage, workspace: str, store=None):
+    """(ToolMessages, errors) for the patch_file calls of response, applied to the workspace (and artifact store)"""
+    messages, errors = [], []
+    for call in response.tool_calls:
+        if call["name"] != "patch_file":
+            continue
+        outcome = patch_batch(call["args"].get("path", ""), call["args"].get("edits", []), workspace, store)
+        errors += [error["error"] for error in outcome["errors"]]
+        messages.append(ToolMessage(content=json.dumps(outcome), tool_call_id=call["id"], name="patch_file"))
+    return messages, errors
+
+def rerun_messages(command: str, result: dict):
+    """The rerun of command as a run_command call and its result, like a rule-executor step"""
+    call_id = f"repair_{uuid.uuid4().hex}"
+    return [AIMessage(content="", tool_calls=[{"name": "run_command", "args": {"command": command}, "id": call_id}]),
+            ToolMessage(content=json.dumps(result, ensure_ascii=False), tool_call_id=call_id, name="run_command")]
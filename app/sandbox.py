@@ -0,0 +1,358 @@
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing_extensions import TypedDict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+WORKSPACE = os.path.abspath("ai_solution")
+WALL_TIMEOUT = 30          # seconds
+CPU_TIMEOUT = 20           # seconds of CPU time
+MEMORY_LIMIT_MB = 1024
+FILE_SIZE_LIMIT_MB = 50
+MAX_OUTPUT_BYTES = 16 * 1024   # kept per stream, split between head and tail
+
+# An ai_solution path at the start of a shell word, optionally opening a quoted word
+_WORKSPACE_ARG = re.compile(r"""(["']?)ai_solution(?:[/\\]|(?=["'\s;&|()<>]|$))""")
+_HEREDOC = re.compile(r"""<<-?[ \t]*(["']?)([\w.-]+)\1""")
+_WORD_BREAKS = set(" \t\n;&|()<>=")
+_PYTHON_RUN = re.compile(r"^\s*python3?\s+([\w./\\-]+\.py)\s*$")
+
+class CommandResult(TypedDict):
+    command: str
+    exit_code: int
+    stdout: str
+    stderr: str
+    duration: float
+    truncated: bool
+    timed_out: bool
+
+class HeadTailBuffer:
+    """Keeps the first and last `cap // 2` bytes of a stream and counts the rest"""
+
+    def __init__(self, cap: int = MAX_OUTPUT_BYTES):
+        self.head_cap = cap // 2
+        self.tail_cap = cap - self.head_cap
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        room = self.head_cap - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            del self.tail[:-self.tail_cap]
+
+    @property
+    def truncated(self):
+        return self.total > len(self.head) + len(self.tail)
+
+    def text(self):
+        head = self.head.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        if self.truncated:
+            skipped = self.total - len(self.head) - len(self.tail)
+            return f"{head}\n... [{skipped} bytes truncated] ...\n{tail}"
+        return head + tail
+
+def jail_command(command: str):
+    """Rewrites ai_solution/ path arguments relative to the workspace, which becomes the cwd.
+
+    Only shell words (and redirection targets) that start with ai_solution are
+    rewritten: text inside quoted arguments and heredoc bodies is file content
+    or code and stays as it is. This keeps generated commands inside
+    ai_solution; it is a guard rail against stray writes, not a security boundary.
+    """
+    out, quote, heredocs, i = [], None, [], 0
+    while i < len(command):
+        c = command[i]
+        if quote is None:
+            if i == 0 or command[i - 1] in _WORD_BREAKS:
+                path = _WORKSPACE_ARG.match(command, i)
+                if path:
+                    out.append(path.group(1) + "./")
+                    quote = path.group(1) or None
+                    i = path.end()
+                    continue
+            heredoc = _HEREDOC.match(command, i) if c == "<" and not command.startswith("<<<", i) else None
+            if heredoc:
+                heredocs.append(heredoc.group(2))
+                out.append(heredoc.group(0))
+                i = heredoc.end()
+                continue
+            if c == "\n" and heredocs:
+                out.append(c)
+                i = _skip_heredocs(command, i + 1, heredocs, out.append)
+                heredocs = []
+                continue
+            if c == "\\":
+                out.append(command[i:i + 2])
+                i += 2
+                continue
+            if c in "'\"":
+                quote = c
+        elif c == quote:
+            quote = None
+        elif c == "\\" and quote == '"':
+            out.append(command[i:i + 2])
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+def _skip_heredocs(command: str, start: int, delimiters: list, emit):
+    """Emits the heredoc bodies starting at start verbatim, up to and including their delimiter lines; returns the end"""
+    i = start
+    for delimiter in delimiters:
+        while i < len(command):
+            end = command.find("\n", i)
+            end = len(command) if end < 0 else end + 1
+            line, i = command[i:end], end
+            emit(line)
+            if line.strip() == delimiter:
+                break
+    return i
+
+def workspace_for(config: dict = None):
+    """Workspace of a graph run: configurable["workspace"] when set (one per server session), else ./ai_solution"""
+    return ((config or {}).get("configurable") or {}).get("workspace") or WORKSPACE
+
+def _limited(command: str, cpu_seconds: int, memory_mb: int):
+    """command preceded by ulimit calls for CPU, address space and file size (POSIX sh).
+
+    The shell sets the rlimits itself before running the command; a preexec_fn
+    would set them between fork and exec, which can deadlock while other
+    threads (the server's and batch mode's thread pools) hold locks.
+    """
+    # ulimit -v counts KiB and -f 512-byte blocks; the soft CPU limit sends SIGXCPU, the hard one SIGKILL
+    return (f"ulimit -S -t {cpu_seconds}; ulimit -H -t {cpu_seconds + 1}; ulimit -v {memory_mb * 1024}; "
+            f"ulimit -f {FILE_SIZE_LIMIT_MB * 2048}\n{command}")
+
+def _drain(stream, buffer: HeadTailBuffer):
+    for chunk in iter(lambda: stream.read(4096), b""):
+        buffer.write(chunk)
+    stream.close()
+
+def run_sandboxed(command: str, cwd: str = None, timeout: float = WALL_TIMEOUT, cpu_seconds: int = CPU_TIMEOUT,
+                  memory_mb: int = MEMORY_LIMIT_MB, max_output: int = MAX_OUTPUT_BYTES) -> CommandResult:
+    """Runs a shell command in the workspace with wall/CPU timeouts and capped output"""
+    cwd = cwd or WORKSPACE
+    os.makedirs(cwd, exist_ok=True)
+    command = jail_command(command)
+
+    # Scripts that run inside a warm interpreter skip the shell and interpreter startup; when every
+    # worker is busy they start cold instead of queueing behind another session's script
+    match = _PYTHON_RUN.match(command)
+    if match and _pool is not None:
+        result = _pool.run(match.group(1), cwd, timeout, cpu_seconds, memory_mb, max_output, command, wait=False)
+        if result is not None:
+            return result
+
+    if resource is not None:
+        shell_command, popen_kwargs = _limited(command, cpu_seconds, memory_mb), {"start_new_session": True}
+    else:
+        shell_command, popen_kwargs = command, {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+
+    start = time.perf_counter()
+    process = subprocess.Popen(shell_command, shell=True, cwd=cwd, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kwargs)
+    stdout, stderr = HeadTailBuffer(max_output), HeadTailBuffer(max_output)
+    readers = [threading.Thread(target=_drain, args=(process.stdout, stdout), daemon=True),
+               threading.Thread(target=_drain, args=(process.stderr, stderr), daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        if resource is not None:
+            _kill_group(process.pid)
+        else:
+            process.kill()
+        process.wait()
+    for reader in readers:
+        reader.join(timeout=1)
+
+    return CommandResult(
+        command=command,
+        exit_code=process.returncode,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        duration=round(time.perf_counter() - start, 3),
+        truncated=stdout.truncated or stderr.truncated,
+        timed_out=timed_out,
+    )
+
+# Runs inside each warm worker: read a job per line, fork, run the script in the child
+_WORKER_SOURCE = r"""
+import json, os, runpy, sys, resource
+for line in sys.stdin:
+    job = json.loads(line)
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            os.setsid()
+            os.chdir(job["cwd"])
+            resource.setrlimit(resource.RLIMIT_CPU, (job["cpu"], job["cpu"] + 1))
+            resource.setrlimit(resource.RLIMIT_AS, (job["memory"],) * 2)
+            resource.setrlimit(resource.RLIMIT_FSIZE, (job["fsize"],) * 2)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(os.open(job["stdout"], os.O_WRONLY), 1)
+            os.dup2(os.open(job["stderr"], os.O_WRONLY), 2)
+            sys.stdin = open(0, closefd=False)
+            sys.stdout = open(1, "w", buffering=1, closefd=False)
+            sys.stderr = open(2, "w", buffering=1, closefd=False)
+            sys.argv = [job["path"]]
+            path = os.path.abspath(job["path"])
+            sys.path.insert(0, os.path.dirname(path))
+            try:
+                runpy.run_path(path, run_name="__main__")
+                code = 0
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except BaseException as e:
+                import traceback
+                # Start at the script's own frames, like a cold "python main.py"
+                tb = e.__traceback__
+                while tb is not None and tb.tb_frame.f_code.co_filename != path:
+                    tb = tb.tb_next
+                traceback.print_exception(type(e), e, tb)
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+    print(json.dumps({"pid": pid}), flush=True)
+    _, status = os.waitpid(pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    print(json.dumps({"exit_code": code}), flush=True)
+"""
+
+class PythonWorkerPool:
+    """Pre-started Python interpreters that run "python <file>.py" steps by forking.
+
+    Each worker is a long-lived interpreter; a job forks it, so the script starts
+    in an already-initialised process and a crash never takes the worker down.
+    Output goes to temp files and is read back with the same head/tail cap as
+    shell commands. POSIX only (needs os.fork).
+    """
+
+    def __init__(self, size: int = 2):
+        self.idle = []
+        self.lock = threading.Condition()
+        for _ in range(size):
+            self.idle.append(self._spawn())
+
+    def _spawn(self):
+        return subprocess.Popen([sys.executable, "-u", "-c", _WORKER_SOURCE], stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    def _acquire(self, wait: bool = True):
+        with self.lock:
+            while not self.idle:
+                if not wait:
+                    return None
+                self.lock.wait()
+            worker = self.idle.pop()
+        if worker.poll() is not None:
+            worker = self._spawn()
+        return worker
+
+    def _release(self, worker):
+        with self.lock:
+            self.idle.append(worker)
+            self.lock.notify()
+
+    def run(self, path, cwd, timeout, cpu_seconds, memory_mb, max_output, command, wait: bool = True):
+        """CommandResult of the script, or None when wait is False and every worker is busy"""
+        worker = self._acquire(wait)
+        if worker is None:
+            return None
+        with tempfile.NamedTemporaryFile(delete=False) as out, tempfile.NamedTemporaryFile(delete=False) as err:
+            stdout_path, stderr_path = out.name, err.name
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            worker.stdin.write(json.dumps({
+                "path": path, "cwd": cwd, "cpu": cpu_seconds, "memory": memory_mb * 1024 * 1024,
+                "fsize": FILE_SIZE_LIMIT_MB * 1024 * 1024, "stdout": stdout_path, "stderr": stderr_path,
+            }) + "\n")
+            worker.stdin.flush()
+            child = json.loads(worker.stdout.readline())["pid"]
+            killer = threading.Timer(timeout, _kill_group, args=(child,))
+            killer.start()
+            exit_code = json.loads(worker.stdout.readline())["exit_code"]
+            timed_out = not killer.is_alive()
+            killer.cancel()
+        finally:
+            self._release(worker)
+        stdout, stderr = _read_capped(stdout_path, max_output), _read_capped(stderr_path, max_output)
+        return CommandResult(
+            command=command,
+            exit_code=exit_code,
+            stdout=stdout.text(),
+            stderr=stderr.text(),
+            duration=round(time.perf_counter() - start, 3),
+            truncated=stdout.truncated or stderr.truncated,
+            timed_out=timed_out,
+        )
+
+    def close(self):
+        with self.lock:
+            for worker in self.idle:
+                worker.stdin.close()
+                worker.wait()
+            self.idle = []
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # finished just before the timeout fired
+
+def _read_capped(path: str, max_output: int):
+    buffer = HeadTailBuffer(max_output)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            buffer.write(f.read(buffer.head_cap))
+            if size > buffer.head_cap + buffer.tail_cap:
+                # Only the tail is kept; skip the middle without reading it
+                buffer.total += size - buffer.head_cap - buffer.tail_cap
+                f.seek(size - buffer.tail_cap)
+            buffer.write(f.read())
+    finally:
+        os.unlink(path)
+    return buffer
+
+_pool = None
+
+def start_worker_pool(size: int = 2):
+    """Starts the warm interpreter pool used for "python <file>.py" commands (POSIX only)"""
+    global _pool
+    if _pool is None and hasattr(os, "fork"):
+        _pool = PythonWorkerPool(size)
+    return _pool
+
+def stop_worker_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+from langgraph.checkpoint.mongodb import AsyncMongoDBSaver
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from checkpointing import CheckpointPolicy
+from metrics import Metrics, instrument_checkpointer
+from sandbox import start_worker_pool, stop_worker_pool
+from chat_graph import GraphOptions, create_chat_graph
+from main import MONGODB_URI, add_graph_arguments, graph_options_from_args, initial_state_for, metrics
+
+SESSION_ID = re.compile(r"^[\w-]{1,64}$")
+
+def transcribe_wav(data: bytes):
+    """Google speech recognition of an uploaded WAV/AIFF/FLAC clip (blocking; run it in a thread)"""
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(io.BytesIO(data)) as source:
+        audio = recognizer.record(source)
+    try:
+        return recognizer.recognize_google(audio)
+    except sr.UnknownValueError:
+        raise ValueError("could not understand the audio") from None
+
+class Session:
+    """One connected client: its own thread_id, ai_solution workspace and queue of pending turns"""
+
+    def __init__(self, session_id: str, workspace_root: str, max_queued: int):
+        self.id = session_id
+        self.thread_id = f"session-{session_id}"
+        self.workspace = os.path.abspath(os.path.join(workspace_root, session_id, "ai_solution"))
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.turns = 0
+        self.worker = None
+
+    def config(self, callbacks: list):
+        return {"configurable": {"thread_id": self.thread_id, "workspace": self.workspace}, "callbacks": callbacks}
+
+class SessionServer:
+    """Serves many WebSocket clients from one compiled async graph.
+
+    Protocol, one JSON object per text frame:
+        connect ws://host:port/?session=<id>   (omit session to start a new one, reuse it to resume)
+        ← {"type": "session", "session": id}
+        → {"type": "text", "text": "...", "id": "t1"}  or  {"type": "audio", "wav": "<base64>", "id": "t2"}
+        ← {"type": "queued", "id", "position"}, then {"type": "progress", "id", "node"} per finished node
+        ← {"type": "result", "id", "text", "plan", "seconds", "llm_calls", "prompt_tokens", "completion_tokens"}
+          or  {"type": "error", "id", "message"}
+        ← {"type": "busy", "id"} when the session already has max_queued turns waiting
+
+    Each session runs its turns in order on its own worker task; at most
+    max_active_turns graph runs execute at once across all sessions. Tools and
+    speech recognition run on the loop's thread pool, so a slow script only
+    holds its own session. The checkpointer (one MongoDB client) and the graph
+    module's chat model (one OpenAI client) are shared, so every session uses
+    the same connection pools. With workspaces (the graph's WorkspaceManager)
+    every turn runs in its own directory of the session's workspace.
+    """
+
+    def __init__(self, graph, checkpointer, checkpoint_policy: CheckpointPolicy = None, metrics: Metrics = None,
+                 workspace_root: str = "sessions", max_sessions: int = 100, max_active_turns: int = 8,
+                 max_queued: int = 4, transcribe=transcribe_wav, workspaces=None):
+        self.graph = graph
+        self.checkpointer = checkpointer
+        self.checkpoint_policy = checkpoint_policy or CheckpointPolicy()
+        self.metrics = metrics or Metrics()
+        self.workspace_root = workspace_root
+        self.max_sessions = max_sessions
+        self.max_queued = max_queued
+        self.transcribe = transcribe
+        self.workspaces = workspaces
+        self.active = asyncio.Semaphore(max_active_turns)
+        self.sessions = {}
+        self.completed = 0
+        self.rejected = 0
+
+    @staticmethod
+    async def _send(connection, **message):
+        try:
+            await connection.send(json.dumps(message))
+        except ConnectionClosed:
+            pass
+
+    async def handler(self, connection):
+        query = parse_qs(urlparse(connection.request.path).query)
+        session_id = query.get("session", [uuid.uuid4().hex])[0]
+        if not SESSION_ID.match(session_id):
+            await connection.close(1008, "invalid session id")
+            return
+        if session_id in self.sessions:
+            await connection.close(1008, "session already connected")
+            return
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected += 1
+            await connection.close(1013, "server full, try again later")
+            return
+
+        session = Session(session_id, self.workspace_root, self.max_queued)
+        self.sessions[session_id] = session
+        session.worker = asyncio.create_task(self._work(session, connection))
+        try:
+            await self._send(connection, type="session", session=session_id)
+            async for frame in connection:
+                await self._accept(session, connection, frame)
+        except ConnectionClosed:
+            pass
+        finally:
+            # Drop turns that have not started; the running one finishes so its checkpoint is persisted
+            while not session.queue.empty():
+                session.queue.get_nowait()
+            session.queue.put_nowait(None)
+            await session.worker
+            del self.sessions[session_id]
+
+    async def _accept(self, session: Session, connection, frame):
+        try:
+            request = json.loads(frame)
+        except ValueError:
+            await self._send(connection, type="error", id=None, message="frames must be JSON objects")
+            return
+        turn_id = request.get("id") if isinstance(request, dict) else None
+        if not isinstance(request, dict) or request.get("type") not in ("text", "audio"):
+            await self._send(connection, type="error", id=turn_id, message='type must be "text" or "audio"')
+            return
+        try:
+            session.queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            await self._send(connection, type="busy", id=turn_id)
+            return
+        await self._send(connection, type="queued", id=turn_id, position=session.queue.qsize())
+
+    async def _work(self, session: Session, connection):
+        while (request := await session.queue.get()) is not None:
+            await self._run_turn(session, connection, request)
+
+    async def _text_of(self, request: dict, turn: int, session: Session):
+        if request["type"] == "text":
+            return request.get("text", "")
+        with self.metrics.stage("recognize", turn=turn, session=session.id):
+            return await asyncio.to_thread(self.transcribe, base64.b64decode(request.get("wav", "")))
+
+    async def _run_turn(self, session: Session, connection, request: dict):
+        turn_id = request.get("id")
+        session.turns += 1
+        turn = session.turns
+        started = time.perf_counter()
+        final = None
+        try:
+            # Recognition happens before admission: it runs in a thread and does not need a graph slot
+            text = await self._text_of(request, turn, session)
+            config = session.config([self.metrics.callback])
+            if self.workspaces is not None:
+                config = await asyncio.to_thread(self.workspaces.begin_turn, config)
+            waiting = time.perf_counter()
+            async with self.active:
+                self.metrics.record("admission", time.perf_counter() - waiting, turn=turn, session=session.id)
+                # The turn's own totals: other sessions' runs add to theirs (Metrics totals are context-local)
+                with self.metrics.graph_run(turn=turn, session=session.id) as totals:
+                    async for mode, chunk in self.graph.astream(initial_state_for(text),
+                                                                config,
+                                                                stream_mode=["updates", "values"],
+                                                                **self.checkpoint_policy.stream_kwargs()):
+                        if mode == "updates":
+                            for node in chunk:
+                                await self._send(connection, type="progress", id=turn_id, node=node)
+                        else:
+                            final = chunk
+                    await self.checkpoint_policy.afinish_turn(self.checkpointer, session.thread_id)
+        except Exception as e:
+            await self._send(connection, type="error", id=turn_id, message=str(e))
+            return
+        self.completed += 1
+        messages = (final or {}).get("messages") or []
+        await self._send(connection, type="result", id=turn_id, text=messages[-1].content if messages else "",
+                         plan=(final or {}).get("plan", []), seconds=round(time.perf_counter() - started, 3),
+                         llm_calls=totals["llm_calls"], prompt_tokens=totals["prompt_tokens"],
+                         completion_tokens=totals["completion_tokens"])
+
+async def serve_sessions(args, graph_options: GraphOptions, checkpoint_policy: CheckpointPolicy):
+    # Tool calls and speech recognition run in the default executor; size it for the allowed concurrency
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+    async with AsyncMongoDBSaver.from_conn_string(args.mongodb_uri) as saver:
+        checkpointer = checkpoint_policy.wrap(instrument_checkpointer(saver, metrics))
+        graph = create_chat_graph(checkpointer=checkpointer, is_async=True, options=graph_options)
+        server = SessionServer(graph, checkpointer, checkpoint_policy, metrics, workspace_root=args.workspace_root,
+                               max_sessions=args.max_sessions, max_active_turns=args.max_active_turns,
+                               max_queued=args.max_queued, workspaces=graph_options.workspaces)
+        async with serve(server.handler, args.host, args.port, max_size=args.max_upload_mb * 1024 * 1024) as ws:
+            print(f"🌐 AI Coding Assistant serving ws://{args.host}:{args.port} "
+                  f"({args.max_active_turns} concurrent turns, up to {args.max_sessions} sessions)")
+            await ws.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session WebSocket server for the AI coding assistant")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mongodb-uri", default=MONGODB_URI,
+                        help="shared checkpoint store; set maxPoolSize in the URI to size its connection pool")
+    parser.add_argument("--workspace-root", default="sessions",
+                        help="each session writes to <root>/<session>/ai_solution")
+    parser.add_argument("--max-sessions", type=int, default=100, help="connected sessions before new ones are refused")
+    parser.add_argument("--max-active-turns", type=int, default=8, help="graph runs executing at once")
+    parser.add_argument("--max-queued", type=int, default=4, help="turns a session may have waiting before 'busy'")
+    parser.add_argument("--threads", type=int, default=32, help="threads for tool calls and speech recognition")
+    parser.add_argument("--max-upload-mb", type=int, default=16, help="largest accepted frame (audio uploads)")
+    add_graph_arguments(parser)
+    args = parser.parse_args()
+    metrics.path = args.metrics
+    graph_options, checkpoint_policy = graph_options_from_args(args)
+
+    if args.sandbox_workers > 0:
+        start_worker_pool(args.sandbox_workers)
+
+    try:
+        asyncio.run(serve_sessions(args, graph_options, checkpoint_policy))
+    except KeyboardInterrupt:
+        print("\n🌐 Server stopped.")
+    finally:
+        stop_worker_pool()
+        if args.metrics:
+            metrics.print_summary()
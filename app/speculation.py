@@ -0,0 +1,177 @@
+import difflib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+from plan_cache import discriminators, normalize
+
+def prefilled(state: dict, node: str):
+    """True when the speculator already produced `node`'s output for this turn"""
+    return node in (state.get("speculated") or [])
+
+def _words(text: str):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+_NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty", "thirty", "forty",
+    "fifty", "sixty", "seventy", "eighty", "ninety", "hundred", "thousand", "million", "billion", "half", "double",
+}
+
+def numbers(text: str):
+    """The number tokens of a transcript, in order ("first 10 primes" → ["10"])"""
+    return [word for word in _words(text) if word in _NUMBER_WORDS or any(c.isdigit() for c in word)]
+
+def must_match(text: str):
+    """What a speculation and the final transcript must share exactly: their numbers and operation words"""
+    return numbers(text), discriminators(normalize(text))
+
+def similarity(a: str, b: str):
+    """Word-level similarity of two transcripts in [0, 1]"""
+    a, b = _words(a), _words(b)
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+class _CallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+
+class Speculation:
+    def __init__(self, text: str, future):
+        self.text = text
+        self.future = future
+        self.calls = 0
+        self.duration = 0.0
+
+class Speculator:
+    """Runs the planner nodes on partial transcripts while the user is still speaking.
+
+    stages are the (node name, sync node function) pairs to run ahead, e.g.
+    [("enhance_query", enhance_query), ("create_plan", create_plan)]. feed()
+    takes partial transcripts from the capture thread and starts a speculative
+    run once the partial has `min_words` words and has grown by `min_new_words`
+    since the last one; a newer partial replaces a run that has not started,
+    and up to `workers` runs are in flight.
+    resolve() takes the final transcript: if the closest speculation with the
+    same numbers and operation words (must_match(): "largest" or "10" instead
+    of "smallest" or "20" means a different program) is at least `threshold`
+    similar, its state update (with "speculated" naming the prefilled nodes,
+    which then skip their LLM calls) is returned, otherwise None. Speculations
+    that are not used count as discarded, and their LLM calls as wasted.
+    """
+
+    def __init__(self, stages: list, threshold: float = 0.9, min_words: int = 3, min_new_words: int = 2,
+                 workers: int = 2):
+        self.stages = stages
+        self.threshold = threshold
+        self.min_words = min_words
+        self.min_new_words = min_new_words
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculate")
+        self.speculations = []
+        self.started = self.reused = self.discarded = 0
+        self.wasted_calls = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _run(self, speculation: Speculation):
+        with self._lock:
+            self.started += 1
+        started = time.perf_counter()
+        counter = _CallCounter()
+        state = {"messages": [HumanMessage(content=speculation.text)], "enhanced_query": "", "plan": []}
+        update = {}
+        try:
+            for _, node in self.stages:
+                result = RunnableLambda(node).invoke(state, {"callbacks": [counter]}) or {}
+                state.update(result)
+                update.update(result)
+        finally:
+            speculation.calls = counter.calls
+            speculation.duration = time.perf_counter() - started
+        update["speculated"] = [name for name, _ in self.stages]
+        return update
+
+    def feed(self, partial: str):
+        words = len(_words(partial))
+        with self._lock:
+            last = self.speculations[-1] if self.speculations else None
+            if words < self.min_words or (last is not None and words < len(_words(last.text)) + self.min_new_words):
+                return
+            if last is not None and last.future.cancel():
+                self.speculations.pop()
+            speculation = Speculation(partial, None)
+            speculation.future = self.executor.submit(self._run, speculation)
+            self.speculations.append(speculation)
+
+    def _waste(self, speculation: Speculation):
+        """Counts the calls of a speculation that will not be used, once it has finished"""
+        with self._lock:
+            self.discarded += 1
+        if speculation.future.cancel():
+            return
+        speculation.future.add_done_callback(lambda _: self._add_wasted(speculation.calls))
+
+    def _add_wasted(self, calls: int):
+        with self._lock:
+            self.wasted_calls += calls
+
+    def discard(self):
+        """Drops the speculations of an utterance that produced no turn"""
+        with self._lock:
+            speculations, self.speculations = self.speculations, []
+        for speculation in speculations:
+            self._waste(speculation)
+
+    def resolve(self, final: str):
+        """State update precomputed for `final`, or None if no speculation is close enough"""
+        with self._lock:
+            speculations, self.speculations = self.speculations, []
+        required = must_match(final)
+        best = max((s for s in speculations if must_match(s.text) == required),
+                   key=lambda s: similarity(s.text, final), default=None)
+        for speculation in speculations:
+            if speculation is not best:
+                self._waste(speculation)
+        if best is None:
+            return None
+        if similarity(best.text, final) < self.threshold:
+            self._waste(best)
+            return None
+
+        if best.future.cancel():
+            # Still queued behind an older run: starting fresh in the graph is quicker than waiting
+            with self._lock:
+                self.discarded += 1
+            return None
+        waiting = time.perf_counter()
+        try:
+            update = best.future.result()
+        except Exception:
+            with self._lock:
+                self.discarded += 1
+            self._add_wasted(best.calls)
+            return None
+        with self._lock:
+            self.reused += 1
+            # The planner would have taken best.duration from now; we only waited for what was left
+            self.saved_seconds += max(0.0, best.duration - (time.perf_counter() - waiting))
+        return update
+
+    def stats(self):
+        with self._lock:
+            return {"started": self.started, "reused": self.reused, "discarded": self.discarded,
+                    "wasted_calls": self.wasted_calls, "saved_seconds": self.saved_seconds}
+
+    def close(self):
+        self.discard()
+        self.executor.shutdown(wait=True)
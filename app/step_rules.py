@@ -0,0 +1,78 @@
+import json
+import os
+import re
+import time
+import uuid
+from langchain_core.messages import AIMessage, ToolMessage
+from sandbox import CommandResult
+
+_PY_FILE = re.compile(r"([\w\-./\\]+\.py)\b")
+_DIRECTORY_STEP = re.compile(r"^\s*create\b.*\bai_solution\b.*\b(directory|folder)\b", re.IGNORECASE)
+_RUN_STEP = re.compile(r"^\s*(run|test|execute|verify)\b", re.IGNORECASE)
+_AUTHORING = re.compile(r"\b(create|write|add|implement|modify|update)\b", re.IGNORECASE)
+_SHELL_STEP = re.compile(r"^\s*(install|pip|mkdir|cd|list|check)\b", re.IGNORECASE)
+
+def canonical_command(plan: list, index: int, mkdir_command: str, run_command_template: str):
+    """Shell command for a canonical directory/run step, or None if the step needs the LLM.
+
+    Recognised steps:
+    - "Create ai_solution directory" (no .py file mentioned) → mkdir_command
+    - "Run <file>.py ..." / "Test the <file>.py ..." → run_command_template with the file;
+      "Test the created Python file by running it" uses the last .py file named earlier in the plan
+    """
+    step = plan[index]
+    if _DIRECTORY_STEP.search(step) and not _PY_FILE.search(step):
+        return mkdir_command
+    if _RUN_STEP.search(step) and not _AUTHORING.search(step):
+        match = _PY_FILE.search(step)
+        if match is None:
+            earlier = [m for s in plan[:index] for m in _PY_FILE.findall(s)]
+            if not earlier:
+                return None
+            filename = earlier[-1]
+        else:
+            filename = match.group(1)
+        filename = filename.replace("\\", "/")
+        if not filename.startswith("ai_solution/"):
+            filename = f"ai_solution/{filename.split('/')[-1]}"
+        return run_command_template.format(file=filename)
+    return None
+
+def is_shell_step(step: str):
+    """Whether a plan step only runs commands (directory, run/test, install) and authors no code"""
+    if _DIRECTORY_STEP.search(step) and not _PY_FILE.search(step):
+        return True
+    return bool(_RUN_STEP.search(step) or _SHELL_STEP.search(step)) and not _AUTHORING.search(step)
+
+def record_path(state, path: str):
+    """step_paths update marking how the current step was executed ("rule", "llm" or "cache")"""
+    current_step = state.get("current_step", 0)
+    return (state.get("step_paths") or [])[:current_step] + [path]
+
+def make_directory(command: str, workspace: str, call_id: str):
+    """run_command result of a directory step, done in-process: the workspace is the only directory it makes"""
+    start = time.perf_counter()
+    os.makedirs(workspace, exist_ok=True)
+    result = CommandResult(command=command, exit_code=0, stdout="", stderr="",
+                           duration=round(time.perf_counter() - start, 3), truncated=False, timed_out=False)
+    return ToolMessage(content=json.dumps(result, ensure_ascii=False), tool_call_id=call_id, name="run_command")
+
+def rule_step(state, mkdir_command: str, run_command_template: str, workspace: str = None):
+    """execute_step update dispatching a canonical step straight to run_command, or None.
+
+    With the workspace, directory steps come with their result and need no tools round trip.
+    """
+    plan = state.get("plan", [])
+    current_step = state.get("current_step", 0)
+    command = canonical_command(plan, current_step, mkdir_command, run_command_template)
+    if command is None:
+        return None
+    tool_call = {"name": "run_command", "args": {"command": command}, "id": f"rule_{uuid.uuid4().hex}"}
+    messages = [AIMessage(content="", tool_calls=[tool_call])]
+    if command == mkdir_command and workspace is not None:
+        messages.append(make_directory(command, workspace, tool_call["id"]))
+    return {
+        "messages": messages,
+        "current_step": current_step + 1,
+        "step_paths": record_path(state, "rule")
+    }
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import numpy as np
+from openai.helpers import LocalAudioPlayer
+
+TTS_MODEL = "gpt-4o-mini-tts"
+TTS_VOICE = "coral"
+TTS_INSTRUCTIONS = "Speak in a cheerful and positive tone, like a helpful coding assistant."
+
+# Graph nodes whose state update is spoken back to the user, and the field holding the reply
+SPOKEN_NODES = {"generate_summary": "execution_summary"}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+class SentenceChunker:
+    """Accumulates streamed tokens and hands out complete sentences.
+
+    A sentence only counts as complete once whitespace follows its final
+    punctuation, so "3.14" or "file.py" split across tokens is not cut early.
+    Sentences shorter than min_chars are merged with the next one to avoid
+    a TTS request per tiny fragment.
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str):
+        self.buffer += text
+        parts = _SENTENCE_END.split(self.buffer)
+        self.buffer = parts.pop()
+        sentences = []
+        pending = ""
+        for part in parts:
+            pending = f"{pending} {part}".strip()
+            if len(pending) >= self.min_chars:
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            self.buffer = f"{pending} {self.buffer}"
+        return sentences
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+def cache_key(text: str, voice: str = TTS_VOICE, model: str = TTS_MODEL, instructions: str = TTS_INSTRUCTIONS):
+    """Content address of a phrase's audio: everything that changes the synthesised PCM"""
+    payload = json.dumps([" ".join(text.split()), voice, model, instructions], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def spoken_reply(update: dict):
+    """The reply in a stream_mode="updates" chunk if it comes from a spoken node, else None"""
+    for node, values in update.items():
+        if node in SPOKEN_NODES and isinstance(values, dict) and values.get(SPOKEN_NODES[node]):
+            return values[SPOKEN_NODES[node]]
+    return None
+
+async def astream_spoken(graph, input, config, speaker: "StreamingSpeaker", **kwargs):
+    """graph.astream(stream_mode=["updates", "values"]) that hands the reply to speaker as soon as its node finishes.
+
+    Synthesis and playback start while the graph still runs the nodes after
+    the summary (history compaction) and writes its final checkpoint.
+    """
+    async for mode, chunk in graph.astream(input, config, stream_mode=["updates", "values"], **kwargs):
+        if mode == "updates":
+            reply = spoken_reply(chunk)
+            if reply:
+                speaker.say(reply)
+        yield mode, chunk
+
+def sentences_of(text: str):
+    """text split the way speakers hand it to TTS, so cached phrases match sentence by sentence"""
+    chunker = SentenceChunker()
+    return chunker.feed(text) + chunker.flush()
+
+class PhraseCache:
+    """On-disk PCM cache keyed by cache_key(), evicting least recently used files past `max_bytes`.
+
+    Reads touch the file's mtime, so recency survives restarts; writes go to a
+    temp file and are renamed into place.
+    """
+
+    def __init__(self, root: str = ".tts_cache", max_bytes: int = 200 * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self.sizes = {}
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".pcm"):
+                stat = os.stat(os.path.join(self.root, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.sizes[key] = size
+        self._evict()
+
+    def _path(self, key: str):
+        return os.path.join(self.root, f"{key}.pcm")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            with self._lock:
+                self.sizes.pop(key, None)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.sizes[key] = self.sizes.pop(key, len(data))  # most recent last
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        # Unique per writer: threads of one process may put the same phrase at once
+        fd, temp = tempfile.mkstemp(dir=self.root, prefix=f"{key}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, self._path(key))
+        with self._lock:
+            self.sizes.pop(key, None)
+            self.sizes[key] = len(data)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            total = sum(self.sizes.values())
+            evicted = []
+            while total > self.max_bytes and len(self.sizes) > 1:
+                key = next(iter(self.sizes))
+                total -= self.sizes.pop(key)
+                evicted.append(key)
+        for key in evicted:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self, key: str):
+        return key in self.sizes
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.sizes), "bytes": sum(self.sizes.values()), "hits": self.hits,
+                    "misses": self.misses}
+
+class Synthesizer:
+    """TTS client shared by all speakers: phrase cache plus at most `concurrency` requests in flight"""
+
+    def __init__(self, client, cache: PhraseCache = None, concurrency: int = 3):
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def limit(self):
+        """The request semaphore of the running event loop, created on its first request"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._limits:
+                # Loops only ever get added; a closed one's semaphore is dropped with it
+                self._limits = {l: s for l, s in self._limits.items() if not l.is_closed()}
+                self._limits[loop] = asyncio.Semaphore(self.concurrency)
+            return self._limits[loop]
+
+    async def stream(self, sentence: str, chunks: asyncio.Queue):
+        """Puts the sentence's int16 PCM on `chunks` as it arrives, then None; cached sentences in one go"""
+        key = cache_key(sentence)
+        try:
+            if self.cache is not None and key in self.cache:
+                data = await asyncio.to_thread(self.cache.get, key)
+                if data is not None:
+                    chunks.put_nowait(np.frombuffer(data, dtype=np.int16))
+                    return
+            await self._synthesize(sentence, key, chunks)
+        except Exception as e:
+            print(f"Speech synthesis error: {e}")
+            print(f"Text that would have been spoken: {sentence}")
+        finally:
+            chunks.put_nowait(None)
+
+    async def _synthesize(self, sentence: str, key: str, chunks: asyncio.Queue):
+        pcm = []
+        leftover = b""
+        async with self.limit():
+            async with self.client.audio.speech.with_streaming_response.create(
+                model=TTS_MODEL,
+                voice=TTS_VOICE,
+                input=sentence,
+                instructions=TTS_INSTRUCTIONS,
+                response_format="pcm",
+            ) as response:
+                async for chunk in response.iter_bytes(chunk_size=4800):
+                    # int16 PCM: carry an odd trailing byte over to the next chunk
+                    data = leftover + chunk
+                    usable = len(data) - len(data) % 2
+                    leftover = data[usable:]
+                    if usable:
+                        pcm.append(data[:usable])
+                        chunks.put_nowait(np.frombuffer(data[:usable], dtype=np.int16))
+        if self.cache is not None and pcm:
+            await asyncio.to_thread(self.cache.put, key, b"".join(pcm))
+
+    async def warm(self, phrases: list):
+        """Synthesises the sentences of `phrases` that are not cached yet, concurrently; returns how many"""
+        if self.cache is None:
+            return 0
+        missing = {s for phrase in phrases for s in sentences_of(phrase) if cache_key(s) not in self.cache}
+
+        async def fetch(sentence: str):
+            chunks = asyncio.Queue()
+            await self.stream(sentence, chunks)
+
+        await asyncio.gather(*(fetch(sentence) for sentence in missing))
+        return len(missing)
+
+    async def speak(self, text: str, player, speech_ended_at: float = None):
+        """Speaks `text`: sentences synthesised in parallel, played in order; returns the finished speaker"""
+        speaker = StreamingSpeaker(self, player, speech_ended_at=speech_ended_at)
+        speaker.feed(text)
+        await speaker.close()
+        return speaker
+
+class StreamingSpeaker:
+    """Sentence queue → concurrent TTS → in-order gapless playback.
+
+    feed() takes LLM tokens as they arrive; each completed sentence starts its
+    synthesis right away (up to the synthesizer's concurrency, cached sentences
+    need no request), and the sentences' PCM is played back-to-back in order
+    on a single LocalAudioPlayer stream. Pass speech_ended_at
+    (time.perf_counter() at end of the user's speech) to get
+    time_to_first_audio reported; first_audio_at is set either way.
+    """
+
+    def __init__(self, synthesizer: Synthesizer, player: LocalAudioPlayer, speech_ended_at: float = None):
+        self.synthesizer = synthesizer
+        self.player = player
+        self.speech_ended_at = speech_ended_at
+        self.started_at = time.perf_counter()
+        self.time_to_first_audio = None
+        self.first_audio_at = None
+        self.chunker = SentenceChunker()
+        self.order = asyncio.Queue()
+        self.tasks = []
+        self._playback = None
+
+    def feed(self, text: str):
+        for sentence in self.chunker.feed(text):
+            self._start(sentence)
+
+    def say(self, text: str):
+        """Starts speaking a complete text, including its last sentence"""
+        self.feed(text)
+        for sentence in self.chunker.flush():
+            self._start(sentence)
+
+    def _start(self, sentence: str):
+        chunks = asyncio.Queue()
+        self.tasks.append(asyncio.create_task(self.synthesizer.stream(sentence, chunks)))
+        self.order.put_nowait(chunks)
+        if self._playback is None:
+            self._playback = asyncio.create_task(self.player.play_stream(self._buffers()))
+
+    async def close(self):
+        """Flushes the last partial sentence and waits until playback is done"""
+        for sentence in self.chunker.flush():
+            self._start(sentence)
+        self.order.put_nowait(None)
+        await asyncio.gather(*self.tasks)
+        if self._playback is not None:
+            await self._playback
+
+    async def _buffers(self):
+        while True:
+            chunks = await self.order.get()
+            if chunks is None:
+                return
+            while True:
+                buffer = await chunks.get()
+                if buffer is None:
+                    break
+                if self.first_audio_at is None:
+                    self.first_audio_at = time.perf_counter()
+                    if self.speech_ended_at is not None:
+                        self.time_to_first_audio = self.first_audio_at - self.speech_ended_at
+                        print(f"⏱️ End of speech → first audio: {self.time_to_first_audio:.2f}s")
+                yield buffer
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+from sandbox import workspace_for
+
+TURN_DIR = re.compile(r"^turn-(\d+)$")
+MIN_PREFIX = 8
+MAX_LISTED_ARTIFACTS = 10
+SKIPPED_DIRS = {"__pycache__", ".pytest_cache"}
+# Commands that only read files; anything else (scripts, redirections, sed -i, ...) may write in place
+READ_ONLY_COMMANDS = {"cat", "cd", "diff", "du", "echo", "file", "grep", "head", "ls", "pwd", "stat", "tail",
+                      "tree", "wc", "which"}
+
+def digest_of(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+def artifact_store_for(config: dict = None):
+    """ArtifactStore of a graph run: configurable["artifact_store"] when set (per-turn workspaces), else None"""
+    root = ((config or {}).get("configurable") or {}).get("artifact_store")
+    return ArtifactStore(root) if root else None
+
+def _read_only(path: str):
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+def _store_backed(info: os.stat_result):
+    """Whether a workspace file is a link to a store object: shared and read-only"""
+    return info.st_nlink > 1 and not info.st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+def _workspace_files(root: str):
+    """Paths of the regular files under root, without caches and temp files"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if name not in SKIPPED_DIRS]
+        for name in files:
+            path = os.path.join(directory, name)
+            if not name.startswith(".tmp_") and not os.path.islink(path):
+                yield path
+
+def may_write(command: str):
+    """Whether a shell command can write files: False only for read-only programs without redirections"""
+    if ">" in command or "`" in command or "$(" in command:
+        return True
+    for part in re.split(r"&&|\|\||[;|\n]", command):
+        words = part.split()
+        if words and words[0] not in READ_ONLY_COMMANDS:
+            return True
+    return False
+
+def unshare(workspace: str):
+    """Replaces the workspace's store-backed files with private writable copies; returns how many.
+
+    Commands run before the store's read-only mode can protect anything:
+    root ignores it, and a script opening a linked file for writing would
+    change the object and every turn linked to it. WorkspaceManager.index_node
+    links files that are still unchanged back at the end of the turn.
+    """
+    copied = 0
+    for path in _workspace_files(workspace):
+        info = os.stat(path)
+        if not _store_backed(info):
+            continue
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, temp_path)
+            os.chmod(temp_path, stat.S_IMODE(info.st_mode) | stat.S_IWUSR)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        copied += 1
+    return copied
+
+class ArtifactStore:
+    """Content-addressed file store: one read-only object per distinct content, at <root>/<sha[:2]>/<sha>.
+
+    Workspace files are hardlinks to the objects, so identical files in any
+    number of turns and sessions take the space (and the write) of one. Links
+    are only ever replaced by an atomic rename, never written through, which is
+    how write_files and patch_file change files; commands get private copies
+    first (unshare()).
+    """
+
+    def __init__(self, root: str = ".artifacts"):
+        self.root = os.path.abspath(root)
+
+    def object_path(self, digest: str):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str):
+        return os.path.exists(self.object_path(digest))
+
+    def find(self, prefix: str):
+        """The digest starting with prefix (at least MIN_PREFIX hex characters), else None"""
+        prefix = prefix.strip().lower()
+        if len(prefix) < MIN_PREFIX or not re.fullmatch(r"[0-9a-f]+", prefix):
+            return None
+        try:
+            matches = [name for name in os.listdir(os.path.join(self.root, prefix[:2])) if name.startswith(prefix)]
+        except FileNotFoundError:
+            return None
+        return matches[0] if len(matches) == 1 else None
+
+    def put(self, data: bytes, digest: str = None):
+        """Stores data unless an object with its digest exists; returns (digest, whether bytes were written)"""
+        digest = digest or digest_of(data)
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            return digest, False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            _read_only(temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return digest, True
+
+    def holds(self, path: str, digest: str):
+        """Whether path already is the object of digest"""
+        try:
+            return os.path.samefile(path, self.object_path(digest))
+        except OSError:
+            return False
+
+    def relink(self, workspace: str):
+        """Links the workspace's private files whose content the store has back to its objects; returns how many"""
+        linked = 0
+        for path in _workspace_files(workspace):
+            if os.stat(path).st_nlink > 1:
+                continue
+            with open(path, "rb") as f:
+                digest = digest_of(f.read())
+            if self.has(digest):
+                self.link(digest, path)
+                linked += 1
+        return linked
+
+    def link(self, digest: str, target: str):
+        """Points target at the object of digest atomically (a copy if the store is on another filesystem)"""
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f".tmp_{os.getpid()}_{digest[:12]}_{os.urandom(4).hex()}")
+        try:
+            os.link(self.object_path(digest), temp_path)
+        except OSError:
+            shutil.copyfile(self.object_path(digest), temp_path)
+        try:
+            os.replace(temp_path, target)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+class WorkspaceManager:
+    """Gives every turn its own directory and records the files it produced.
+
+    begin_turn() turns a thread's config into the config of its next turn,
+    whose workspace is <workspace>/turn-NNNN; index_node removes it again when
+    the turn was rejected, and with keep_turns the directories of all but the
+    latest keep_turns turns. A new turn starts as a snapshot of
+    the previous one: store-backed files (everything write_files and patch_file
+    wrote) are hardlinked, other files, such as a script's output, are copied.
+    Commands run on private copies (unshare()); index_node links the ones left
+    unchanged back to the store. It runs before the summary and adds the turn's
+    files to the checkpointed `artifacts` index (sha256 → path, turn,
+    thread_id); the step prompt lists recent entries so write_files can reuse
+    one by its sha256 instead of regenerating it, and content the store
+    already has is linked, not written.
+    """
+
+    def __init__(self, store: str = ".artifacts", keep_turns: int = None):
+        self.store = ArtifactStore(store)
+        self.keep_turns = keep_turns
+
+    @staticmethod
+    def turns(base: str):
+        """Turn numbers that have a directory under base, ascending"""
+        try:
+            names = os.listdir(base)
+        except FileNotFoundError:
+            return []
+        return sorted(int(match.group(1)) for match in map(TURN_DIR.match, names) if match)
+
+    def begin_turn(self, config: dict, resume: bool = False):
+        """Config whose workspace is a new turn directory, or with resume the latest one (an interrupted turn)"""
+        base = workspace_for(config)
+        turns = self.turns(base)
+        if resume and turns:
+            turn_dir = os.path.join(base, f"turn-{turns[-1]:04d}")
+        else:
+            turn_dir = os.path.join(base, f"turn-{(turns[-1] if turns else 0) + 1:04d}")
+            previous = os.path.join(base, f"turn-{turns[-1]:04d}") if turns else None
+            self.snapshot(previous, turn_dir)
+        configurable = {**(config.get("configurable") or {}), "workspace": turn_dir,
+                        "artifact_store": self.store.root}
+        return {**config, "configurable": configurable}
+
+    @staticmethod
+    def snapshot(previous: str, turn_dir: str):
+        """Creates turn_dir with previous's files: store-backed ones as hardlinks, the rest as copies"""
+        os.makedirs(turn_dir, exist_ok=True)
+        if previous is None:
+            return
+        for directory, subdirectories, files in os.walk(previous):
+            subdirectories[:] = [name for name in subdirectories if name not in SKIPPED_DIRS]
+            target_dir = os.path.join(turn_dir, os.path.relpath(directory, previous))
+            os.makedirs(target_dir, exist_ok=True)
+            for name in files:
+                source, target = os.path.join(directory, name), os.path.join(target_dir, name)
+                if name.startswith(".tmp_") or os.path.islink(source):
+                    continue
+                if _store_backed(os.stat(source)):
+                    try:
+                        os.link(source, target)
+                        continue
+                    except OSError:
+                        pass
+                shutil.copy2(source, target)
+
+    def prune(self, base: str, latest: int):
+        """Removes the turn directories under base older than the latest keep_turns; returns how many"""
+        if not self.keep_turns:
+            return 0
+        old = [turn for turn in self.turns(base) if turn <= latest - self.keep_turns]
+        for turn in old:
+            shutil.rmtree(os.path.join(base, f"turn-{turn:04d}"), ignore_errors=True)
+        return len(old)
+
+    def index_node(self, state, config):
+        """Adds the files the turn's write_files/patch_file calls left in its workspace to the artifacts index"""
+        from repair import turn_messages
+        workspace = workspace_for(config)
+        match = TURN_DIR.match(os.path.basename(workspace))
+        turn = int(match.group(1)) if match else None
+        plan = state.get("plan") or []
+        if match and plan and plan[0] == "REJECT_NON_PROGRAMMING":
+            # Nothing ran: the snapshot would only be a copy of the previous turn, and the next turn reuses the number
+            shutil.rmtree(workspace, ignore_errors=True)
+            return {"artifacts": {}, "turn_files": []}
+        if match:
+            self.prune(os.path.dirname(workspace), turn)
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        if os.path.isdir(workspace):
+            self.store.relink(workspace)
+        entries, files = {}, []
+        for path in tool_written_paths(turn_messages(state.get("messages") or [])):
+            target = os.path.join(workspace, path)
+            try:
+                with open(target, "rb") as f:
+                    digest = digest_of(f.read())
+            except OSError:
+                continue
+            files.append(path)
+            entries[digest] = {"path": path, "turn": turn, "thread_id": thread_id}
+        relative = os.path.relpath(workspace)
+        return {"artifacts": entries, "turn_files": files,
+                "turn_workspace": workspace if relative.startswith("..") else relative}
+
+def tool_written_paths(messages: list):
+    """Workspace-relative paths written or patched by the write_files/patch_file results in messages"""
+    paths = []
+    for message in messages:
+        if getattr(message, "type", None) != "tool" or message.name not in ("write_files", "patch_file", "create_file"):
+            continue
+        try:
+            result = json.loads(message.content)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(result, dict):
+            continue
+        for path in (result.get("written", []) + result.get("unchanged", []) + result.get("reused", [])
+                     + result.get("patched", [])):
+            path = path.replace("\\", "/")
+            for prefix in ("./", "ai_solution/"):
+                path = path[len(prefix):] if path.startswith(prefix) else path
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def merge_artifacts(existing: dict, new: dict):
+    """artifacts reducer: the first turn that produced a content keeps it"""
+    return {**(new or {}), **(existing or {})}
+
+def artifact_listing(artifacts: dict):
+    """Step prompt lines for the latest stored files, newest first, or "" if there are none"""
+    if not artifacts:
+        return ""
+    latest = sorted(artifacts.items(), key=lambda item: item[1].get("turn") or 0, reverse=True)[:MAX_LISTED_ARTIFACTS]
+    lines = [f"- turn {entry.get('turn')}: {entry['path']} sha256 {digest[:12]}" for digest, entry in latest]
+    return ("Stored files from earlier turns; to reuse one unchanged, pass its sha256 to write_files "
+            "instead of content:\n" + "\n".join(lines))
@@ -0,0 +1,122 @@
+"""Throughput of headless batch mode (app/batch.py), with rate limits and a crash.
+
+Runs --requests corpus prompts through BatchRunner once per --workers value,
+offline: the chat model is ScriptedChatModel (optionally limited to
+--rate-limit calls per second, answering the excess with 429s), checkpoints go
+to MemorySaver and workspaces live in a scratch directory, while tool calls
+really run in the sandbox.
+
+Usage:
+    python benchmarks/bench_batch.py                                  # 40 requests, 1 vs 8 workers
+    python benchmarks/bench_batch.py --workers 1 4 16 --llm-latency 0.2
+    python benchmarks/bench_batch.py --rate-limit 20                  # 429s: shared backoff
+    python benchmarks/bench_batch.py --crash-after 10                 # cancel mid-batch, then resume
+
+Reports requests/s, per-request p50/p95, retries and 429s per worker count.
+With --crash-after, the batch is cancelled once that many results are written
+and rerun on the same checkpoints and result file; the report adds how many
+requests the rerun skipped and how many resumed from a checkpoint; compare
+its LLM calls with a run without --crash-after for the work the crash cost.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from stubs import ScriptedChatModel
+from bench_pipeline import DEFAULT_CORPUS
+
+async def run_batch(args, requests: list, workers: int, scratch: str):
+    """(summary, LLM calls, rerun report or None) of one batch over requests"""
+    from langgraph.checkpoint.memory import MemorySaver
+    from batch import BatchRunner, finished_ids, summarize_batch
+    from chat_graph import GraphOptions, create_chat_graph
+    from checkpointing import CheckpointPolicy
+    from metrics import Metrics, instrument_checkpointer
+
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+    model = ScriptedChatModel(latency=args.llm_latency, rate_limit=args.rate_limit)
+    metrics = Metrics()
+    policy = CheckpointPolicy(args.checkpoint_every)
+    checkpointer = policy.wrap(instrument_checkpointer(MemorySaver(), metrics))
+    graph = create_chat_graph(checkpointer, is_async=True,
+                              options=GraphOptions(model=model, backend=args.backend, rule_executor=args.rule_executor))
+    run = f"bench-{workers}"
+    output_path = os.path.join(scratch, f"{run}.jsonl")
+
+    def runner(output):
+        return BatchRunner(graph, checkpointer, policy, metrics, run, os.path.join(scratch, run), output,
+                           workers=workers, max_retries=args.max_retries, backoff=args.backoff, progress=False)
+
+    started = time.perf_counter()
+    rerun = None
+    with open(output_path, "a", encoding="utf-8") as output:
+        first = runner(output)
+        task = asyncio.create_task(first.run_all(requests))
+        if args.crash_after:
+            while not task.done() and len(first.results) < args.crash_after:
+                await asyncio.sleep(0.005)
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            done = finished_ids(output_path)
+            pending = [request for request in requests if request[0] not in done]
+            second = runner(output)
+            second.gate = first.gate
+            await second.run_all(pending)
+            rerun = {"skipped": len(requests) - len(pending), "rerun": len(pending),
+                     "resumed": sum(1 for r in second.results if r["resumed"])}
+            first.results += second.results
+    return summarize_batch(first.results, time.perf_counter() - started, first.gate), model.calls, rerun
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--field", help="JSON field holding the prompt (default: prompt, query or text)")
+    parser.add_argument("--requests", type=int, default=40, help="requests per batch (cycles through the corpus)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8], help="worker counts to compare")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fake LLM calls allowed per second (0: no limit)")
+    parser.add_argument("--max-retries", type=int, default=20)
+    parser.add_argument("--backoff", type=float, default=0.2, help="first retry delay without a retry-after header")
+    parser.add_argument("--crash-after", type=int, metavar="K", help="cancel the batch after K results, then resume it")
+    parser.add_argument("--checkpoint-every", type=int, metavar="N")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--backend", choices=["auto", "posix", "portable"], default="portable")
+    parser.add_argument("--rule-executor", action="store_true")
+    args = parser.parse_args()
+
+    # The sandbox resolves its default workspace from the working directory, so run in a scratch directory
+    scratch = tempfile.mkdtemp(prefix="bench_batch_")
+    os.chdir(scratch)
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    from batch import read_requests
+    corpus = read_requests([args.corpus], args.field)
+    requests = [(f"{request_id}-{i}", text) for i in range(args.requests // len(corpus) + 1)
+                for request_id, text in corpus][:args.requests]
+    try:
+        print(f"  {'workers':>7} {'req/s':>7} {'p50':>7} {'p95':>7} {'retries':>8} {'429s':>6} {'LLM calls':>10}  statuses")
+        for workers in args.workers:
+            summary, calls, rerun = asyncio.run(run_batch(args, requests, workers, scratch))
+            statuses = ", ".join(f"{count} {status}" for status, count in sorted(summary["statuses"].items()))
+            print(f"  {workers:>7} {summary['requests_per_second']:>7.2f} {summary['p50']:>7.3f} {summary['p95']:>7.3f} "
+                  f"{summary['retries']:>8} {summary['rate_limited']:>6} {calls:>10}  {statuses}")
+            if rerun:
+                print(f"          crash after {args.crash_after}: rerun skipped {rerun['skipped']}, "
+                      f"ran {rerun['rerun']} ({rerun['resumed']} resumed from checkpoints)")
+    finally:
+        os.chdir(os.path.dirname(BENCHMARKS))
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
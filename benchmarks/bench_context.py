@@ -0,0 +1,111 @@
+"""Long-session growth of the messages state: unbounded vs app/context_budget.py.
+
+Runs --turns turns on one persistent thread (MemorySaver) with ScriptedChatModel,
+whose generated scripts print --output-lines lines, so every run step adds a
+large ToolMessage. Each configuration starts from a fresh thread:
+- unbounded: the graph as it is by default, messages only ever grow
+- budget: MessageBudget clips tool outputs to --max-tool-output-tokens (full
+  outputs go to files) and HistoryCompactor keeps --keep-turns turns within
+  --history-tokens
+
+Usage:
+    python benchmarks/bench_context.py
+    python benchmarks/bench_context.py --turns 200 --output-lines 400 --backend posix --async
+
+Every --every turns it prints the per-turn latency p50 of that window, the
+number of messages in the thread, the serialized size of the latest checkpoint
+and the time to load it back; unbounded sessions grow on all of these.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from stubs import ScriptedChatModel
+from bench_pipeline import DEFAULT_CORPUS, load_corpus
+
+def checkpoint_size(checkpointer, config):
+    """(bytes of the latest checkpoint's channel values, seconds to load it)"""
+    started = time.perf_counter()
+    saved = checkpointer.get_tuple(config)
+    loaded = time.perf_counter() - started
+    values = saved.checkpoint["channel_values"]
+    return sum(len(checkpointer.serde.dumps_typed(value)[1]) for value in values.values()), loaded
+
+def run_session(args, graph_options, prompts: list, overrides: dict, label: str):
+    from langgraph.checkpoint.memory import MemorySaver
+    from chat_graph import create_chat_graph
+    from main import initial_state_for
+    checkpointer = MemorySaver()
+    graph = create_chat_graph(checkpointer, is_async=args.use_async, options=graph_options, **overrides)
+    config = {"configurable": {"thread_id": f"bench-context-{label}"}}
+    window = []
+    print(f"{label}:")
+    print(f"  {'turns':>6} {'p50 turn':>9} {'messages':>9} {'checkpoint':>11} {'load':>8}")
+    for turn in range(1, args.turns + 1):
+        state = initial_state_for(prompts[turn % len(prompts)])
+        started = time.perf_counter()
+        if args.use_async:
+            asyncio.run(graph.ainvoke(state, config))
+        else:
+            graph.invoke(state, config)
+        window.append(time.perf_counter() - started)
+        if turn % args.every == 0 or turn == args.turns:
+            size, loaded = checkpoint_size(checkpointer, config)
+            messages = len(graph.get_state(config).values.get("messages", []))
+            print(f"  {turn:>6} {statistics.median(window):>8.3f}s {messages:>9} {size / 1024:>9.0f} KiB "
+                  f"{loaded * 1000:>6.2f}ms")
+            window = []
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--field", help="JSON field holding the prompt (default: query, prompt or title)")
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--every", type=int, default=10, help="report every N turns")
+    parser.add_argument("--backend", choices=["auto", "posix", "portable"], default="portable")
+    parser.add_argument("--prompts", metavar="SET", help="prompt set (default: the backend's)")
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument("--steps", type=int, default=1, help="files the fake planner creates per query")
+    parser.add_argument("--output-lines", type=int, default=200, help="lines each generated script prints")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--max-tool-output-tokens", type=int, default=500)
+    parser.add_argument("--keep-turns", type=int, default=3)
+    parser.add_argument("--history-tokens", type=int, default=4000)
+    args = parser.parse_args()
+
+    prompts = [p for p in load_corpus(args.corpus, args.field)]
+    scratch = tempfile.mkdtemp(prefix="bench_context_")
+    os.chdir(scratch)
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    try:
+        from checkpointing import HistoryCompactor
+        from context_budget import FileOutputStore, MessageBudget
+        from chat_graph import GraphOptions
+        model = ScriptedChatModel(latency=args.llm_latency, steps=args.steps, output_lines=args.output_lines)
+        graph_options = GraphOptions(model=model, backend=args.backend, prompts=args.prompts)
+        # Only programming prompts produce tool output
+        prompts = [p for p in prompts if model._is_programming(p)] or prompts
+
+        run_session(args, graph_options, prompts, {}, "unbounded")
+        budget = MessageBudget(max_tool_tokens=args.max_tool_output_tokens, store=FileOutputStore())
+        compactor = HistoryCompactor(args.keep_turns, max_tokens=args.history_tokens)
+        run_session(args, graph_options, prompts, {"message_budget": budget, "history_compactor": compactor}, "budget")
+        stored = len(os.listdir("tool_outputs")) if os.path.isdir("tool_outputs") else 0
+        print(f"budget: {budget.clipped} tool outputs clipped ({budget.clipped_chars / 1024:.0f} KiB), "
+              f"{stored} distinct full outputs in tool_outputs/")
+    finally:
+        os.chdir(os.path.dirname(BENCHMARKS))
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
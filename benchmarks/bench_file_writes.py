@@ -0,0 +1,93 @@
+"""Old file-creation paths vs the write_files batch tool on 1 KB–1 MB files.
+
+Usage:
+    python benchmarks/bench_file_writes.py
+    python benchmarks/bench_file_writes.py --repeat 50 --sizes 1024 1048576
+
+Paths compared, per file:
+- create_file regex: graph_windows' old create_file('path', 'code') command string,
+  parsed with the non-greedy regex and written with open()
+- shell heredoc: graph.py's old `cat > path << "EOF"` through os.popen (POSIX only)
+- write_files: write_batch with changed content (atomic temp file + rename)
+- write_files unchanged: write_batch with identical content (hash skip)
+
+Everything runs in a temporary workspace. The correctness line shows how many
+bytes the regex path keeps for code that contains "')", which ends its match early;
+the heredoc path fails outright once a file exceeds the kernel's per-argument limit.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from file_writer import write_batch
+
+CREATE_FILE = re.compile(r'create_file\(["\'](.+?)["\'],\s*["\']([\s\S]*?)["\']\)')
+LINE = "result = compute_value(items, key=lambda item: item.score) + 1  # sample line\n"
+
+def make_content(size, salt=0):
+    body = f"# variant {salt}\n" + LINE * (size // len(LINE) + 1)
+    return body[:size]
+
+def old_create_file(workspace, name, content):
+    command = f"create_file('{workspace}/{name}', '{content}')"
+    filepath, body = CREATE_FILE.match(command).groups()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(body)
+
+def old_heredoc(workspace, name, content):
+    os.popen(f'cat > {workspace}/{name} << "EOF"\n{content}\nEOF').read()
+
+def timed(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def ms(samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {statistics.median(ordered) * 1000:8.3f} ms  p95 {p95 * 1000:8.3f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 10 * 1024, 100 * 1024, 1024 * 1024])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workspace:
+        for size in args.sizes:
+            variants = [make_content(size, salt) for salt in range(args.repeat)]
+            print(f"\n{size / 1024:.0f} KB")
+            results = {
+                "create_file regex": timed(lambda i: old_create_file(workspace, "regex.py", variants[i]), args.repeat),
+                "write_files": timed(lambda i: write_batch([{"path": "new.py", "content": variants[i]}], workspace),
+                                     args.repeat),
+                "write_files unchanged": timed(lambda i: write_batch([{"path": "new.py", "content": variants[-1]}],
+                                                                     workspace), args.repeat),
+            }
+            if os.name == "posix":
+                try:
+                    results["shell heredoc"] = timed(lambda i: old_heredoc(workspace, "heredoc.py", variants[i]),
+                                                     args.repeat)
+                except OSError as e:
+                    # The whole file is one shell argument, capped by the kernel (MAX_ARG_STRLEN)
+                    results["shell heredoc"] = e
+            for label, samples in results.items():
+                line = f"failed: {samples}" if isinstance(samples, Exception) else ms(samples)
+                print(f"  {label:<22} {line}")
+
+        quoted = "print('hello')\n" + make_content(10 * 1024)
+        _, kept = CREATE_FILE.match(f"create_file('x.py', '{quoted}')").groups()
+        print(f"\ncreate_file regex keeps {len(kept)} of {len(quoted)} bytes when the code contains \"')\"")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""End-to-end turn benchmark that runs fully offline.
+
+Replays a prompt corpus through create_chat_graph the way main.py does:
+WAV file → listen → recognize → graph → TTS → playback. Every external
+service is replaced by a stand-in from stubs.py, and checkpoints go to
+MemorySaver (or a local MongoDB with --mongo).
+
+Usage:
+    python benchmarks/bench_pipeline.py                               # prerouter corpus, sync portable backend
+    python benchmarks/bench_pipeline.py --backend posix --async --parallel-steps --steps 3
+    python benchmarks/bench_pipeline.py --compare backend=portable backend=posix fused_planner,rule_executor
+    python benchmarks/bench_pipeline.py --corpus requests.jsonl --field title --turns 20
+    python benchmarks/bench_pipeline.py --json result.json --max-p95 2.0   # CI: exit 1 on regression
+    python benchmarks/bench_pipeline.py --compare "" tiered --llm-latency 0.3 --fast-latency 0.08 --fast-garble-every 5
+    python benchmarks/bench_pipeline.py --compare plan_cache plan_cache,turn_workspaces --steps 3
+
+Reports throughput (turns/s), per-turn latency p50/p95/max, p50/p95 per
+stage and graph node (from app/metrics.py), and per-turn allocation peaks
+from tracemalloc (--no-alloc to skip them and their overhead). --compare runs
+the corpus once per configuration, each a comma-separated list of GraphOptions
+fields (name=value, or a bare name to switch a flag on) applied on top of the
+command line's options, and prints them side by side. The `tiered` config
+moves classify, plan and shell to a second scripted model (--fast-latency,
+answering garbage every --fast-garble-every calls) so escalation is exercised;
+a turn counts as failed when a run still fails or the plan came out empty.
+`turn_workspaces` (or --turn-workspaces) runs every turn in its own directory
+linked from an artifact store and reports the bytes on disk against the bytes
+the turn directories would take as plain copies.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from stubs import NullAudioPlayer, ScriptedChatModel, StubRecognizer, StubSpeechClient, WavAudioSource, write_wav
+
+DEFAULT_CORPUS = os.path.join(BENCHMARKS, "prerouter_queries.jsonl")
+
+def load_corpus(path: str, field: str = None):
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            text = row.get(field) if field else row.get("query") or row.get("prompt") or row.get("title")
+            if text:
+                prompts.append(text)
+    return prompts
+
+def percentile(values: list, fraction: float):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def distribution(values: list):
+    return {"p50": statistics.median(values), "p95": percentile(values, 0.95), "max": max(values)}
+
+class Bench:
+    def __init__(self, args, metrics, graph, wav_path, checkpointer, policy, workspace: str, workspaces=None):
+        self.args = args
+        self.metrics = metrics
+        self.graph = graph
+        self.checkpointer = checkpointer
+        self.policy = policy
+        self.wav_path = wav_path
+        self.recognizer = StubRecognizer(latency=args.stt_latency)
+        self.speech = StubSpeechClient(latency=args.tts_latency)
+        self.player = NullAudioPlayer()
+        self.config = {"configurable": {"thread_id": "bench", "workspace": workspace}, "callbacks": [metrics.callback]}
+        self.workspaces = workspaces
+        self.turn_seconds = []
+        self.alloc_peaks = []
+        self.failed_turns = 0
+
+    def hear(self, prompt: str):
+        with self.metrics.stage("listen"):
+            with WavAudioSource(self.wav_path) as source:
+                audio = self.recognizer.record(source)
+        self.recognizer.transcript = prompt
+        with self.metrics.stage("recognize"):
+            return self.recognizer.recognize_google(audio)
+
+    async def speak(self, text: str):
+        started = time.perf_counter()
+        async with self.speech.audio.speech.with_streaming_response.create(input=text) as response:
+            self.metrics.record("tts", time.perf_counter() - started)
+            with self.metrics.stage("playback"):
+                await self.player.play(response)
+
+    @staticmethod
+    def state_for(text: str):
+        return {"messages": [{"role": "user", "content": text}], "enhanced_query": "", "plan": [],
+                "current_step": 0, "execution_summary": ""}
+
+    def turn_config(self):
+        return self.workspaces.begin_turn(self.config) if self.workspaces is not None else self.config
+
+    def begin(self):
+        self.metrics.start_turn()
+        if self.args.alloc:
+            tracemalloc.reset_peak()
+        return time.perf_counter()
+
+    def end(self, started: float, final: dict):
+        from repair import failed_runs
+        self.turn_seconds.append(time.perf_counter() - started)
+        self.failed_turns += bool(failed_runs(final["messages"])) or not final.get("plan")
+        if self.args.alloc:
+            self.alloc_peaks.append(tracemalloc.get_traced_memory()[1])
+
+    def run_sync(self, prompts: list):
+        for prompt in prompts:
+            started = self.begin()
+            text = self.hear(prompt)
+            with self.metrics.graph_run():
+                final = self.graph.invoke(self.state_for(text), self.turn_config(), **self.policy.stream_kwargs())
+                self.policy.finish_turn(self.checkpointer, "bench")
+            asyncio.run(self.speak(final["messages"][-1].content))
+            self.end(started, final)
+
+    async def run_async(self, prompts: list):
+        for prompt in prompts:
+            started = self.begin()
+            text = await asyncio.to_thread(self.hear, prompt)
+            with self.metrics.graph_run():
+                final = await self.graph.ainvoke(self.state_for(text), await asyncio.to_thread(self.turn_config),
+                                                 **self.policy.stream_kwargs())
+                await self.policy.afinish_turn(self.checkpointer, "bench")
+            await self.speak(final["messages"][-1].content)
+            self.end(started, final)
+
+def step_prompt_cache(events: list):
+    """Latency and cached prompt share of each turn's first LLM step versus steps 2..N"""
+    by_turn = {}
+    for event in events:
+        if event["stage"] in ("node:execute_step", "node:run_step") and event.get("prompt_tokens"):
+            by_turn.setdefault(event["turn"], []).append(event)
+    groups = {"step 1": [], "steps 2..N": []}
+    for steps in by_turn.values():
+        steps.sort(key=lambda e: e["at"] - e["duration"])
+        groups["step 1"].append(steps[0])
+        groups["steps 2..N"].extend(steps[1:])
+    report = {}
+    for position, rows in groups.items():
+        if rows:
+            prompt_tokens = sum(e["prompt_tokens"] for e in rows)
+            report[position] = {"count": len(rows), "p50": statistics.median(e["duration"] for e in rows),
+                                "prompt_tokens": prompt_tokens,
+                                "cached_ratio": sum(e.get("cached_tokens", 0) for e in rows) / prompt_tokens}
+    return report
+
+def parse_config(text: str):
+    """"backend=posix,fused_planner" → {"backend": "posix", "fused_planner": True}"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, value = item.partition("=")
+        name = name.replace("-", "_")
+        if not value:
+            overrides[name] = True
+        elif value.isdigit():
+            overrides[name] = int(value)
+        else:
+            overrides[name] = {"true": True, "false": False}.get(value.lower(), value)
+    return overrides
+
+def graph_options_for(args, overrides: dict):
+    """GraphOptions for one configuration, with its own scripted model and caches"""
+    from chat_graph import GraphOptions
+    from checkpointing import HistoryCompactor
+    from prerouter import PreRouter
+    from plan_cache import PlanCache
+    from workspace import WorkspaceManager
+    flags = {"backend": args.backend, "prompts": args.prompts, "fused_planner": args.fused_planner,
+             "prerouter": args.prerouter, "plan_cache": args.plan_cache, "rule_executor": args.rule_executor,
+             "parallel_steps": args.parallel_steps, "max_repairs": args.max_repairs, "tiered": args.tiered,
+             "turn_workspaces": args.turn_workspaces, **overrides}
+    model = ScriptedChatModel(model_name="scripted-large", latency=args.llm_latency, per_token=args.llm_per_token,
+                              per_prompt_token=args.llm_per_prompt_token, prompt_cache=args.prompt_cache,
+                              steps=args.steps, buggy=args.buggy)
+    models = None
+    if flags.pop("tiered"):
+        fast = ScriptedChatModel(model_name="scripted-small", latency=args.fast_latency, per_token=args.llm_per_token,
+                                 per_prompt_token=args.llm_per_prompt_token, prompt_cache=args.prompt_cache,
+                                 steps=args.steps, buggy=args.buggy, garble_every=args.fast_garble_every)
+        models = dict.fromkeys(("classify", "plan", "shell"), fast)
+    return GraphOptions(
+        model=model,
+        models=models,
+        backend=flags.pop("backend"),
+        prompts=flags.pop("prompts"),
+        prerouter=PreRouter() if flags.pop("prerouter") else None,
+        plan_cache=PlanCache() if flags.pop("plan_cache") else None,
+        history_compactor=HistoryCompactor(args.keep_turns) if args.keep_turns is not None else None,
+        workspaces=WorkspaceManager(tempfile.mkdtemp(prefix="bench_artifacts_")) if flags.pop("turn_workspaces") else None,
+        **flags,
+    )
+
+def run_config(args, prompts: list, graph_options, label: str):
+    """Runs the corpus through one configuration in its own scratch directory; returns the report"""
+    from chat_graph import create_chat_graph
+    from metrics import Metrics, instrument_checkpointer
+    from checkpointing import CheckpointPolicy
+
+    # Every configuration writes to its own scratch workspace
+    scratch = tempfile.mkdtemp(prefix="bench_pipeline_")
+    workspace = os.path.join(scratch, "ai_solution")
+    policy = CheckpointPolicy(every=args.checkpoint_every, keep_checkpoints=args.keep_checkpoints)
+    metrics = Metrics()
+    wav_path = write_wav(os.path.join(scratch, "speech.wav"))
+
+    async def run_async():
+        from langgraph.checkpoint.memory import MemorySaver
+        if args.mongo:
+            from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+            async with AsyncMongoDBSaver.from_conn_string(args.mongo) as saver:
+                checkpointer = policy.wrap(instrument_checkpointer(saver, metrics))
+                graph = create_chat_graph(checkpointer, is_async=True, options=graph_options)
+                bench = Bench(args, metrics, graph, wav_path, checkpointer, policy, workspace,
+                              graph_options.workspaces)
+                await bench.run_async(prompts)
+                return bench
+        checkpointer = policy.wrap(instrument_checkpointer(MemorySaver(), metrics))
+        graph = create_chat_graph(checkpointer, is_async=True, options=graph_options)
+        bench = Bench(args, metrics, graph, wav_path, checkpointer, policy, workspace,
+                      graph_options.workspaces)
+        await bench.run_async(prompts)
+        return bench
+
+    def run_sync():
+        from langgraph.checkpoint.memory import MemorySaver
+        if args.mongo:
+            from langgraph.checkpoint.mongodb import MongoDBSaver
+            with MongoDBSaver.from_conn_string(args.mongo) as saver:
+                checkpointer = policy.wrap(instrument_checkpointer(saver, metrics))
+                graph = create_chat_graph(checkpointer, options=graph_options)
+                bench = Bench(args, metrics, graph, wav_path, checkpointer, policy, workspace,
+                              graph_options.workspaces)
+                bench.run_sync(prompts)
+                return bench
+        checkpointer = policy.wrap(instrument_checkpointer(MemorySaver(), metrics))
+        graph = create_chat_graph(checkpointer, options=graph_options)
+        bench = Bench(args, metrics, graph, wav_path, checkpointer, policy, workspace,
+                      graph_options.workspaces)
+        bench.run_sync(prompts)
+        return bench
+
+    if args.alloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    bench = asyncio.run(run_async()) if args.use_async else run_sync()
+    elapsed = time.perf_counter() - started
+    if args.alloc:
+        tracemalloc.stop()
+    disk = disk_usage(workspace)
+    shutil.rmtree(scratch, ignore_errors=True)
+    if graph_options.workspaces is not None:
+        shutil.rmtree(graph_options.workspaces.store.root, ignore_errors=True)
+
+    runtime = graph_options.runtime()
+    report = {
+        "config": label,
+        "turns": len(prompts),
+        "backend": runtime.backend.name,
+        "prompts": runtime.prompts.name,
+        "async": args.use_async,
+        "options": {k: bool(v) for k, v in graph_options.flags().items()},
+        "checkpoint_every": args.checkpoint_every,
+        "seconds": elapsed,
+        "turns_per_second": len(prompts) / elapsed,
+        "turn_latency": distribution(bench.turn_seconds),
+        "stages": metrics.summary(),
+        "failed_turns": bench.failed_turns,
+        "escalated_calls": sum(1 for e in metrics.events if e.get("escalated")),
+        "llm_calls": sum(e.get("llm_calls", 0) for e in metrics.events if e["stage"] == "graph"),
+        "prompt_tokens": sum(e.get("prompt_tokens", 0) for e in metrics.events if e["stage"].startswith("node:")),
+    }
+    graph_events = [e for e in metrics.events if e["stage"] == "graph"]
+    report["checkpoint_seconds"] = distribution([e["checkpoint_seconds"] for e in graph_events])
+    report["checkpoint_writes"] = distribution([e["checkpoint_writes"] for e in graph_events])
+    if bench.alloc_peaks:
+        report["alloc_peak_bytes"] = distribution(bench.alloc_peaks)
+    report["step_prompt_cache"] = step_prompt_cache(metrics.events)
+    report["disk"] = disk
+    report["_metrics"] = metrics
+    return report
+
+def disk_usage(workspace: str):
+    """Files and bytes under workspace, and the bytes of its distinct inodes (hardlinks count once)"""
+    files, apparent, inodes = 0, 0, {}
+    for directory, _, names in os.walk(workspace):
+        for name in names:
+            info = os.lstat(os.path.join(directory, name))
+            files += 1
+            apparent += info.st_size
+            inodes[(info.st_dev, info.st_ino)] = info.st_size
+    return {"files": files, "bytes": apparent, "stored_bytes": sum(inodes.values())}
+
+def print_report(report: dict):
+    print(f"{report['turns']} turns in {report['seconds']:.2f}s → {report['turns_per_second']:.2f} turns/s "
+          f"({report['backend']} backend, {report['prompts']} prompts, {'async' if report['async'] else 'sync'}, "
+          f"{report['llm_calls']} LLM calls, {report['escalated_calls']} escalated, {report['failed_turns']} failed turns)")
+    latency = report["turn_latency"]
+    print(f"turn latency: p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  max {latency['max']:.3f}s")
+    checkpoint = report["checkpoint_seconds"]
+    print(f"checkpoint writes per turn: p50 {report['checkpoint_writes']['p50']:.0f}, "
+          f"time p50 {checkpoint['p50'] * 1000:.1f} ms  p95 {checkpoint['p95'] * 1000:.1f} ms")
+    if "alloc_peak_bytes" in report:
+        alloc = report["alloc_peak_bytes"]
+        print(f"allocation peak per turn: p50 {alloc['p50'] / 1024:.0f} KiB  p95 {alloc['p95'] / 1024:.0f} KiB")
+    disk = report["disk"]
+    print(f"workspace: {disk['files']} files, {disk['bytes'] / 1024:.1f} KiB, "
+          f"{disk['stored_bytes'] / 1024:.1f} KiB on disk")
+    for position, row in report["step_prompt_cache"].items():
+        print(f"execute steps ({position}): n={row['count']}  p50 {row['p50']:.3f}s  "
+              f"{row['prompt_tokens']} prompt tokens, {row['cached_ratio']:.0%} cached")
+    report["_metrics"].print_summary()
+
+def print_comparison(reports: list):
+    width = max(len(r["config"]) for r in reports)
+    print(f"\n{'config':<{width}}  backend   prompts        turns/s  p50 s   p95 s   LLM calls  prompt tokens  "
+          f"escalated  failed")
+    for r in reports:
+        latency = r["turn_latency"]
+        print(f"{r['config']:<{width}}  {r['backend']:<8}  {r['prompts']:<13}  {r['turns_per_second']:7.2f}  "
+              f"{latency['p50']:6.3f}  {latency['p95']:6.3f}  {r['llm_calls']:9d}  {r['prompt_tokens']:13d}  "
+              f"{r['escalated_calls']:9d}  {r['failed_turns']:6d}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--field", help="JSON field holding the prompt (default: query, prompt or title)")
+    parser.add_argument("--turns", type=int, help="number of turns (cycles through the corpus; default: all prompts)")
+    parser.add_argument("--backend", choices=["auto", "posix", "portable"], default="portable")
+    parser.add_argument("--prompts", metavar="SET", help="prompt set (default: the backend's)")
+    parser.add_argument("--compare", nargs="+", metavar="CONFIG",
+                        help="run each configuration (e.g. backend=posix,prompts=concise-v1) and compare them")
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--llm-per-token", type=float, default=0.0, help="extra seconds per completion token")
+    parser.add_argument("--llm-per-prompt-token", type=float, default=0.0, help="extra seconds per uncached prompt token")
+    parser.add_argument("--prompt-cache", action="store_true", help="fake model reports prefix-cached prompt tokens")
+    parser.add_argument("--stt-latency", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=0.0)
+    parser.add_argument("--steps", type=int, default=1, help="files the fake planner creates per query")
+    parser.add_argument("--mongo", metavar="URI", help="checkpoint to a local MongoDB instead of MemorySaver")
+    parser.add_argument("--fused-planner", action="store_true")
+    parser.add_argument("--prerouter", action="store_true")
+    parser.add_argument("--plan-cache", action="store_true")
+    parser.add_argument("--rule-executor", action="store_true")
+    parser.add_argument("--parallel-steps", action="store_true")
+    parser.add_argument("--max-repairs", type=int, default=0, help="see main.py --max-repairs")
+    parser.add_argument("--buggy", action="store_true", help="fake model writes scripts that fail until repaired")
+    parser.add_argument("--tiered", action="store_true", help="classify, plan and shell on a faster second fake model")
+    parser.add_argument("--fast-latency", type=float, default=0.01, help="seconds per call of the --tiered model")
+    parser.add_argument("--fast-garble-every", type=int, default=0, metavar="N",
+                        help="the --tiered model answers garbage every N-th call (forces escalations)")
+    parser.add_argument("--turn-workspaces", action="store_true", help="see main.py --turn-workspaces")
+    parser.add_argument("--checkpoint-every", type=int, metavar="N", help="see main.py --checkpoint-every")
+    parser.add_argument("--keep-turns", type=int, metavar="K", help="see main.py --keep-turns")
+    parser.add_argument("--keep-checkpoints", type=int, metavar="N", help="see main.py --keep-checkpoints")
+    parser.add_argument("--no-alloc", dest="alloc", action="store_false", help="skip tracemalloc")
+    parser.add_argument("--json", metavar="PATH", help="write the report (a list of reports with --compare) as JSON")
+    parser.add_argument("--max-p95", type=float, help="exit 1 if the per-turn p95 latency exceeds this many seconds")
+    args = parser.parse_args()
+
+    prompts = load_corpus(args.corpus, args.field)
+    json_path = os.path.abspath(args.json) if args.json else None
+    turns = args.turns or len(prompts)
+    prompts = [prompts[i % len(prompts)] for i in range(turns)]
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+    reports = []
+    for config in args.compare or [""]:
+        graph_options = graph_options_for(args, parse_config(config))
+        if args.compare:
+            print(f"\n=== {config} ===")
+        report = run_config(args, prompts, graph_options, config or graph_options.describe())
+        print_report(report)
+        reports.append(report)
+    if args.compare:
+        print_comparison(reports)
+
+    for report in reports:
+        del report["_metrics"]
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(reports if args.compare else reports[0], f, indent=2)
+    worst = max(reports, key=lambda r: r["turn_latency"]["p95"])
+    if args.max_p95 is not None and worst["turn_latency"]["p95"] > args.max_p95:
+        print(f"❌ turn p95 {worst['turn_latency']['p95']:.3f}s ({worst['config']}) exceeds --max-p95 {args.max_p95}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
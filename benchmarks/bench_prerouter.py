@@ -0,0 +1,96 @@
+"""Fast-path pre-router vs LLM classification on a labelled query set.
+
+Usage:
+    python benchmarks/bench_prerouter.py                # local classifier only, offline
+    python benchmarks/bench_prerouter.py --llm          # also time enhance_query (needs OPENAI_API_KEY)
+    python benchmarks/bench_prerouter.py --threshold 0.8
+
+Positive class is "rejected as non-programming". Precision/recall are reported
+for the pre-router's local rejections and, with --llm, for enhance_query's
+NON_PROGRAMMING_QUERY answers.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from prerouter import PreRouter
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prerouter_queries.jsonl")
+
+def load_dataset(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def precision_recall(predicted, actual):
+    tp = sum(p and a for p, a in zip(predicted, actual))
+    fp = sum(p and not a for p, a in zip(predicted, actual))
+    fn = sum(a and not p for p, a in zip(predicted, actual))
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall
+
+def latency_line(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (f"{label}: mean {statistics.mean(ordered) * 1000:.3f} ms, "
+            f"p50 {statistics.median(ordered) * 1000:.3f} ms, p95 {p95 * 1000:.3f} ms")
+
+def run_fast_path(rows, threshold):
+    router = PreRouter(threshold=threshold)
+    predicted, latencies = [], []
+    for row in rows:
+        state = {"messages": [type("Message", (), {"content": row["query"]})()]}
+        start = time.perf_counter()
+        update = router(state)
+        latencies.append(time.perf_counter() - start)
+        predicted.append(update["enhanced_query"] == "NON_PROGRAMMING_QUERY")
+    return predicted, latencies
+
+def run_llm_path(rows):
+    from langchain_core.messages import HumanMessage
+    from chat_graph import runtime_for
+    runtime = runtime_for()
+
+    predicted, latencies = [], []
+    for row in rows:
+        start = time.perf_counter()
+        update = runtime.enhance_query({"messages": [HumanMessage(content=row["query"])]})
+        latencies.append(time.perf_counter() - start)
+        predicted.append(update["enhanced_query"] == "NON_PROGRAMMING_QUERY")
+    return predicted, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--llm", action="store_true", help="also run the LLM path (network + API key required)")
+    args = parser.parse_args()
+
+    rows = load_dataset(args.dataset)
+    actual = [not row["programming"] for row in rows]
+    print(f"{len(rows)} queries, {sum(actual)} non-programming")
+
+    predicted, latencies = run_fast_path(rows, args.threshold)
+    precision, recall = precision_recall(predicted, actual)
+    print(f"\nFast path (threshold {args.threshold})")
+    print(f"  rejection precision {precision:.3f}, recall {recall:.3f}")
+    print(f"  {sum(predicted)} of {len(rows)} queries answered locally with zero API calls")
+    print("  " + latency_line("latency", latencies))
+    for row, rejected, is_non in zip(rows, predicted, actual):
+        if rejected and not is_non:
+            print(f"  false rejection: {row['query']}")
+
+    if args.llm:
+        predicted, latencies = run_llm_path(rows)
+        precision, recall = precision_recall(predicted, actual)
+        print("\nLLM path (enhance_query)")
+        print(f"  rejection precision {precision:.3f}, recall {recall:.3f}")
+        print("  " + latency_line("latency", latencies))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Token cost of repairing a failing script: patch repair vs regenerating the file.
+
+Usage:
+    python benchmarks/bench_repair.py
+    python benchmarks/bench_repair.py --lines 50 500 5000 --max-repairs 3
+
+For each file size a script with one bug (a NameError in a helper called from
+main) is written to a temporary workspace and run; repair_run then fixes it with
+ScriptedChatModel answering the repair prompt with a patch_file edit. Reported
+per size: the file's tokens, the prompt and completion tokens of the repair
+calls, and what a full regeneration would cost (the file as context plus the
+whole file again as output). Tokens are whitespace-separated words, the unit
+ScriptedChatModel reports.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from stubs import ScriptedChatModel
+
+HELPER = "def helper_{i}(values):\n    total = sum(v * {i} for v in values)\n    return total % 97\n\n"
+
+def buggy_script(lines: int):
+    """A script of about `lines` lines whose middle helper raises NameError when main() calls it"""
+    helpers = max(1, lines // 4)
+    bug = helpers // 2
+    parts = [HELPER.format(i=i) for i in range(helpers)]
+    parts[bug] = f"def helper_{bug}(values):\n    print(undefined_name)\n    return len(values)\n\n"
+    parts.append(f'def main():\n    print(helper_{bug}([1, 2, 3]))\n\nif __name__ == "__main__":\n    main()\n')
+    return "".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[20, 200, 1000, 4000])
+    parser.add_argument("--max-repairs", type=int, default=2)
+    parser.add_argument("--backend", choices=["auto", "posix", "portable"], default="portable")
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from chat_graph import runtime_for
+    from repair import failed_runs
+
+    runtime = runtime_for(ScriptedChatModel(latency=0.0), args.backend)
+    command = "python ai_solution/app.py"
+    print(f"  {'lines':>6} {'file tokens':>12} {'repair prompt':>14} {'completion':>11} {'rewrite':>8} "
+          f"{'attempts':>9} {'fixed':>6} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as scratch:
+        workspace = os.path.join(scratch, "ai_solution")
+        config = {"configurable": {"thread_id": "bench-repair", "workspace": workspace}}
+        for lines in args.lines:
+            content = buggy_script(lines)
+            os.makedirs(workspace, exist_ok=True)
+            with open(os.path.join(workspace, "app.py"), "w", encoding="utf-8") as f:
+                f.write(content)
+            result = runtime.backend.run_command(command, config)
+            call = {"name": "run_command", "args": {"command": command}, "id": "run"}
+            state = {"messages": [HumanMessage(content="write the app"), AIMessage(content="", tool_calls=[call]),
+                                  ToolMessage(content=json.dumps(result), tool_call_id="run", name="run_command")]}
+            started = time.perf_counter()
+            update = runtime.repair_run(state, config, max_repairs=args.max_repairs)
+            elapsed = time.perf_counter() - started
+            usage = [m.usage_metadata for m in update.get("messages", []) if getattr(m, "usage_metadata", None)]
+            prompt = sum(u["input_tokens"] for u in usage)
+            completion = sum(u["output_tokens"] for u in usage)
+            file_tokens = len(content.split())
+            fixed = not failed_runs(state["messages"] + update.get("messages", []))
+            print(f"  {lines:>6} {file_tokens:>12} {prompt:>14} {completion:>11} {2 * file_tokens:>8} "
+                  f"{len(usage):>9} {str(fixed):>6} {elapsed:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Speculative enhance_query/create_plan on partial transcripts: latency saved vs wasted LLM calls.
+
+Each corpus prompt is "spoken" at --words-per-second: partial transcripts
+grow one word at a time and go to app/speculation.py's Speculator, then the
+final transcript is resolved. With --revise, that fraction of finals differs
+from the last partial in one word (a recogniser correcting itself at the end).
+The planner nodes are chat_graph's own, answered by ScriptedChatModel.
+
+Usage:
+    python benchmarks/bench_speculation.py
+    python benchmarks/bench_speculation.py --mode plan --thresholds 0.8 0.9 1.0 --min-new-words 1 2 4
+    python benchmarks/bench_speculation.py --llm-latency 0.8 --words-per-second 2 --revise 0.3
+
+Per setting it reports the planner wait after end of speech (p50/p95, versus
+running the nodes only once the final transcript is in), how often a
+speculation was reused, and LLM calls per turn including wasted ones.
+"""
+import argparse
+import functools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from langchain_core.messages import HumanMessage
+from stubs import ScriptedChatModel
+from bench_pipeline import DEFAULT_CORPUS, load_corpus, percentile
+
+def run_stages(stages, text):
+    state = {"messages": [HumanMessage(content=text)], "enhanced_query": "", "plan": []}
+    for _, node in stages:
+        state.update(node(state) or {})
+
+def speak(speculator, words: list, words_per_second: float):
+    for i in range(1, len(words) + 1):
+        speculator.feed(" ".join(words[:i]))
+        time.sleep(1 / words_per_second)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--field", help="JSON field holding the prompt (default: query, prompt or title)")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--mode", choices=["enhance", "plan"], default="enhance")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 1.0])
+    parser.add_argument("--min-new-words", type=int, nargs="+", default=[2])
+    parser.add_argument("--min-words", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2, help="speculative runs in flight at once")
+    parser.add_argument("--words-per-second", type=float, default=3.0)
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="seconds per fake LLM call")
+    parser.add_argument("--revise", type=float, default=0.2, help="fraction of finals that change one word")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_speculation_"))
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    from chat_graph import runtime_for
+    from speculation import Speculator
+    model = ScriptedChatModel(latency=args.llm_latency)
+    runtime = runtime_for(model)
+    stages = [("enhance_query", runtime.enhance_query)]
+    if args.mode == "plan":
+        stages.append(("create_plan", functools.partial(runtime.create_plan, with_dependencies=False)))
+
+    rng = random.Random(args.seed)
+    prompts = load_corpus(args.corpus, args.field)
+    turns = []
+    for i in range(args.turns):
+        words = prompts[i % len(prompts)].split()
+        final = list(words)
+        if rng.random() < args.revise:
+            final[rng.randrange(len(final))] = "revised"
+        turns.append((words, " ".join(final)))
+
+    # Baseline: the planner nodes start once the final transcript is in
+    baseline = []
+    for _, final in turns:
+        started = time.perf_counter()
+        run_stages(stages, final)
+        baseline.append(time.perf_counter() - started)
+    print(f"{args.turns} turns, {args.mode} mode, LLM {args.llm_latency}s/call, "
+          f"{args.words_per_second} words/s, {args.revise:.0%} revised finals")
+    print(f"  {'no speculation':<24} wait p50 {statistics.median(baseline):.3f}s  p95 {percentile(baseline, 0.95):.3f}s  "
+          f"calls/turn {len(stages):.2f}")
+
+    for threshold in args.thresholds:
+        for min_new_words in args.min_new_words:
+            speculator = Speculator(stages, threshold=threshold, min_words=args.min_words, min_new_words=min_new_words,
+                                    workers=args.workers)
+            waits = []
+            calls_before = model.calls
+            for words, final in turns:
+                speculator.discard()
+                speak(speculator, words, args.words_per_second)
+                started = time.perf_counter()
+                if speculator.resolve(final) is None:
+                    run_stages(stages, final)
+                waits.append(time.perf_counter() - started)
+            speculator.close()
+            stats = speculator.stats()
+            calls = (model.calls - calls_before) / args.turns
+            label = f"threshold {threshold} +{min_new_words}w"
+            print(f"  {label:<24} wait p50 {statistics.median(waits):.3f}s  p95 {percentile(waits, 0.95):.3f}s  "
+                  f"calls/turn {calls:.2f}  reused {stats['reused']}/{args.turns}  "
+                  f"wasted {stats['wasted_calls'] / args.turns:.2f}/turn  saved {stats['saved_seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
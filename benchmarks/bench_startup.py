@@ -0,0 +1,251 @@
+"""Startup: time from `python app/main.py` to "🎤 Listening", and what is imported on the way.
+
+Every run starts a fresh interpreter, as a user does:
+- eager: the imports, MongoDB connect and graph compile main.py used to do before
+  calibrating, done up front; then main.py
+- lazy: main.py as it is: light imports, the graph module is imported and
+  compiled on the boot thread while the microphone calibrates
+- attach: main.py --attach to a warm app/server.py daemon started once beforehand
+
+The microphone is a WAV stand-in read at real-time pace, so ambient-noise
+calibration takes its usual second, and the MongoDB savers connect to an
+in-memory saver after --connect-latency seconds. Both are installed by this
+script's --child mode before main.py runs; nothing else is replaced.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --connect-latency 0.2 --top 12
+
+Also runs `python -X importtime -c "import main"` for the old eager import
+list and for main.py now, and prints the slowest imports of each.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.abc
+import importlib.util
+import os
+import random
+import runpy
+import shutil
+import signal
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(os.path.dirname(BENCHMARKS), "app")
+
+# What main.py imported at module level before the graph module and services were loaded lazily
+EAGER_IMPORTS = ["speech_recognition", "langgraph.checkpoint.mongodb", "chat_graph", "openai", "openai.helpers",
+                 "prerouter", "plan_cache", "sandbox", "capture", "speculation", "metrics", "checkpointing",
+                 "context_budget", "tts_stream"]
+LISTENING = "Listening"
+STARTUP_MODULES = {"site", "encodings", "encodings.utf_8", "io", "_frozen_importlib_external"}
+
+# --- child mode: runs inside the measured interpreter, so it imports nothing heavy itself ---
+
+def write_noise(path: str, seconds: float = 60.0, rate: int = 16000):
+    """Quiet noise: enough for calibration, below the threshold listen() treats as speech"""
+    rng = random.Random(0)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"".join(struct.pack("<h", int(rng.gauss(0, 40))) for _ in range(int(rate * seconds))))
+    return path
+
+def install_microphone(wav_path: str):
+    """sr.Microphone → the WAV file, delivered at the pace a sound card would"""
+    import speech_recognition as sr
+
+    class RealtimeWav(sr.AudioFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(wav_path)
+
+        def __enter__(self):
+            source = super().__enter__()
+            stream, bytes_per_second = source.stream, source.SAMPLE_RATE * source.SAMPLE_WIDTH
+
+            class Stream:
+                def read(self, size):
+                    data = stream.read(size)
+                    time.sleep(len(data) / bytes_per_second)
+                    return data
+            source.stream = Stream()
+            return source
+
+    sr.Microphone = RealtimeWav
+
+def fake_savers(module, latency: float):
+    """MongoDBSaver/AsyncMongoDBSaver.from_conn_string → a MemorySaver after `latency` seconds"""
+    def connect(conn_string=None, *args, **kwargs):
+        from langgraph.checkpoint.memory import MemorySaver
+        time.sleep(latency)
+        return contextlib.nullcontext(MemorySaver())
+
+    @contextlib.asynccontextmanager
+    async def aconnect(conn_string=None, *args, **kwargs):
+        from langgraph.checkpoint.memory import MemorySaver
+        await asyncio.sleep(latency)
+        yield MemorySaver()
+
+    module.MongoDBSaver.from_conn_string = staticmethod(connect)
+    module.AsyncMongoDBSaver.from_conn_string = staticmethod(aconnect)
+
+class PatchOnImport(importlib.abc.MetaPathFinder):
+    """Patches a module right after its real import, so patching does not import it early"""
+
+    def __init__(self, name: str, patch):
+        self.name = name
+        self.patch = patch
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.name:
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        exec_module, patch = spec.loader.exec_module, self.patch
+
+        def patched(module):
+            exec_module(module)
+            patch(module)
+        spec.loader.exec_module = patched
+        return spec
+
+def child(mode: str, argv: list, connect_latency: float, wav_path: str):
+    sys.path.insert(0, APP)
+    install_microphone(wav_path)
+    sys.meta_path.insert(0, PatchOnImport("langgraph.checkpoint.mongodb",
+                                          lambda module: fake_savers(module, connect_latency)))
+    script = "server.py" if mode == "server" else "main.py"
+    if mode == "eager":
+        import importlib
+        for name in EAGER_IMPORTS:
+            importlib.import_module(name)
+        from langgraph.checkpoint.mongodb import MongoDBSaver
+        from chat_graph import create_chat_graph
+        with MongoDBSaver.from_conn_string("") as saver:
+            create_chat_graph(checkpointer=saver)
+    sys.argv = [os.path.join(APP, script), *argv]
+    runpy.run_path(sys.argv[0], run_name="__main__")
+
+# --- parent ---
+
+def child_command(args, mode: str, argv: list):
+    return [sys.executable, os.path.abspath(__file__), "--child", mode, "--connect-latency", str(args.connect_latency),
+            "--wav", args.wav, "--", *argv]
+
+def time_to_listening(args, mode: str, argv: list, timeout: float = 120.0):
+    """Seconds from process start to main.py printing "Listening" (None if it never did)"""
+    started = time.perf_counter()
+    process = subprocess.Popen(child_command(args, mode, argv), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, encoding="utf-8", env=args.env)
+    try:
+        deadline = started + timeout
+        for line in process.stdout:
+            if LISTENING in line:
+                return time.perf_counter() - started
+            if time.perf_counter() > deadline:
+                break
+        return None
+    finally:
+        process.kill()
+        process.wait()
+
+def wait_for_port(port: int, process, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def import_times(statement: str, env: dict, depth: int = 0):
+    """([(module, cumulative µs)] imported at `depth`, total µs) of `python -X importtime -c statement`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=APP, env=env,
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(cumulative), (len(name) - len(name.lstrip())) // 2))
+    total = sum(us for _, us, level in rows if level == 0)
+    return [(name, us) for name, us, level in rows if level == depth and name not in STARTUP_MODULES], total
+
+def report_imports(args):
+    print("imports before the first prompt (python -X importtime):")
+    # main.py's own imports are one level below "main"
+    for label, statement, depth in [("eager", "; ".join(f"import {name}" for name in EAGER_IMPORTS), 0),
+                                    ("lazy", "import main", 1)]:
+        imported, total = import_times(statement, args.env, depth)
+        slowest = sorted(imported, key=lambda row: -row[1])[:args.top]
+        print(f"  {label}: {total / 1e6:.2f}s — " + ", ".join(f"{name} {us / 1e3:.0f}ms" for name, us in slowest))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per mode")
+    parser.add_argument("--connect-latency", type=float, default=0.1, help="seconds to connect to MongoDB")
+    parser.add_argument("--top", type=int, default=6, help="slowest imports to list")
+    parser.add_argument("--child", choices=["eager", "lazy", "server"], help=argparse.SUPPRESS)
+    parser.add_argument("--wav", help=argparse.SUPPRESS)
+    parser.add_argument("argv", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.argv, args.connect_latency, args.wav)
+        return
+
+    scratch = tempfile.mkdtemp(prefix="bench_startup_")
+    os.chdir(scratch)
+    args.wav = write_noise(os.path.join(scratch, "room.wav"))
+    # The phrase cache warms in the background; point it at a closed port so it fails fast offline
+    args.env = {**os.environ, "PYTHONUNBUFFERED": "1", "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "offline"),
+                "OPENAI_BASE_URL": "http://127.0.0.1:9"}
+    voice_argv = ["--no-attach", "--sandbox-workers", "0", "--tts-cache", os.path.join(scratch, "tts")]
+    server = None
+    try:
+        report_imports(args)
+        port = free_port()
+        server = subprocess.Popen(child_command(args, "server", ["--port", str(port), "--sandbox-workers", "0"]),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=args.env)
+        if not wait_for_port(port, server):
+            raise RuntimeError("server.py did not start")
+
+        print(f"time to \"{LISTENING}\" over {args.runs} runs (MongoDB connect {args.connect_latency}s):")
+        print(f"  {'mode':<8} {'p50':>8} {'min':>8} {'max':>8}")
+        modes = [("eager", "eager", voice_argv), ("lazy", "lazy", voice_argv),
+                 ("attach", "lazy", ["--attach", f"ws://127.0.0.1:{port}", *voice_argv[1:]])]
+        for label, mode, argv in modes:
+            seconds = []
+            for _ in range(args.runs):
+                seconds.append(time_to_listening(args, mode, argv))
+                time.sleep(0.3)  # lets the server drop the previous run's session
+            if None in seconds:
+                print(f"  {label:<8} never reached \"{LISTENING}\"")
+                continue
+            print(f"  {label:<8} {statistics.median(seconds):>7.2f}s {min(seconds):>7.2f}s {max(seconds):>7.2f}s")
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        os.chdir(os.path.dirname(BENCHMARKS))
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""End-of-speech → transcript latency: sr.Recognizer.listen vs the app/capture.py VAD pipeline.
+
+Replays WAV recordings through both capture paths as if they were the microphone:
+- listen: what main.py did without --vad: adjust_for_ambient_noise, then listen()
+  with pause_threshold = 3; the recogniser only gets the audio once listen() returns
+- vad: VoiceCapture with frame-level VAD and a short hangover, feeding the
+  recogniser frame by frame while the utterance is still being captured
+
+Usage:
+    python benchmarks/bench_stt.py                                   # synthetic utterances, stub recogniser
+    python benchmarks/bench_stt.py --wav take1.wav take2.wav --stt vosk --stt-model models/vosk-en-us
+    python benchmarks/bench_stt.py --stt whisper --vad webrtc --hangover-ms 200
+    python benchmarks/bench_stt.py --stt google                      # network recogniser, needs access
+
+Latency after the speaker stops is split into
+- detection: audio the pipeline kept reading after speech really ended (on a live
+  microphone this is wall time); listen() reads 4096-frame chunks, so it is
+  quantised to ~0.26 s at 16 kHz
+- recognition: wall time from end-of-speech detection to the transcript
+The true end of speech comes from an offline oracle: the last 30 ms frame above
+10% of the file's peak RMS. "cut" counts utterances the pipeline ended before it.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+
+import numpy as np
+import speech_recognition as sr
+from stubs import SAMPLE_RATE, StubStreamingRecognizer
+
+from capture import VoiceCapture, make_recognizer, make_vad
+
+ORACLE_FRAME_MS = 30
+
+def synthetic_utterance(path: str, words: int, seed: int, lead: float = 0.8, tail: float = 4.0):
+    """Writes background noise, `words` voiced bursts with short gaps, then `tail` seconds of noise"""
+    rng = np.random.default_rng(seed)
+    noise = lambda seconds: rng.normal(0, 40, int(SAMPLE_RATE * seconds))
+    parts = [noise(lead)]
+    for i in range(words):
+        seconds = rng.uniform(0.25, 0.45)
+        t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+        f0 = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+        parts.append(3000 * np.hanning(len(t)) ** 0.3 * voiced + noise(seconds))
+        if i < words - 1:
+            parts.append(noise(rng.uniform(0.06, 0.2)))
+    parts.append(noise(tail))
+    samples = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+    return path
+
+def read_pcm(path: str):
+    """(16-bit mono PCM, sample rate) of a WAV/AIFF/FLAC file"""
+    with sr.AudioFile(path) as source:
+        audio = sr.Recognizer().record(source)
+    return audio.get_raw_data(convert_width=2), audio.sample_rate
+
+def speech_end(path: str):
+    pcm, rate = read_pcm(path)
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    size = rate * ORACLE_FRAME_MS // 1000
+    frames = samples[:len(samples) // size * size].reshape(-1, size)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    voiced = np.nonzero(rms > 0.1 * rms.max())[0]
+    return (voiced[-1] + 1) * ORACLE_FRAME_MS / 1000 if len(voiced) else 0.0
+
+class CountingStream:
+    """Wraps a source's stream to measure how much audio a pipeline has read"""
+
+    def __init__(self, stream, bytes_per_second: int):
+        self.stream = stream
+        self.bytes_per_second = bytes_per_second
+        self.bytes = 0
+
+    def read(self, size):
+        data = self.stream.read(size)
+        self.bytes += len(data)
+        return data
+
+    @property
+    def seconds(self):
+        return self.bytes / self.bytes_per_second
+
+def open_counted(path: str):
+    source = sr.AudioFile(path).__enter__()
+    source.stream = CountingStream(source.stream, source.SAMPLE_RATE * source.SAMPLE_WIDTH)
+    return source
+
+def recognize_batch(recognizer, pcm: bytes, rate: int, frame_ms: int = 30):
+    """Hands a finished utterance to a capture.py recogniser in one go, as listen() would"""
+    recognizer.start(rate)
+    size = rate * frame_ms // 1000 * 2
+    for i in range(0, len(pcm), size):
+        recognizer.feed(pcm[i:i + size])
+    return recognizer.finish()
+
+def run_listen(path: str, recognizer):
+    source = open_counted(path)
+    try:
+        r = sr.Recognizer()
+        r.adjust_for_ambient_noise(source, duration=0.5)
+        r.pause_threshold = 3
+        audio = r.listen(source, timeout=10, phrase_time_limit=10)
+        consumed = source.stream.seconds
+        started = time.perf_counter()
+        text = recognize_batch(recognizer, audio.get_raw_data(convert_width=2), audio.sample_rate)
+        return consumed, time.perf_counter() - started, text
+    finally:
+        source.__exit__(None, None, None)
+
+def run_vad(path: str, recognizer, args):
+    source = open_counted(path)
+    try:
+        capture = VoiceCapture(recognizer, make_vad(args.vad), hangover_ms=args.hangover_ms)
+        capture.calibrate(source)
+        heard = capture.listen(source)
+        return source.stream.seconds, heard["finish_seconds"], heard["text"]
+    finally:
+        source.__exit__(None, None, None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wav", nargs="+", help="recorded utterances (default: synthetic ones)")
+    parser.add_argument("--synthetic", type=int, default=8, help="number of synthetic utterances")
+    parser.add_argument("--stt", choices=["stub", "google", "vosk", "whisper"], default="stub")
+    parser.add_argument("--stt-model", help="Vosk model directory or whisper.cpp model name")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds the stub recogniser takes")
+    parser.add_argument("--vad", choices=["energy", "webrtc"], default="energy")
+    parser.add_argument("--hangover-ms", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        paths = args.wav or [synthetic_utterance(os.path.join(scratch, f"utterance_{i}.wav"), words=2 + i % 5, seed=i)
+                             for i in range(args.synthetic)]
+        if args.stt == "stub":
+            recognizer = StubStreamingRecognizer("write a python function", latency=args.stub_latency)
+        else:
+            recognizer = make_recognizer(args.stt, args.stt_model)
+
+        rows = {"listen": [], "vad": []}
+        print(f"{'file':<24} {'pipeline':<8} {'detection':>10} {'recognition':>12} {'total':>8}  transcript")
+        for path in paths:
+            end = speech_end(path)
+            for pipeline, run in (("listen", lambda: run_listen(path, recognizer)),
+                                  ("vad", lambda: run_vad(path, recognizer, args))):
+                try:
+                    consumed, recognition, text = run()
+                except (sr.UnknownValueError, sr.WaitTimeoutError) as e:
+                    print(f"{os.path.basename(path):<24} {pipeline:<8} failed: {type(e).__name__}")
+                    continue
+                detection = consumed - end
+                rows[pipeline].append((detection, recognition))
+                print(f"{os.path.basename(path):<24} {pipeline:<8} {detection:>9.3f}s {recognition:>11.3f}s "
+                      f"{detection + recognition:>7.3f}s  {text[:40]}")
+
+    print("\nend of speech → transcript, p50 over files:")
+    for pipeline, samples in rows.items():
+        if not samples:
+            continue
+        detection = statistics.median(d for d, _ in samples)
+        recognition = statistics.median(r for _, r in samples)
+        total = statistics.median(d + r for d, r in samples)
+        cut = sum(d < -ORACLE_FRAME_MS / 1000 for d, _ in samples)
+        print(f"  {pipeline:<8} detection {detection:6.3f}s  recognition {recognition:6.3f}s  "
+              f"total {total:6.3f}s  cut {cut}/{len(samples)}")
+
+if __name__ == "__main__":
+    main()
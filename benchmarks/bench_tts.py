@@ -0,0 +1,134 @@
+"""TTS latency: one request per reply vs app/tts_stream.py's concurrent sentences and phrase cache.
+
+Speaks the replies the assistant actually produces (main.py's fixed phrases
+and generate_summary_and_speak summaries for corpus-sized plans) through
+StubSpeechClient, which answers after --latency seconds and then streams audio
+at --speedup x real time, into a NullAudioPlayer that plays at real-time pace:
+- single: main.py's old speak(), the whole reply in one TTS request
+- parallel: Synthesizer without a cache, sentences synthesised concurrently
+- cached: Synthesizer with a PhraseCache pre-warmed with the fixed phrases, as at startup
+
+Usage:
+    python benchmarks/bench_tts.py
+    python benchmarks/bench_tts.py --latency 0.6 --speedup 2 --concurrency 4 --replies 30
+
+Reports time to first audio (p50/p95), audible gaps between sentences and TTS
+requests per reply.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from stubs import NullAudioPlayer, StubSpeechClient
+from bench_pipeline import percentile
+
+def replies(count: int, seed: int):
+    """Fixed phrases and the directive prompt set's summaries, in a random mix"""
+    from chat_graph import load_prompt_set, summary_update
+    from main import FIXED_PHRASES
+    prompt_set = load_prompt_set("directive-v2")
+    phrases = FIXED_PHRASES + prompt_set.spoken_phrases()
+    rng = random.Random(seed)
+    names = ["fibonacci", "reverse_string", "todo_app", "prime_sieve", "csv_report", "word_count"]
+    texts = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            texts.append(rng.choice(phrases))
+            continue
+        name = rng.choice(names)
+        plan = ["Create ai_solution directory", f"Create {name}.py with the implementation",
+                f"Run {name}.py to verify functionality"]
+        state = {"plan": plan, "current_step": len(plan), "execution_summary": ""}
+        texts.append(summary_update(prompt_set, state)["execution_summary"])
+    return texts
+
+async def single(client, text: str):
+    """main.py's speak() before the phrase cache: one streamed request for the whole reply"""
+    player = NullAudioPlayer(realtime=True)
+    started = time.perf_counter()
+    first = None
+
+    chunks = asyncio.Queue()
+
+    async def receive():
+        # The HTTP stream keeps downloading while audio plays
+        async with client.audio.speech.with_streaming_response.create(input=text) as response:
+            async for chunk in response.iter_bytes(chunk_size=4800):
+                chunks.put_nowait(chunk)
+        chunks.put_nowait(None)
+
+    async def buffers():
+        nonlocal first
+        while (chunk := await chunks.get()) is not None:
+            first = first or time.perf_counter()
+            yield chunk
+
+    receiving = asyncio.create_task(receive())
+    await player.play_stream(buffers())
+    await receiving
+    return first - started, player.stalled
+
+async def synthesized(synthesizer, text: str):
+    player = NullAudioPlayer(realtime=True)
+    speaker = await synthesizer.speak(text, player)
+    return speaker.first_audio_at - speaker.started_at, player.stalled
+
+async def run(args):
+    from chat_graph import load_prompt_set
+    from main import FIXED_PHRASES
+    from tts_stream import PhraseCache, Synthesizer
+    texts = replies(args.replies, args.seed)
+    print(f"{len(texts)} replies, TTS first byte after {args.latency}s, audio at {args.speedup}x real time")
+    print(f"  {'mode':<10} {'first audio p50':>16} {'p95':>8} {'gaps/reply':>11} {'requests/reply':>15}")
+
+    modes = [("single", None), ("parallel", False), ("cached", True)]
+    for mode, cached in modes:
+        client = StubSpeechClient(latency=args.latency, speedup=args.speedup)
+        if cached is None:
+            speak = lambda text: single(client, text)
+        else:
+            cache = PhraseCache(os.path.join(args.scratch, "tts_cache")) if cached else None
+            synthesizer = Synthesizer(client, cache=cache, concurrency=args.concurrency)
+            if cached:
+                await synthesizer.warm(FIXED_PHRASES + load_prompt_set("directive-v2").spoken_phrases())
+                client.requests = 0
+            speak = lambda text: synthesized(synthesizer, text)
+        first, gaps = [], []
+        for text in texts:
+            latency, stalled = await speak(text)
+            first.append(latency)
+            gaps.append(stalled)
+        print(f"  {mode:<10} {statistics.median(first):>15.3f}s {percentile(first, 0.95):>7.3f}s "
+              f"{statistics.mean(gaps):>10.3f}s {client.requests / len(texts):>15.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replies", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds to the first TTS byte")
+    parser.add_argument("--speedup", type=float, default=3.0, help="TTS audio delivery speed vs real time")
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    args.scratch = tempfile.mkdtemp(prefix="bench_tts_")
+    os.chdir(args.scratch)
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    try:
+        asyncio.run(run(args))
+    finally:
+        os.chdir(os.path.dirname(BENCHMARKS))
+        shutil.rmtree(args.scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Load test for the multi-session WebSocket server (app/server.py).
+
+Opens --sessions concurrent clients; each sends --turns turns one after the
+other (waiting for the result before the next), the way a user would. By
+default the server runs in-process and offline: the chat model is
+ScriptedChatModel, checkpoints go to MemorySaver and session workspaces live
+in a scratch directory, while tool calls really run in the sandbox. Pass
+--url to load an already running server instead.
+
+Usage:
+    python benchmarks/load_server.py                                  # 16 sessions x 5 turns
+    python benchmarks/load_server.py --sessions 64 --max-active-turns 16 --llm-latency 0.2
+    python benchmarks/load_server.py --audio                          # base64 WAV turns, stub recognizer
+    python benchmarks/load_server.py --url ws://127.0.0.1:8765 --sessions 8
+
+Reports sustained turns/s over the whole run, per-turn latency p50/p95/max
+as seen by the clients, and busy/error counts.
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+warnings.filterwarnings("ignore")
+
+from websockets.asyncio.client import connect
+from stubs import ScriptedChatModel, write_wav
+from bench_pipeline import DEFAULT_CORPUS, distribution, load_corpus
+
+class Client:
+    """One session sending its turns sequentially and timing each until its result arrives"""
+
+    def __init__(self, url: str, prompts: list, wav: str = None):
+        self.url = url
+        self.prompts = prompts
+        self.wav = wav
+        self.latencies = []
+        self.busy = 0
+        self.errors = []
+
+    async def run(self):
+        async with connect(self.url, max_size=None) as connection:
+            json.loads(await connection.recv())  # {"type": "session", ...}
+            for i, prompt in enumerate(self.prompts):
+                request = {"type": "text", "text": prompt, "id": str(i)}
+                if self.wav is not None:
+                    request = {"type": "audio", "wav": self.wav, "id": str(i)}
+                started = time.perf_counter()
+                await connection.send(json.dumps(request))
+                while True:
+                    reply = json.loads(await connection.recv())
+                    if reply["type"] == "result":
+                        self.latencies.append(time.perf_counter() - started)
+                        break
+                    if reply["type"] == "busy":
+                        self.busy += 1
+                        break
+                    if reply["type"] == "error":
+                        self.errors.append(reply["message"])
+                        break
+
+async def load(args, url: str, prompts: list):
+    wav = None
+    if args.audio:
+        with open(write_wav(os.path.join(os.getcwd(), "speech.wav"), seconds=0.5), "rb") as f:
+            wav = base64.b64encode(f.read()).decode("ascii")
+    clients = [Client(url, [prompts[(s * args.turns + t) % len(prompts)] for t in range(args.turns)], wav)
+               for s in range(args.sessions)]
+    started = time.perf_counter()
+    await asyncio.gather(*(client.run() for client in clients))
+    return clients, time.perf_counter() - started
+
+async def run_in_process(args, prompts: list):
+    from langgraph.checkpoint.memory import MemorySaver
+    from websockets.asyncio.server import serve
+    from chat_graph import GraphOptions, create_chat_graph
+    from metrics import Metrics, instrument_checkpointer
+    from server import SessionServer
+
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+    metrics = Metrics()
+    checkpointer = instrument_checkpointer(MemorySaver(), metrics)
+    graph_options = GraphOptions(model=ScriptedChatModel(latency=args.llm_latency, steps=args.steps),
+                                 backend=args.backend, rule_executor=args.rule_executor)
+    graph = create_chat_graph(checkpointer, is_async=True, options=graph_options)
+
+    # The stub recognizer hands out corpus prompts in turn, so audio turns plan real work
+    transcripts = itertools.cycle(prompts)
+    def transcribe(data: bytes):
+        time.sleep(args.stt_latency)
+        return next(transcripts)
+
+    server = SessionServer(graph, checkpointer, metrics=metrics, workspace_root="sessions",
+                           max_sessions=args.sessions, max_active_turns=args.max_active_turns,
+                           max_queued=args.max_queued, transcribe=transcribe)
+    async with serve(server.handler, "127.0.0.1", 0, max_size=None) as ws:
+        port = ws.sockets[0].getsockname()[1]
+        clients, elapsed = await load(args, f"ws://127.0.0.1:{port}", prompts)
+    workspaces = len(os.listdir("sessions")) if os.path.isdir("sessions") else 0
+    return clients, elapsed, metrics, workspaces
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load a running server instead of starting one in-process")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--field", help="JSON field holding the prompt (default: query, prompt or title)")
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent client sessions")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--audio", action="store_true", help="send base64 WAV turns instead of text")
+    parser.add_argument("--max-active-turns", type=int, default=8)
+    parser.add_argument("--max-queued", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=32, help="executor threads for tools and recognition")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--stt-latency", type=float, default=0.0, help="seconds per fake recognition")
+    parser.add_argument("--steps", type=int, default=1, help="files the fake planner creates per query")
+    parser.add_argument("--backend", choices=["auto", "posix", "portable"], default="portable")
+    parser.add_argument("--rule-executor", action="store_true")
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON")
+    args = parser.parse_args()
+
+    prompts = load_corpus(args.corpus, args.field)
+    json_path = os.path.abspath(args.json) if args.json else None
+    metrics = None
+    workspaces = None
+    if args.url:
+        clients, elapsed = asyncio.run(load(args, args.url, prompts))
+    else:
+        # The sandbox resolves workspaces from the working directory, so run in a scratch directory
+        scratch = tempfile.mkdtemp(prefix="load_server_")
+        os.chdir(scratch)
+        os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+        try:
+            clients, elapsed, metrics, workspaces = asyncio.run(run_in_process(args, prompts))
+        finally:
+            os.chdir(os.path.dirname(BENCHMARKS))
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    errors = [error for client in clients for error in client.errors]
+    report = {
+        "sessions": args.sessions,
+        "turns": len(latencies),
+        "seconds": elapsed,
+        "turns_per_second": len(latencies) / elapsed,
+        "busy": sum(client.busy for client in clients),
+        "errors": len(errors),
+    }
+    if latencies:
+        report["turn_latency"] = distribution(latencies)
+    if workspaces is not None:
+        report["workspaces"] = workspaces
+
+    print(f"{report['turns']} turns from {args.sessions} sessions in {elapsed:.2f}s "
+          f"→ {report['turns_per_second']:.2f} turns/s sustained")
+    if latencies:
+        latency = report["turn_latency"]
+        print(f"turn latency: p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  max {latency['max']:.3f}s")
+    print(f"busy: {report['busy']}  errors: {report['errors']}"
+          + (f"  session workspaces: {workspaces}" if workspaces is not None else ""))
+    if errors:
+        print(f"first error: {errors[0]}")
+    if metrics is not None:
+        admission = [e["duration"] for e in metrics.events if e["stage"] == "admission"]
+        if admission:
+            print(f"admission wait: p50 {statistics.median(admission):.3f}s  max {max(admission):.3f}s")
+        metrics.print_summary()
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Offline stand-ins for the services the assistant talks to.
+
+- ScriptedChatModel: a LangChain chat model that answers the enhance, plan,
+  plan_task and execute prompts with canned responses after a configurable latency
+  (pass it as GraphOptions(model=...) or runtime_for(model) to run the graph's nodes on it)
+- write_wav / WavAudioSource: a WAV file in place of sr.Microphone
+- StubRecognizer: returns the scripted transcript in place of recognize_google
+- StubStreamingRecognizer: the same for app/capture.py's start/feed/finish recogniser interface
+- StubSpeechClient / NullAudioPlayer: OpenAI TTS and LocalAudioPlayer that move bytes (optionally at
+  real-time pace) but never touch the network or sound card
+
+Import chat_graph only after chdir-ing into a scratch directory: the
+sandbox resolves the ai_solution workspace from the working directory.
+"""
+import asyncio
+import collections
+import math
+import os
+import re
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+import speech_recognition as sr
+
+from planner import PlannedTask
+from prerouter import KeywordClassifier
+
+SAMPLE_RATE = 16000
+
+def slug(text: str):
+    words = [w for w in re.findall(r"[a-z]+", text.lower()) if len(w) > 2][:3]
+    return "_".join(words) or "solution"
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model for the graph's prompts.
+
+    Each call sleeps `latency` seconds plus `per_token` seconds per completion
+    token and `per_prompt_token` per uncached prompt token, then answers by
+    prompt type. Non-programming detection uses the local keyword classifier.
+    `steps` files are planned per query, each printing `output_lines` extra
+    lines when run; usage metadata is filled in so token metrics work
+    offline. With `prompt_cache`, the longest word prefix shared with an
+    earlier prompt is reported as cache_read, like provider prefix caching.
+    With `buggy`, generated scripts fail with a NameError that the repair
+    prompt's patch_file answer fixes. With `rate_limit`, calls beyond that many
+    per second raise openai.RateLimitError (429) with a retry-after header.
+    With `garble_every` N, every N-th call answers with nothing usable (an empty
+    message, or an OutputParserException for structured output), the way a
+    small model sometimes does; `model_name` labels it in per-model metrics.
+    """
+
+    model_name: str = "scripted"
+    latency: float = 0.05
+    per_token: float = 0.0
+    per_prompt_token: float = 0.0
+    prompt_cache: bool = False
+    steps: int = 1
+    output_lines: int = 0
+    buggy: bool = False
+    rate_limit: float = 0.0
+    garble_every: int = 0
+    calls: int = 0
+    rate_limited: int = 0
+    _prompts: list = PrivateAttr(default_factory=list)
+    _admitted: collections.deque = PrivateAttr(default_factory=collections.deque)
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(self._planned_task, afunc=self._aplanned_task)
+
+    def _is_programming(self, query: str):
+        is_programming, _ = KeywordClassifier().classify(query)
+        return is_programming
+
+    def _files(self, query: str):
+        base = slug(query)
+        return [f"{base}.py"] + [f"{base}_part{i}.py" for i in range(2, self.steps + 1)]
+
+    def _plan_steps(self, query: str):
+        files = self._files(query)
+        return (["Create ai_solution directory"] + [f"Create {name} with the implementation" for name in files]
+                + [f"Run {files[0]} to verify functionality"])
+
+    def _depends_on(self):
+        """1-based prerequisites: files need the directory, the run step needs every file"""
+        return [[]] + [[1]] * self.steps + [list(range(2, self.steps + 2))]
+
+    def _respond(self, messages):
+        last = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        system = messages[0].content if messages else ""
+        if last.startswith("Enhance this query: "):
+            query = last[len("Enhance this query: "):]
+            if not self._is_programming(query):
+                return AIMessage(content="NON_PROGRAMMING_QUERY")
+            return AIMessage(content=f"Create {self._files(query)[0]} in Python that implements: {query}")
+        if last.startswith(("Create a plan for: ", "Create an executable plan for: ")):
+            steps = self._plan_steps(last.split(": ", 1)[1])
+            if "(after:" in system:
+                steps = [f"{step} (after: {', '.join(map(str, deps)) or 'none'})"
+                         for step, deps in zip(steps, self._depends_on())]
+            return AIMessage(content="\n".join(f"{i}. {step}" for i, step in enumerate(steps, 1)))
+        if last.startswith("EXECUTE"):
+            step = last.split("\n", 1)[0]
+            match = re.search(r"([\w-]+\.py)", step)
+            if match and re.search(r"\bcreate\b", step, re.IGNORECASE):
+                name = match.group(1)
+                bug = "    print(undefined_name)\n" if self.buggy else ""
+                content = (f'def main():\n{bug}    print("{name} ok")\n'
+                           f'    for i in range({self.output_lines}):\n        print(f"{name} line {{i}}: " + "x" * 60)\n'
+                           f'\nif __name__ == "__main__":\n    main()\n')
+                call = {"name": "write_files", "args": {"files": [{"path": f"ai_solution/{name}", "content": content}]}}
+            elif match:
+                call = {"name": "run_command", "args": {"command": f"python ai_solution/{match.group(1)}"}}
+            else:
+                call = {"name": "run_command", "args": {"command": "mkdir -p ai_solution"}}
+            return AIMessage(content="", tool_calls=[{**call, "id": f"call_{self.calls}"}])
+        if last.startswith("FIX THIS FAILURE"):
+            path = re.search(r"^(ai_solution/\S+\.py):$", last, re.MULTILINE)
+            edits = [{"old": "print(undefined_name)", "new": 'print("fixed")'}] if "undefined_name" in last else []
+            call = {"name": "patch_file", "args": {"path": path.group(1) if path else "", "edits": edits}}
+            return AIMessage(content="", tool_calls=[{**call, "id": f"call_{self.calls}"}])
+        return AIMessage(content="Done.")
+
+    def _cached(self, words: list):
+        """Words of `words` served from the simulated prompt cache: the longest prefix seen before"""
+        if not self.prompt_cache:
+            return 0
+        best = 0
+        for seen in self._prompts:
+            shared = 0
+            for a, b in zip(seen, words):
+                if a != b:
+                    break
+                shared += 1
+            best = max(best, shared)
+        self._prompts.append(words)
+        del self._prompts[:-64]
+        return best
+
+    def _finish(self, message: AIMessage, messages):
+        words = [word for m in messages for word in str(m.content).split()]
+        prompt_tokens = len(words)
+        cached_tokens = self._cached(words)
+        completion_tokens = max(1, len(str(message.content).split()) + 20 * len(message.tool_calls))
+        message.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                                  "total_tokens": prompt_tokens + completion_tokens,
+                                  "input_token_details": {"cache_read": cached_tokens}}
+        return message, (self.latency + self.per_token * completion_tokens
+                         + self.per_prompt_token * (prompt_tokens - cached_tokens))
+
+    def _admit(self):
+        """Raises a 429 like OpenAI's when the last second already had rate_limit calls"""
+        if not self.rate_limit:
+            return
+        now = time.monotonic()
+        while self._admitted and now - self._admitted[0] >= 1.0:
+            self._admitted.popleft()
+        if len(self._admitted) >= self.rate_limit:
+            self.rate_limited += 1
+            import httpx
+            import openai
+            wait = 1.0 - (now - self._admitted[0])
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            response = httpx.Response(429, headers={"retry-after-ms": str(int(wait * 1000) + 1)}, request=request)
+            raise openai.RateLimitError("Rate limit reached (scripted)", response=response, body=None)
+        self._admitted.append(now)
+
+    def _garbled(self):
+        return bool(self.garble_every) and self.calls % self.garble_every == 0
+
+    def _answer(self, messages):
+        return AIMessage(content="") if self._garbled() else self._respond(messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._admit()
+        self.calls += 1
+        message, delay = self._finish(self._answer(messages), messages)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._admit()
+        self.calls += 1
+        message, delay = self._finish(self._answer(messages), messages)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _planned(self, messages):
+        self._admit()
+        self.calls += 1
+        if self._garbled():
+            raise OutputParserException("Scripted structured output did not parse")
+        query = messages[-1].content
+        if not self._is_programming(query):
+            return PlannedTask(is_programming=False, enhanced_query="", steps=[])
+        steps = self._plan_steps(query)
+        return PlannedTask(is_programming=True, enhanced_query=f"Create {self._files(query)[0]}: {query}",
+                           steps=steps, depends_on=self._depends_on())
+
+    def _planned_task(self, messages):
+        time.sleep(self.latency)
+        return self._planned(messages)
+
+    async def _aplanned_task(self, messages):
+        await asyncio.sleep(self.latency)
+        return self._planned(messages)
+
+def write_wav(path: str, seconds: float = 1.0, frequency: float = 220.0):
+    """Writes a mono 16-bit tone to stand in for recorded speech"""
+    frames = int(SAMPLE_RATE * seconds)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * i / SAMPLE_RATE)))
+                               for i in range(frames)))
+    return path
+
+class WavAudioSource(sr.AudioFile):
+    """sr.AudioFile, usable wherever main.py opens sr.Microphone()"""
+
+class StubRecognizer(sr.Recognizer):
+    """Reads audio like sr.Recognizer but returns a scripted transcript after `latency` seconds"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.transcript = ""
+
+    def recognize_google(self, audio_data, **kwargs):
+        time.sleep(self.latency)
+        if not self.transcript:
+            raise sr.UnknownValueError()
+        return self.transcript
+
+class StubStreamingRecognizer:
+    """capture.py recogniser returning `transcript`; partials reveal one word per `words_every` frames"""
+
+    def __init__(self, transcript: str = "", latency: float = 0.0, words_every: int = 10):
+        self.transcript = transcript
+        self.latency = latency
+        self.words_every = words_every
+
+    def start(self, sample_rate: int):
+        self.frames = 0
+
+    def feed(self, frame: bytes):
+        self.frames += 1
+        words = self.transcript.split()[:self.frames // self.words_every]
+        return " ".join(words) or None
+
+    def finish(self):
+        time.sleep(self.latency)
+        if not self.transcript:
+            raise sr.UnknownValueError()
+        return self.transcript
+
+PCM_BYTES_PER_SECOND = 24000 * 2  # OpenAI TTS "pcm": 24 kHz 16-bit mono
+
+class _StubSpeechResponse:
+    def __init__(self, text: str, latency: float, bytes_per_char: int, speedup: float = 0.0):
+        self.text = text
+        self.latency = latency
+        self.bytes_per_char = bytes_per_char
+        self.speedup = speedup
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.latency)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def iter_bytes(self, chunk_size: int = 4096):
+        remaining = len(self.text) * self.bytes_per_char
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            remaining -= size
+            if self.speedup:
+                await asyncio.sleep(size / PCM_BYTES_PER_SECOND / self.speedup)
+            yield bytes(size)
+
+class StubSpeechClient:
+    """Mimics openai.audio.speech.with_streaming_response.create: silent PCM after `latency` seconds.
+
+    With `speedup`, audio then arrives at that multiple of real time instead of all at once.
+    """
+
+    def __init__(self, latency: float = 0.05, bytes_per_char: int = 1600, speedup: float = 0.0):
+        self.latency = latency
+        self.bytes_per_char = bytes_per_char
+        self.speedup = speedup
+        self.requests = 0
+        self.audio = self
+        self.speech = self
+        self.with_streaming_response = self
+
+    def create(self, input: str, **kwargs):
+        self.requests += 1
+        return _StubSpeechResponse(input, self.latency, self.bytes_per_char, self.speedup)
+
+class NullAudioPlayer:
+    """LocalAudioPlayer replacement that drains the audio without playing it.
+
+    With `realtime`, play_stream takes as long as the audio would, and time spent
+    waiting for the next buffer is counted in `stalled` (audible gaps).
+    """
+
+    def __init__(self, realtime: bool = False):
+        self.realtime = realtime
+        self.bytes_played = 0
+        self.stalled = 0.0
+
+    async def play(self, response):
+        async for chunk in response.iter_bytes():
+            self.bytes_played += len(chunk)
+
+    async def play_stream(self, buffer_stream):
+        waiting = time.perf_counter()
+        started = False
+        async for chunk in buffer_stream:
+            if started:
+                self.stalled += time.perf_counter() - waiting
+            started = True
+            size = getattr(chunk, "nbytes", len(chunk))
+            self.bytes_played += size
+            if self.realtime:
+                await asyncio.sleep(size / PCM_BYTES_PER_SECOND)
+            waiting = time.perf_counter()
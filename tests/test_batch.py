@@ -0,0 +1,60 @@
+import json
+import httpx
+import openai
+import pytest
+from batch import finished_ids, read_requests, retry_delay
+
+def write_lines(path, lines):
+    path.write_text("".join((json.dumps(line) if isinstance(line, dict) else line) + "\n" for line in lines))
+    return str(path)
+
+def test_read_requests(tmp_path):
+    path = write_lines(tmp_path / "jobs.jsonl", [
+        {"request_id": "a", "prompt": "Sort a list"},
+        {"id": 7, "title": "Fibonacci", "body": "Print the first 10 numbers"},
+        "",
+        "Reverse a string",
+        {"request_id": "a", "prompt": "duplicate id"},
+        {"request_id": "empty", "prompt": ""},
+    ])
+    assert read_requests([path]) == [("a", "Sort a list"), ("7", "Fibonacci\n\nPrint the first 10 numbers"),
+                                     ("jobs-4", "Reverse a string")]
+
+def test_read_requests_with_explicit_fields(tmp_path):
+    path = write_lines(tmp_path / "jobs.jsonl", [{"key": "k1", "ask": "Parse a CSV", "prompt": "ignored"}])
+    assert read_requests([path], field="ask", id_field="key") == [("k1", "Parse a CSV")]
+
+def test_finished_ids_uses_each_ids_latest_status(tmp_path):
+    path = write_lines(tmp_path / "results.jsonl", [
+        {"id": "a", "status": "error"}, {"id": "a", "status": "ok"},
+        {"id": "b", "status": "ok"}, {"id": "b", "status": "error"},
+        {"id": "c", "status": "rejected"}, {"id": "d", "status": "failed"},
+        '{"id": "e", "sta',  # cut short by a crash
+    ])
+    assert finished_ids(path) == {"a", "c", "d"}
+    assert finished_ids(str(tmp_path / "missing.jsonl")) == set()
+    assert finished_ids("-") == set()
+
+def api_error(error_class, status: int, headers: dict = None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return error_class("provider error", response=response, body=None)
+
+def test_retry_delay_honours_retry_after():
+    assert retry_delay(api_error(openai.RateLimitError, 429, {"retry-after": "3"}), 0, 1.0, 60.0) == 3.0
+    assert retry_delay(api_error(openai.RateLimitError, 429, {"retry-after-ms": "250"}), 0, 1.0, 60.0) == 0.25
+    assert retry_delay(api_error(openai.RateLimitError, 429, {"retry-after": "600"}), 0, 1.0, 60.0) == 60.0
+
+@pytest.mark.parametrize("retries", [0, 3, 10])
+def test_retry_delay_backs_off_with_jitter(retries):
+    delay = retry_delay(api_error(openai.InternalServerError, 503), retries, 1.0, 30.0)
+    cap = min(30.0, 2 ** retries)
+    assert 0.5 * cap <= delay <= cap
+
+def test_retry_delay_covers_dropped_connections():
+    error = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    assert retry_delay(error, 0, 1.0, 30.0) is not None
+
+def test_retry_delay_gives_up_on_client_errors():
+    assert retry_delay(api_error(openai.BadRequestError, 400), 0, 1.0, 30.0) is None
+    assert retry_delay(ValueError("bad plan"), 0, 1.0, 30.0) is None
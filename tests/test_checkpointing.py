@@ -0,0 +1,93 @@
+import operator
+import uuid
+from typing import Annotated, TypedDict
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, START, END
+from checkpointing import HISTORY_SUMMARY_ID, CheckpointPolicy, CoalescingSaver, HistoryCompactor, prune_checkpoints
+
+def conversation(turns: int):
+    messages = []
+    for turn in range(turns):
+        messages += [HumanMessage(f"request {turn}", id=f"h{turn}"), AIMessage(f"result {turn}", id=f"a{turn}")]
+    return messages
+
+def test_compaction_keeps_the_last_turns():
+    update = HistoryCompactor(keep_turns=2)({"messages": conversation(5)})
+    _, summary, *kept = update["messages"]
+    assert summary.id == HISTORY_SUMMARY_ID
+    assert summary.content.splitlines()[1:] == [f"- request {turn} → result {turn}" for turn in range(3)]
+    assert [message.id for message in kept] == ["h3", "a3", "h4", "a4"]
+
+def test_compaction_extends_the_existing_summary():
+    compactor = HistoryCompactor(keep_turns=1)
+    _, summary, *kept = compactor({"messages": conversation(3)})["messages"]
+    _, summary, *kept = compactor({"messages": [summary, *kept, *conversation(4)[6:]]})["messages"]
+    assert len(summary.content.splitlines()) == 4
+    assert [message.id for message in kept] == ["h3", "a3"]
+
+def test_short_history_is_left_alone():
+    assert HistoryCompactor(keep_turns=3)({"messages": conversation(3)}) == {}
+
+class State(TypedDict):
+    steps: Annotated[list, operator.add]
+
+def steps_graph(checkpointer):
+    builder = StateGraph(State)
+    for name in ("one", "two", "three"):
+        builder.add_node(name, lambda state, name=name: {"steps": [name]})
+    builder.add_edge(START, "one")
+    builder.add_edge("one", "two")
+    builder.add_edge("two", "three")
+    builder.add_edge("three", END)
+    return builder.compile(checkpointer=checkpointer)
+
+def test_coalescing_holds_checkpoints_until_the_turn_finishes():
+    memory = MemorySaver()
+    policy = CheckpointPolicy(every=100)
+    saver = policy.wrap(memory)
+    assert isinstance(saver, CoalescingSaver)
+    graph = steps_graph(saver)
+    config = {"configurable": {"thread_id": "t"}}
+    graph.invoke({"steps": []}, config)
+    assert memory.get_tuple(config) is None
+
+    policy.finish_turn(saver, "t")
+    assert graph.get_state(config).values["steps"] == ["one", "two", "three"]
+    assert len(list(memory.list(config))) == 1
+
+    graph.invoke({"steps": []}, config)
+    policy.finish_turn(saver, "t")
+    assert graph.get_state(config).values["steps"] == ["one", "two", "three"] * 2
+
+def test_coalescing_persists_every_nth_checkpoint():
+    memory = MemorySaver()
+    saver = CoalescingSaver(memory, every=2)
+    steps_graph(saver).invoke({"steps": []}, {"configurable": {"thread_id": "t"}})
+    saver.flush("t")
+    # 5 checkpoints (input, start, three nodes): the 2nd and 4th, plus the held 5th on flush
+    assert len(list(memory.list({"configurable": {"thread_id": "t"}}))) == 3
+
+def test_prune_needs_a_mongodb_saver():
+    assert prune_checkpoints(MemorySaver(), "t", keep=1) == 0
+
+def test_prune_keeps_the_newest_checkpoints():
+    pymongo = pytest.importorskip("pymongo")
+    from langgraph.checkpoint.mongodb import MongoDBSaver
+    client = pymongo.MongoClient("mongodb://localhost:27017", serverSelectionTimeoutMS=300)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("no MongoDB on localhost:27017")
+    db_name = f"test_prune_{uuid.uuid4().hex[:8]}"
+    try:
+        saver = MongoDBSaver(client, db_name=db_name)
+        config = {"configurable": {"thread_id": "t"}}
+        graph = steps_graph(saver)
+        graph.invoke({"steps": []}, config)
+        assert prune_checkpoints(saver, "t", keep=2) == 3
+        assert len(list(saver.list(config))) == 2
+        assert graph.get_state(config).values["steps"] == ["one", "two", "three"]
+    finally:
+        client.drop_database(db_name)
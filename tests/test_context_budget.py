@@ -0,0 +1,41 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from context_budget import FileOutputStore, MessageBudget, count_tokens
+
+def test_small_tool_outputs_pass_through():
+    message = ToolMessage(content="ok\n", tool_call_id="1")
+    assert MessageBudget(max_tool_tokens=100).clip_tool_message(message) is message
+
+def test_large_tool_outputs_keep_head_and_tail(tmp_path):
+    output = "".join(f"line {i}\n" for i in range(2000))
+    budget = MessageBudget(max_tool_tokens=100, store=FileOutputStore(str(tmp_path)))
+    clipped = budget.clip_tool_message(ToolMessage(content=output, tool_call_id="1"))
+    assert clipped.content.startswith("line 0\n") and clipped.content.endswith("line 1999\n")
+    assert len(clipped.content) < 100 * 4 + 200  # the kept text plus the omission note
+    with open(clipped.artifact["full_output"], encoding="utf-8") as f:
+        assert f.read() == output
+    assert f"full output: {clipped.artifact['full_output']}" in clipped.content
+    assert budget.stats() == {"clipped": 1, "clipped_chars": len(output)}
+
+def test_only_tool_messages_are_clipped():
+    message = AIMessage(content="x" * 10000)
+    assert MessageBudget(max_tool_tokens=100).clip_tool_message(message) is message
+
+def test_prompts_within_budget_are_untouched():
+    messages = [SystemMessage(content="system"), HumanMessage(content="hello")]
+    assert MessageBudget(max_call_tokens=100).fit(messages) is messages
+
+def test_fit_keeps_the_system_prompt_and_newest_messages():
+    messages = [SystemMessage(content="You write Python.")]
+    messages += [HumanMessage(content=f"request {i} " + "word " * 50) for i in range(20)]
+    fitted = MessageBudget(max_call_tokens=400).fit(messages)
+    assert count_tokens(fitted) <= 400
+    assert fitted[0] is messages[0]
+    assert fitted[-1].content.startswith("request 19 ")
+    assert 1 < len(fitted) < len(messages)
+
+def test_fit_clips_an_oversized_newest_message():
+    messages = [SystemMessage(content="You write Python."), ToolMessage(content="y" * 40000, tool_call_id="1")]
+    fitted = MessageBudget(max_call_tokens=1000).fit(messages)
+    assert count_tokens(fitted) <= 1000
+    assert [type(m) for m in fitted] == [SystemMessage, ToolMessage]
+    assert "chars omitted" in fitted[-1].content
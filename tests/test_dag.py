@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+from dag import StepScheduler, split_dependencies
+
+# Steps as numbered in the plan: a diamond (1 → 2, 3 → 5) with an uneven chain, a slow 2 against a fast 3 → 4
+PLAN = ["Create ai_solution directory (after: none)", "Write slow.py (after: 1)", "Write fast.py (after: 1)",
+        "Write more.py (after: 3)", "Run main.py (after: 2, 4)"]
+SLOW = {1: 0.3}  # 0-based step indices from here on
+
+def planned_state():
+    plan, deps = split_dependencies(PLAN)
+    return {"plan": plan, "step_deps": deps, "messages": [], "completed_steps": []}
+
+def entry(index: int):
+    return {"messages": [], "completed_steps": [{"step": index, "path": "llm", "tool_calls": []}]}
+
+def test_steps_start_as_soon_as_their_prerequisites_finish():
+    events, lock = [], threading.Lock()
+
+    def step(state):
+        index = state["current_step"]
+        with lock:
+            events.append(("start", index))
+        time.sleep(SLOW.get(index, 0.02))
+        with lock:
+            events.append(("end", index))
+        return entry(index)
+
+    update = StepScheduler(step, max_concurrency=4).run_node(planned_state())
+    # Index 3 only needs index 2: it runs while index 1 is still going, not after the whole level
+    assert events.index(("start", 3)) < events.index(("end", 1))
+    assert events.index(("start", 4)) > events.index(("end", 1))
+    assert [e["step"] for e in update["completed_steps"]] == [0, 1, 2, 3, 4]
+    assert update["current_step"] == 5
+
+def test_async_steps_start_as_soon_as_their_prerequisites_finish():
+    events, running, most = [], set(), []
+
+    async def step(state):
+        index = state["current_step"]
+        events.append(("start", index))
+        running.add(index)
+        most.append(len(running))
+        await asyncio.sleep(SLOW.get(index, 0.02))
+        running.discard(index)
+        events.append(("end", index))
+        return entry(index)
+
+    update = asyncio.run(StepScheduler(step, max_concurrency=2).arun_node(planned_state()))
+    assert events.index(("start", 3)) < events.index(("end", 1))
+    assert max(most) <= 2
+    assert update["step_paths"] == ["llm"] * 5
+
+def test_unsatisfiable_dependencies_stop_the_run():
+    state = {"plan": ["a", "b"], "step_deps": [[], [5]], "messages": [], "completed_steps": []}
+    update = StepScheduler(lambda state: entry(state["current_step"])).run_node(state)
+    assert update["current_step"] == 1
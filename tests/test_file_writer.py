@@ -0,0 +1,51 @@
+import os
+import pytest
+from file_writer import patch_batch, patch_file, write_batch
+
+def test_unchanged_content_is_not_rewritten(tmp_path):
+    files = [{"path": "ai_solution/main.py", "content": "print('hi')\n"}, {"path": "util.py", "content": "X = 1\n"}]
+    assert write_batch(files, str(tmp_path))["written"] == ["ai_solution/main.py", "util.py"]
+    before = os.stat(tmp_path / "main.py").st_mtime_ns
+    result = write_batch(files, str(tmp_path))
+    assert (result["written"], result["unchanged"]) == ([], ["ai_solution/main.py", "util.py"])
+    assert os.stat(tmp_path / "main.py").st_mtime_ns == before
+
+def test_changed_content_is_rewritten(tmp_path):
+    write_batch([{"path": "main.py", "content": "X = 1\n"}], str(tmp_path))
+    result = write_batch([{"path": "main.py", "content": "X = 2\n"}], str(tmp_path))
+    assert result["written"] == ["main.py"]
+    assert (tmp_path / "main.py").read_text() == "X = 2\n"
+
+def test_files_changed_behind_the_writers_back_are_rewritten(tmp_path):
+    write_batch([{"path": "main.py", "content": "X = 1\n"}], str(tmp_path))
+    # Same size, different bytes: the size/mtime shortcut must not hide the change
+    (tmp_path / "main.py").write_text("X = 9\n")
+    os.utime(tmp_path / "main.py", ns=(0, 0))
+    assert write_batch([{"path": "main.py", "content": "X = 1\n"}], str(tmp_path))["written"] == ["main.py"]
+    assert (tmp_path / "main.py").read_text() == "X = 1\n"
+
+def test_paths_outside_the_workspace_fail_alone(tmp_path):
+    result = write_batch([{"path": "../escape.py", "content": ""}, {"path": "ok.py", "content": ""}], str(tmp_path / "ws"))
+    assert result["written"] == ["ok.py"]
+    assert [e["path"] for e in result["errors"]] == ["../escape.py"]
+    assert not (tmp_path / "escape.py").exists()
+
+def test_patch_file_applies_unique_edits(tmp_path):
+    (tmp_path / "main.py").write_text("def total(values):\n    return sum(values) / len(values)\n")
+    result = patch_file.invoke({"path": "ai_solution/main.py",
+                                "edits": [{"old": "/ len(values)", "new": "/ max(1, len(values))"}]},
+                               {"configurable": {"workspace": str(tmp_path)}})
+    assert (result["patched"], result["errors"]) == (["ai_solution/main.py"], [])
+    assert (tmp_path / "main.py").read_text() == "def total(values):\n    return sum(values) / max(1, len(values))\n"
+
+@pytest.mark.parametrize("old, problem", [("missing", "was not found"), ("x", "matches 2 places"), ("", "is empty")])
+def test_patch_file_leaves_the_file_alone_if_an_edit_fails(tmp_path, old, problem):
+    (tmp_path / "main.py").write_text("x = 1\nx += 2\n")
+    result = patch_batch("main.py", [{"old": "+= 2", "new": "+= 3"}, {"old": old, "new": "y"}], str(tmp_path))
+    assert result["patched"] == []
+    assert problem in result["errors"][0]["error"]
+    assert (tmp_path / "main.py").read_text() == "x = 1\nx += 2\n"
+
+def test_patch_file_needs_an_existing_file(tmp_path):
+    result = patch_batch("main.py", [{"old": "a", "new": "b"}], str(tmp_path))
+    assert result["patched"] == [] and result["errors"][0]["path"] == "main.py"
@@ -0,0 +1,49 @@
+import asyncio
+from langgraph.checkpoint.memory import MemorySaver
+from chat_graph import GraphOptions, create_chat_graph
+from metrics import Metrics, instrument_checkpointer
+from stubs import ScriptedChatModel
+
+def test_concurrent_graph_runs_keep_their_own_totals():
+    metrics = Metrics()
+
+    async def run(calls: int, started: asyncio.Event, other_started: asyncio.Event):
+        with metrics.graph_run() as totals:
+            started.set()
+            await other_started.wait()
+            for _ in range(calls):
+                metrics.add(llm_calls=1, prompt_tokens=10)
+                await asyncio.sleep(0)
+            return dict(totals)
+
+    async def both():
+        first, second = asyncio.Event(), asyncio.Event()
+        return await asyncio.gather(run(3, first, second), run(5, second, first))
+
+    first, second = asyncio.run(both())
+    assert (first["llm_calls"], first["prompt_tokens"]) == (3, 30)
+    assert (second["llm_calls"], second["prompt_tokens"]) == (5, 50)
+
+def test_sessions_sharing_one_metrics_get_their_own_tokens(tmp_path):
+    metrics = Metrics()
+    graph = create_chat_graph(instrument_checkpointer(MemorySaver(), metrics), is_async=True,
+                              options=GraphOptions(model=ScriptedChatModel(latency=0.01)))
+
+    async def turn(session: str):
+        config = {"configurable": {"thread_id": session, "workspace": str(tmp_path / session)},
+                  "callbacks": [metrics.callback]}
+        with metrics.graph_run() as totals:
+            await graph.ainvoke({"messages": [{"role": "user", "content": "write a python script that prints hi"}]},
+                                config)
+        return totals
+
+    alone = asyncio.run(turn("alone"))
+    assert alone["llm_calls"] > 0 and alone["checkpoint_writes"] > 0
+
+    async def concurrent():
+        return await asyncio.gather(*(turn(f"session-{i}") for i in range(4)))
+
+    for totals in asyncio.run(concurrent()):
+        assert totals["llm_calls"] == alone["llm_calls"]
+        assert totals["prompt_tokens"] == alone["prompt_tokens"]
+        assert totals["checkpoint_writes"] == alone["checkpoint_writes"]
@@ -0,0 +1,38 @@
+from langgraph.checkpoint.memory import MemorySaver
+from chat_graph import GraphOptions, create_chat_graph
+from plan_cache import PlanCache
+from stubs import ScriptedChatModel
+
+CALLS = [[{"name": "run_command", "args": {"command": "python ai_solution/main.py"}}]]
+
+def cache_with(query: str):
+    cache = PlanCache()
+    cache.store(query, ["Run main.py"], CALLS, 1.0)
+    return cache
+
+def test_near_identical_query_hits():
+    cache = cache_with("Create a Python script that adds two numbers given by the user and prints the result")
+    assert cache.lookup("Create a Python script which adds two numbers given by the user and prints the result")
+
+def test_different_operation_misses():
+    cache = cache_with("Create a Python script that adds two numbers given by the user and prints the result")
+    assert cache.lookup("Create a Python script that subtracts two numbers given by the user and prints the result") is None
+    assert cache.lookup("Create a Python script that multiplies two numbers given by the user and prints the result") is None
+
+def test_different_number_misses():
+    cache = cache_with("Write a Python script that prints the first 10 Fibonacci numbers to the console output")
+    assert cache.lookup("Write a Python script that prints the first 20 Fibonacci numbers to the console output") is None
+    assert cache.lookup("Write a Python script that prints the first 10 Fibonacci numbers to the console output")
+
+def test_fused_planner_hit_skips_the_planner(tmp_path):
+    model = ScriptedChatModel(latency=0)
+    cache = PlanCache()
+    graph = create_chat_graph(MemorySaver(), options=GraphOptions(model=model, fused_planner=True, plan_cache=cache))
+    config = {"configurable": {"thread_id": "t", "workspace": str(tmp_path / "ai_solution")}}
+    request = "write a python script that prints hello world"
+    graph.invoke({"messages": [{"role": "user", "content": request}]}, config)
+    calls = model.calls
+    final = graph.invoke({"messages": [{"role": "user", "content": request}]}, config)
+    assert cache.hits == 1
+    assert model.calls == calls
+    assert final["original_request"] == request
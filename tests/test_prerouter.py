@@ -0,0 +1,40 @@
+import pytest
+from langchain_core.messages import HumanMessage
+from prerouter import KeywordClassifier, PreRouter, route_after_prerouter
+
+def state(query: str):
+    return {"messages": [HumanMessage(content=query)]}
+
+@pytest.mark.parametrize("query", [
+    "What's the weather forecast for today?",
+    "Tell me a joke about cooking pizza",
+    "What is the capital of France?",
+])
+def test_clear_non_programming_queries_are_rejected(query):
+    update = PreRouter()(state(query))
+    assert update == {"enhanced_query": "NON_PROGRAMMING_QUERY", "plan": ["REJECT_NON_PROGRAMMING"], "current_step": 0}
+    assert route_after_prerouter(update) == "reject"
+
+@pytest.mark.parametrize("query", [
+    "Write a Python script that sorts a list of strings",
+    "Debug the factorial function in my code",
+    # Mixed cues lean on the programming side
+    "Write a Python script that prints the weather forecast from a JSON file",
+])
+def test_programming_queries_go_to_the_planner(query):
+    update = PreRouter()(state(query))
+    assert update == {"enhanced_query": ""}
+    assert route_after_prerouter(update) == "plan"
+
+def test_queries_without_cues_have_no_confidence():
+    assert KeywordClassifier().classify("Hello there") == (True, 0.0)
+    assert PreRouter()(state("Hello there")) == {"enhanced_query": ""}
+
+def test_weak_rejections_stay_below_the_threshold():
+    is_programming, confidence = KeywordClassifier().classify("Is it raining?")
+    assert not is_programming and confidence < 0.7
+    assert PreRouter()(state("Is it raining?")) == {"enhanced_query": ""}
+    assert PreRouter(threshold=0.4)(state("Is it raining?"))["plan"] == ["REJECT_NON_PROGRAMMING"]
+
+def test_empty_history_goes_to_the_planner():
+    assert PreRouter()({"messages": []}) == {"enhanced_query": ""}
@@ -0,0 +1,39 @@
+import os
+import pytest
+from repair import failing_file, repair_request
+from sandbox import run_sandboxed, start_worker_pool, stop_worker_pool
+
+FAILING = "def total(values):\n    return sum(values) / len(values)\n\nprint(total([]))\n"
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "main.py").write_text(FAILING)
+    return str(tmp_path)
+
+@pytest.fixture
+def worker_pool():
+    if not hasattr(os, "fork"):
+        pytest.skip("the worker pool needs os.fork")
+    start_worker_pool(1)
+    yield
+    stop_worker_pool()
+
+def test_relative_frames_are_resolved_in_the_workspace(workspace):
+    result = {"exit_code": 1, "stderr": 'Traceback (most recent call last):\n  File "<string>", line 20, in <module>\n'
+                                        '  File "./main.py", line 4, in <module>\n'
+                                        '  File "./main.py", line 2, in total\nZeroDivisionError: division by zero\n'}
+    assert failing_file("python main.py", result, workspace) == (os.path.join(workspace, "main.py"), [4, 2])
+
+def test_cold_run_gets_a_repair_request(workspace):
+    result = run_sandboxed("python main.py", workspace)
+    assert result["exit_code"] == 1
+    request = repair_request("python main.py", result, workspace)
+    assert "ZeroDivisionError" in request
+    assert "   2|     return sum(values) / len(values)" in request
+
+def test_warm_run_gets_a_repair_request(workspace, worker_pool):
+    result = run_sandboxed("python main.py", workspace)
+    assert result["exit_code"] == 1
+    request = repair_request("python main.py", result, workspace)
+    assert request is not None
+    assert "   2|     return sum(values) / len(values)" in request
@@ -0,0 +1,60 @@
+import os
+import pytest
+from sandbox import PythonWorkerPool, jail_command, resource, run_sandboxed, start_worker_pool, stop_worker_pool
+
+@pytest.mark.parametrize("command, jailed", [
+    ("python ai_solution/main.py", "python ./main.py"),
+    ('python "ai_solution/main.py"', 'python "./main.py"'),
+    ("mkdir -p ai_solution && cd ai_solution", "mkdir -p ./ && cd ./"),
+    ("pytest --rootdir=ai_solution/tests", "pytest --rootdir=./tests"),
+    ("ls my_ai_solution/x", "ls my_ai_solution/x"),
+])
+def test_jail_rewrites_path_arguments(command, jailed):
+    assert jail_command(command) == jailed
+
+def test_jail_leaves_quoted_text_and_heredoc_bodies_alone():
+    assert jail_command('echo "saved to ai_solution/out" > ai_solution/log.txt') == \
+        'echo "saved to ai_solution/out" > ./log.txt'
+    command = "cat > ai_solution/x.py << 'EOF'\nprint('ai_solution/data')\nEOF\npython ai_solution/x.py"
+    assert jail_command(command) == "cat > ./x.py << 'EOF'\nprint('ai_solution/data')\nEOF\npython ./x.py"
+
+def test_heredoc_content_is_written_unchanged(tmp_path):
+    result = run_sandboxed("cat > ai_solution/x.txt << 'EOF'\npath: ai_solution/data\nEOF\ncat x.txt", str(tmp_path))
+    assert result["stdout"] == "path: ai_solution/data\n"
+
+@pytest.mark.skipif(resource is None, reason="rlimits are POSIX only")
+def test_rlimits_apply_to_commands(tmp_path):
+    result = run_sandboxed("python -c \"import resource; print(resource.getrlimit(resource.RLIMIT_CPU))\"",
+                           str(tmp_path), cpu_seconds=7)
+    assert result["stdout"].strip() == "(7, 8)"
+
+def test_stdin_is_closed(tmp_path):
+    result = run_sandboxed("python -c \"input()\"", str(tmp_path))
+    assert result["exit_code"] == 1 and "EOFError" in result["stderr"]
+
+@pytest.fixture
+def worker_pool():
+    if not hasattr(os, "fork"):
+        pytest.skip("the worker pool needs os.fork")
+    pool = PythonWorkerPool(1)
+    yield pool
+    pool.close()
+
+def test_worker_setup_failure_is_not_a_success(tmp_path, worker_pool):
+    (tmp_path / "ok.py").write_text("print('ok')\n")
+    assert worker_pool.run("ok.py", str(tmp_path), 10, 10, 512, 1000, "python ok.py")["exit_code"] == 0
+    result = worker_pool.run("ok.py", str(tmp_path / "missing"), 10, 10, 512, 1000, "python ok.py")
+    assert result["exit_code"] == 1
+
+def test_warm_traceback_matches_a_cold_run(tmp_path):
+    if not hasattr(os, "fork"):
+        pytest.skip("the worker pool needs os.fork")
+    (tmp_path / "main.py").write_text("def f():\n    raise ValueError('x')\n\nf()\n")
+    cold = run_sandboxed("python main.py", str(tmp_path))
+    start_worker_pool(1)
+    try:
+        warm = run_sandboxed("python main.py", str(tmp_path))
+    finally:
+        stop_worker_pool()
+    assert warm["exit_code"] == cold["exit_code"] == 1
+    assert warm["stderr"] == cold["stderr"]
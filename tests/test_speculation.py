@@ -0,0 +1,54 @@
+import threading
+from speculation import Speculator, numbers, similarity
+
+def plan_stage(state):
+    return {"plan": [f"plan for {state['messages'][-1].content}"]}
+
+def speculator_with(partial: str):
+    speculator = Speculator([("create_plan", plan_stage)], min_words=1, min_new_words=1, workers=1)
+    speculator.feed(partial)
+    speculator.speculations[-1].future.result()
+    return speculator
+
+def test_numbers():
+    assert numbers("print the first 10 primes") == ["10"]
+    assert numbers("add two and 3.5") == ["two", "3", "5"]
+
+def test_matching_transcript_reuses_the_plan():
+    speculator = speculator_with("write a python script that prints the first 10 prime numbers")
+    update = speculator.resolve("write a python script that prints the first 10 prime numbers.")
+    assert update["plan"] == ["plan for write a python script that prints the first 10 prime numbers"]
+    assert speculator.stats()["reused"] == 1
+    speculator.close()
+
+def test_different_number_is_not_reused():
+    speculator = speculator_with("write a python script that prints the first 10 prime numbers")
+    assert speculator.resolve("write a python script that prints the first 20 prime numbers") is None
+    stats = speculator.stats()
+    assert (stats["reused"], stats["discarded"]) == (0, 1)
+    speculator.close()
+
+def test_different_operation_is_not_reused():
+    partial = "please write me a python script that reads the numbers in data.csv and prints the largest one of them"
+    final = partial.replace("largest", "smallest")
+    assert similarity(partial, final) >= 0.9
+    speculator = speculator_with(partial)
+    assert speculator.resolve(final) is None
+    assert speculator.stats()["discarded"] == 1
+    speculator.close()
+
+def test_cancelled_speculations_count_as_discarded():
+    release = threading.Event()
+
+    def slow_stage(state):
+        release.wait()
+        return plan_stage(state)
+
+    speculator = Speculator([("create_plan", slow_stage)], min_words=1, min_new_words=1, workers=1)
+    speculator.feed("write a script")
+    speculator.feed("write a script that prints hello")
+    assert speculator.resolve("write a script that prints hello") is None
+    release.set()
+    speculator.close()
+    stats = speculator.stats()
+    assert (stats["started"], stats["reused"], stats["discarded"]) == (1, 0, 2)
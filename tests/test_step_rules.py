@@ -0,0 +1,57 @@
+import json
+import pytest
+from chat_graph.backends import PortableBackend, PosixBackend
+from step_rules import canonical_command, is_shell_step, rule_step
+
+MKDIR = PortableBackend.mkdir_command
+RUN = PortableBackend.run_command_template
+
+@pytest.mark.parametrize("plan, index, command", [
+    (["Create ai_solution directory"], 0, MKDIR),
+    (["create the ai_solution folder for the project"], 0, MKDIR),
+    (["Create ai_solution directory", "Create ai_solution/main.py", "Run main.py"], 2, "python ai_solution/main.py"),
+    (["Write primes.py", "Test the primes.py script"], 1, "python ai_solution/primes.py"),
+    (["Create ai_solution/app/cli.py", "Execute ai_solution/app/cli.py"], 1, "python ai_solution/app/cli.py"),
+    (["Create ai_solution/main.py", "Test the created Python file by running it"], 1, "python ai_solution/main.py"),
+    (["Write scripts\\tool.py", "Run scripts\\tool.py"], 1, "python ai_solution/tool.py"),
+])
+def test_canonical_steps(plan, index, command):
+    assert canonical_command(plan, index, MKDIR, RUN) == command
+
+@pytest.mark.parametrize("plan, index", [
+    (["Create ai_solution/main.py that prints hello"], 0),
+    (["Create ai_solution directory with main.py"], 0),
+    (["Write a function that adds two numbers"], 0),
+    (["Run the program"], 0),
+    (["Write main.py", "Run main.py and update it to print the result"], 1),
+    (["Install requests with pip"], 0),
+    (["Create a directory called data"], 0),
+])
+def test_other_steps_need_the_model(plan, index):
+    assert canonical_command(plan, index, MKDIR, RUN) is None
+
+@pytest.mark.parametrize("step, shell", [
+    ("Create ai_solution directory", True),
+    ("Run main.py", True),
+    ("Install numpy with pip", True),
+    ("Create ai_solution/main.py", False),
+    ("Test main.py and update it to print the sum", False),
+])
+def test_shell_steps(step, shell):
+    assert is_shell_step(step) is shell
+
+def test_directory_steps_run_in_process(tmp_path):
+    workspace = tmp_path / "ai_solution"
+    update = rule_step({"plan": ["Create ai_solution directory"], "current_step": 0}, MKDIR, RUN, str(workspace))
+    call, result = update["messages"]
+    assert call.tool_calls[0]["args"] == {"command": MKDIR}
+    assert result.tool_call_id == call.tool_calls[0]["id"]
+    assert json.loads(result.content)["exit_code"] == 0
+    assert workspace.is_dir()
+    assert update["current_step"] == 1 and update["step_paths"] == ["rule"]
+
+def test_run_steps_go_through_the_tools():
+    update = rule_step({"plan": ["Create ai_solution/main.py", "Run main.py"], "current_step": 1},
+                       PosixBackend.mkdir_command, PosixBackend.run_command_template, "unused")
+    assert len(update["messages"]) == 1
+    assert update["messages"][0].tool_calls[0]["args"] == {"command": "python ai_solution/main.py"}
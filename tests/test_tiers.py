@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import RunnableLambda
+from chat_graph.tiers import ModelTier, tier_models
+
+def model(name: str, calls: list, fail: bool = False):
+    def answer(messages):
+        calls.append(name)
+        if fail:
+            raise OutputParserException("no JSON in the response")
+        return name
+    return RunnableLambda(answer, name=name)
+
+def test_small_model_answers_when_its_output_parses():
+    calls = []
+    tier = ModelTier("plan", model("small", calls), model("primary", calls))
+    assert tier.invoke([]) == "small"
+    assert calls == ["small"]
+
+def test_parse_failure_escalates_to_the_primary():
+    calls = []
+    tier = ModelTier("plan", model("small", calls, fail=True), model("primary", calls))
+    assert tier.invoke([]) == "primary"
+    assert calls == ["small", "primary"]
+
+def test_rejected_output_escalates_to_the_primary():
+    calls = []
+    tier = ModelTier("code", model("small", calls), model("primary", calls))
+    assert tier.invoke([], accept=lambda response: response != "small") == "primary"
+    assert calls == ["small", "primary"]
+
+def test_async_escalation():
+    calls = []
+    tier = ModelTier("plan", model("small", calls, fail=True), model("primary", calls))
+    assert asyncio.run(tier.ainvoke([])) == "primary"
+    assert calls == ["small", "primary"]
+
+def test_other_errors_are_not_escalated():
+    def broken(messages):
+        raise ConnectionError("provider down")
+    calls = []
+    tier = ModelTier("plan", RunnableLambda(broken), model("primary", calls))
+    with pytest.raises(ConnectionError):
+        tier.invoke([])
+    assert calls == []
+
+def test_untiered_role_and_pinned_tier_use_one_model():
+    calls = []
+    assert ModelTier("plan", model("primary", calls)).invoke([], accept=lambda response: False) == "primary"
+    tier = ModelTier("plan", model("small", calls), model("primary", calls))
+    assert tier.pinned.invoke([]) == "primary"
+    assert calls == ["primary", "primary"]
+
+def test_unknown_roles_are_refused():
+    with pytest.raises(ValueError, match="Unknown model role"):
+        tier_models({"summarize": "openai:gpt-4o-mini"})
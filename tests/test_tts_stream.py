@@ -0,0 +1,80 @@
+import asyncio
+import os
+import threading
+import time
+from typing import TypedDict
+from langgraph.graph import StateGraph, START, END
+from stubs import NullAudioPlayer, StubSpeechClient
+from tts_stream import PhraseCache, StreamingSpeaker, Synthesizer, astream_spoken, spoken_reply
+
+class State(TypedDict):
+    execution_summary: str
+
+def summary_graph(tail_seconds: float):
+    """generate_summary followed by a slow node, like compact_history and the final checkpoint"""
+    async def generate_summary(state):
+        return {"execution_summary": "Executed 2 steps: create main.py, run it. Files are in ai_solution."}
+
+    async def compact_history(state):
+        await asyncio.sleep(tail_seconds)
+        return {}
+
+    builder = StateGraph(State)
+    builder.add_node("generate_summary", generate_summary)
+    builder.add_node("compact_history", compact_history)
+    builder.add_edge(START, "generate_summary")
+    builder.add_edge("generate_summary", "compact_history")
+    builder.add_edge("compact_history", END)
+    return builder.compile()
+
+def test_spoken_reply_only_reads_spoken_nodes():
+    assert spoken_reply({"generate_summary": {"execution_summary": "Done."}}) == "Done."
+    assert spoken_reply({"execute_step": {"execution_summary": "Done."}}) is None
+    assert spoken_reply({"generate_summary": None}) is None
+
+def test_audio_starts_before_the_graph_ends():
+    async def run():
+        player = NullAudioPlayer()
+        speaker = StreamingSpeaker(Synthesizer(StubSpeechClient(latency=0.01)), player)
+        async for _ in astream_spoken(summary_graph(0.5), {"execution_summary": ""}, {}, speaker):
+            pass
+        graph_ended_at = time.perf_counter()
+        await speaker.close()
+        return speaker, player, graph_ended_at
+
+    speaker, player, graph_ended_at = asyncio.run(run())
+    assert speaker.first_audio_at is not None
+    assert speaker.first_audio_at < graph_ended_at - 0.3
+    assert player.bytes_played > 0
+
+def test_concurrent_puts_of_one_phrase(tmp_path):
+    cache = PhraseCache(str(tmp_path))
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def put(i):
+        barrier.wait()
+        try:
+            cache.put("phrase", bytes([i]) * 1000)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(set(cache.get("phrase"))) == 1
+    assert os.listdir(tmp_path) == ["phrase.pcm"]
+
+def test_each_loop_gets_one_semaphore():
+    synthesizer = Synthesizer(StubSpeechClient(), concurrency=2)
+
+    async def limits():
+        return synthesizer.limit(), synthesizer.limit()
+
+    first, again = asyncio.run(limits())
+    second, _ = asyncio.run(limits())
+    assert first is again
+    assert first is not second
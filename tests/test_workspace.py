@@ -0,0 +1,88 @@
+import json
+import os
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+from chat_graph.backends import PosixBackend
+from file_writer import write_batch
+from workspace import WorkspaceManager, artifact_store_for, digest_of, may_write, tool_written_paths, workspace_for
+
+MAIN = "print('hello')\n"
+
+def first_turn(tmp_path, keep_turns: int = None):
+    workspaces = WorkspaceManager(str(tmp_path / "store"), keep_turns=keep_turns)
+    thread = {"configurable": {"workspace": str(tmp_path / "ws"), "thread_id": "t"}}
+    config = workspaces.begin_turn(thread)
+    write_batch([{"path": "main.py", "content": MAIN}], workspace_for(config), artifact_store_for(config))
+    return workspaces, thread, config
+
+def test_reused_files_are_indexed(tmp_path):
+    workspaces, thread, config = first_turn(tmp_path)
+    config = workspaces.begin_turn(thread)
+    result = write_batch([{"path": "copy.py", "content": MAIN}], workspace_for(config), artifact_store_for(config))
+    assert result["reused"] == ["copy.py"]
+    assert tool_written_paths([ToolMessage(json.dumps(result), name="write_files", tool_call_id="1")]) == ["copy.py"]
+
+    messages = [HumanMessage("again"), ToolMessage(json.dumps(result), name="write_files", tool_call_id="1")]
+    update = workspaces.index_node({"messages": messages}, config)
+    assert update["turn_files"] == ["copy.py"]
+    assert update["artifacts"][digest_of(MAIN.encode())]["turn"] == 2
+
+def test_scripts_cannot_write_through_to_the_store(tmp_path):
+    workspaces, thread, config = first_turn(tmp_path)
+    first = os.path.join(workspace_for(config), "main.py")
+    config = workspaces.begin_turn(thread)
+    second = os.path.join(workspace_for(config), "main.py")
+    assert os.path.samefile(first, second)
+
+    result = PosixBackend().run_command("python -c \"open('main.py', 'w').write('changed')\"", config)
+    assert result["exit_code"] == 0
+    with open(second) as f:
+        assert f.read() == "changed"
+    with open(first) as f:
+        assert f.read() == MAIN
+    with open(workspaces.store.object_path(digest_of(MAIN.encode()))) as f:
+        assert f.read() == MAIN
+
+def test_unchanged_files_are_linked_back(tmp_path):
+    workspaces, thread, config = first_turn(tmp_path)
+    first = os.path.join(workspace_for(config), "main.py")
+    config = workspaces.begin_turn(thread)
+    second = os.path.join(workspace_for(config), "main.py")
+    PosixBackend().run_command("python main.py", config)
+    assert not os.path.samefile(first, second)
+    workspaces.index_node({"messages": []}, config)
+    assert os.path.samefile(first, second)
+
+@pytest.mark.parametrize("command, writes", [
+    ("ls -la", False),
+    ("cat main.py | head -5 && wc -l main.py", False),
+    ("python main.py", True),
+    ("echo x > main.py", True),
+    ("sed -i s/a/b/ main.py", True),
+    ("ls; python -c 'pass'", True),
+])
+def test_may_write(command, writes):
+    assert may_write(command) is writes
+
+def test_read_only_commands_keep_the_links(tmp_path):
+    workspaces, thread, config = first_turn(tmp_path)
+    first = os.path.join(workspace_for(config), "main.py")
+    config = workspaces.begin_turn(thread)
+    assert PosixBackend().run_command("cat main.py", config)["stdout"] == MAIN
+    assert os.path.samefile(first, os.path.join(workspace_for(config), "main.py"))
+
+def test_rejected_turns_leave_no_directory(tmp_path):
+    workspaces, thread, config = first_turn(tmp_path)
+    rejected = workspaces.begin_turn(thread)
+    assert workspaces.index_node({"plan": ["REJECT_NON_PROGRAMMING"], "messages": []}, rejected)["turn_files"] == []
+    assert not os.path.exists(workspace_for(rejected))
+    assert workspace_for(workspaces.begin_turn(thread)) == workspace_for(rejected)
+
+def test_old_turn_directories_are_pruned(tmp_path):
+    workspaces, thread, config = first_turn(tmp_path, keep_turns=2)
+    for _ in range(3):
+        config = workspaces.begin_turn(thread)
+        workspaces.index_node({"messages": []}, config)
+    assert workspaces.turns(str(tmp_path / "ws")) == [3, 4]
+    with open(os.path.join(workspace_for(config), "main.py")) as f:
+        assert f.read() == MAIN